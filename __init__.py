@@ -8,17 +8,217 @@ bl_info = {
 
 import bpy
 
-from ai_animator.operators import AIAnimatorTTSTab,AIAnimatorBlendshapeTab,GenerateOperator, CUSTOM_OT_actions, CUSTOM_OT_addViewportSelection, CUSTOM_OT_printItems, CUSTOM_OT_clearList, CUSTOM_OT_removeDuplicates, CUSTOM_OT_selectItems, CUSTOM_OT_deleteObject, CUSTOM_UL_items
+from ai_animator import jobs
+from ai_animator.client import DEFAULT_ENDPOINT, endpoint_latency_stats
+from ai_animator.cache import get_cache
+from ai_animator.operators import AIAnimatorTTSTab,AIAnimatorBlendshapeTab,GenerateBlendshapesOperator, GenerateAllBlendshapesOperator, BulkImportTakesOperator, SynthesizeSpeechOperator, CancelJobOperator, CUSTOM_OT_actions, CUSTOM_OT_addViewportSelection, CUSTOM_OT_printItems, CUSTOM_OT_clearList, CUSTOM_OT_removeDuplicates, CUSTOM_OT_selectItems, CUSTOM_OT_deleteObject, CUSTOM_UL_items
 
 class ObjectSlot(bpy.types.PropertyGroup):
     obj: bpy.props.PointerProperty(name="Object",type=bpy.types.Object)
 
+class AIAnimatorPreferences(bpy.types.AddonPreferences):
+    bl_idname = __name__
+
+    endpoints: bpy.props.StringProperty(
+        name="Inference servers",
+        description="URLs of the inference servers to send audio to, separated by commas",
+        default=DEFAULT_ENDPOINT,
+    )
+    endpoint_strategy: bpy.props.EnumProperty(
+        name="Server selection",
+        description="How to pick a server when more than one is configured",
+        items=(
+            ('LEAST_LOADED', "Least loaded", "Send each request to the server with the fewest requests in flight"),
+            ('ROUND_ROBIN', "Round robin", "Send requests to each server in turn")),
+        default='LEAST_LOADED',
+    )
+    request_timeout: bpy.props.FloatProperty(
+        name="Timeout (s)",
+        description="Give up on a request once its server has been silent this long (0 for no limit)",
+        default=120.0,
+        min=0.0,
+    )
+    request_deadline: bpy.props.FloatProperty(
+        name="Deadline (s)",
+        description="Give up on a request that hasn't completed this long after it was sent, including retries (0 for no limit)",
+        default=0.0,
+        min=0.0,
+    )
+    max_retries: bpy.props.IntProperty(
+        name="Retries",
+        description="How many times a failed request is retried (with increasing delays), on another server if there is one",
+        default=2,
+        min=0,
+    )
+    hedge_requests: bpy.props.BoolProperty(
+        name="Hedge slow requests",
+        description="Send a duplicate of any request that is slower than usual to a second server and use whichever responds first",
+        default=False,
+    )
+    hedge_percentile: bpy.props.FloatProperty(
+        name="Hedge after percentile",
+        description="A request counts as slower than usual once it has taken longer than this percentile of recent response times",
+        default=95.0,
+        min=50.0,
+        max=99.9,
+    )
+    model_version: bpy.props.StringProperty(
+        name="Model version",
+        description="Version of the model served by the inference servers. Cached results are only reused for the same version, so results aren't cached at all while this is empty",
+        default="",
+    )
+    preprocess_audio: bpy.props.BoolProperty(
+        name="Compress uploads",
+        description="Downmix WAV audio to mono and resample it to the model's sample rate before uploading, instead of sending the original file",
+        default=False,
+    )
+    preprocess_sample_rate: bpy.props.IntProperty(
+        name="Upload sample rate (Hz)",
+        description="Sample rate that audio is resampled to before uploading (audio at a lower rate is left as-is)",
+        default=16000,
+        min=8000,
+    )
+    skip_silence: bpy.props.BoolProperty(
+        name="Skip silence",
+        description="Only send the parts of WAV audio that contain speech, silent stretches are animated with the rest pose",
+        default=False,
+    )
+    silence_threshold_db: bpy.props.FloatProperty(
+        name="Silence threshold (dB)",
+        description="Audio quieter than this, relative to the loudest part of the clip, counts as silence",
+        default=-40.0,
+        max=0.0,
+    )
+    sparse_fcurves: bpy.props.BoolProperty(
+        name="Only animate mapped shape keys",
+        description="Only create fcurves for shape keys that a blendshape maps to, leaving Basis and corrective shape keys unanimated",
+        default=False,
+    )
+    drop_constant_fcurves: bpy.props.BoolProperty(
+        name="Drop constant channels",
+        description="Remove shape key fcurves whose value never changes over the clip and set the value on the shape key instead",
+        default=False,
+    )
+    simplify_keyframes: bpy.props.BoolProperty(
+        name="Simplify keyframes",
+        description="Reduce baked keyframes to the fewest linear keys that stay within the tolerance of the baked values",
+        default=False,
+    )
+    simplify_tolerance: bpy.props.FloatProperty(
+        name="Simplify tolerance",
+        description="Largest difference allowed between a simplified curve and the baked values",
+        default=0.001,
+        min=0.0,
+        precision=4,
+    )
+    progressive_preview: bpy.props.BoolProperty(
+        name="Progressive preview",
+        description="Bake frames into the action as the server streams them back, so playback can start before inference has finished",
+        default=True,
+    )
+    windowed_inference: bpy.props.BoolProperty(
+        name="Split long audio",
+        description="Split long WAV files into overlapping windows that are inferred in parallel and crossfaded back together",
+        default=False,
+    )
+    window_seconds: bpy.props.FloatProperty(
+        name="Window length (s)",
+        default=30.0,
+        min=2.0,
+    )
+    window_overlap_seconds: bpy.props.FloatProperty(
+        name="Window overlap (s)",
+        description="Length of the crossfade between consecutive windows",
+        default=1.0,
+        min=0.0,
+    )
+    max_parallel_requests: bpy.props.IntProperty(
+        name="Parallel requests",
+        description="Maximum number of windows in flight at once",
+        default=4,
+        min=1,
+    )
+    timing_enabled: bpy.props.BoolProperty(
+        name="Record timings",
+        description="Time each stage of every generation and show the last run's breakdown in the sidebar",
+        default=False,
+    )
+    timing_log_path: bpy.props.StringProperty(
+        name="Timing log",
+        description="If set, every run's timings are appended to this file as one line of JSON",
+        subtype='FILE_PATH',
+        default="",
+    )
+    cache_enabled: bpy.props.BoolProperty(
+        name="Cache results",
+        description="Reuse inference results for audio that has already been generated",
+        default=True,
+    )
+    cache_directory: bpy.props.StringProperty(
+        name="Cache directory",
+        description="Where cached inference results are stored (leave empty to use the system temporary directory)",
+        subtype='DIR_PATH',
+        default="",
+    )
+    cache_max_mb: bpy.props.IntProperty(
+        name="Cache size (MB)",
+        description="Least recently used results are evicted once the cache grows past this size",
+        default=512,
+        min=1,
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "endpoints")
+        layout.prop(self, "endpoint_strategy")
+        layout.prop(self, "request_timeout")
+        layout.prop(self, "request_deadline")
+        layout.prop(self, "max_retries")
+        layout.prop(self, "hedge_requests")
+        if self.hedge_requests:
+            layout.prop(self, "hedge_percentile")
+        for (scheme, host, port), (count, p50, p95) in sorted(endpoint_latency_stats().items()):
+            layout.label(text=f"{scheme}://{host}:{port} : p50 {p50:.2f}s, p95 {p95:.2f}s over the last {count} requests")
+        layout.prop(self, "model_version")
+        layout.prop(self, "preprocess_audio")
+        if self.preprocess_audio:
+            layout.prop(self, "preprocess_sample_rate")
+        layout.prop(self, "skip_silence")
+        if self.skip_silence:
+            layout.prop(self, "silence_threshold_db")
+        layout.prop(self, "sparse_fcurves")
+        layout.prop(self, "drop_constant_fcurves")
+        layout.prop(self, "simplify_keyframes")
+        if self.simplify_keyframes:
+            layout.prop(self, "simplify_tolerance")
+        layout.prop(self, "progressive_preview")
+        layout.prop(self, "windowed_inference")
+        if self.windowed_inference:
+            layout.prop(self, "window_seconds")
+            layout.prop(self, "window_overlap_seconds")
+            layout.prop(self, "max_parallel_requests")
+        layout.prop(self, "timing_enabled")
+        if self.timing_enabled:
+            layout.prop(self, "timing_log_path")
+        layout.prop(self, "cache_enabled")
+        if self.cache_enabled:
+            if not self.model_version:
+                layout.label(text="Set the model version to cache results", icon='ERROR')
+            layout.prop(self, "cache_directory")
+            layout.prop(self, "cache_max_mb")
+            stats = get_cache(bpy.path.abspath(self.cache_directory), self.cache_max_mb * 1024 * 1024).stats()
+            layout.label(text=f"{stats['entries']} cached results ({stats['bytes'] / (1024 * 1024):.1f} MB), {stats['hits']} hits, {stats['misses']} misses this session")
+
 classes = (
     AIAnimatorBlendshapeTab,
     AIAnimatorTTSTab,
     GenerateBlendshapesOperator,
+    GenerateAllBlendshapesOperator,
+    BulkImportTakesOperator,
     SynthesizeSpeechOperator,
+    CancelJobOperator,
     ObjectSlot,
+    AIAnimatorPreferences,
     CUSTOM_OT_actions,
     CUSTOM_OT_addViewportSelection,
     CUSTOM_OT_printItems,
@@ -39,12 +239,26 @@ def register():
     bpy.types.Scene.ai_animator_targets_index = bpy.props.IntProperty()
     bpy.types.Scene.ai_animator_selected_audio = bpy.props.StringProperty()
     bpy.types.Scene.ai_animator_tts_text = bpy.props.StringProperty()
+    bpy.types.Scene.ai_animator_batch_channel = bpy.props.IntProperty(
+        name="Channel",
+        description="Only generate for sound strips in this sequencer channel (0 for every channel)",
+        min=0,
+    )
+    bpy.types.Scene.ai_animator_batch_output = bpy.props.EnumProperty(
+        name="Output",
+        items=(
+            ('ACTION', "Single action", "Bake every strip into one action, each at its strip's start frame"),
+            ('NLA', "NLA strips", "Bake each strip into its own action and place it in an NLA strip at the strip's start frame")),
+    )
 
 def unregister():
+    jobs.cancel_all()
     for c in classes:
         bpy.utils.unregister_class(c)
     del bpy.types.Scene.ai_animator_targets
     del bpy.types.Scene.ai_animator_targets_index
+    del bpy.types.Scene.ai_animator_batch_channel
+    del bpy.types.Scene.ai_animator_batch_output
         
 if __name__ == "main":
     register()        
@@ -3,50 +3,88 @@ import time
 import socket 
 import csv
 import random 
+import queue
+import math
+import numpy as np
 
-_ARKIT_BLENDSHAPES = ['eyeBlinkLeft', 'eyeLookDownLeft', 'eyeLookInLeft', 'eyeLookOutLeft', 'eyeLookUpLeft', 'eyeSquintLeft', 'eyeWideLeft', 'eyeBlinkRight', 'eyeLookDownRight', 'eyeLookInRight', 'eyeLookOutRight', 'eyeLookUpRight', 'eyeSquintRight', 'eyeWideRight', 'jawForward', 'jawRight', 'jawLeft', 'jawOpen', 'mouthClose', 'mouthFunnel', 'mouthPucker', 'mouthRight', 'mouthLeft', 'mouthSmileLeft', 'mouthSmileRight', 'mouthFrownLeft', 'mouthFrownRight', 'mouthDimpleLeft', 'mouthDimpleRight', 'mouthStretchLeft', 'mouthStretchRight', 'mouthRollLower', 'mouthRollUpper', 'mouthShrugLower', 'mouthShrugUpper', 'mouthPressLeft', 'mouthPressRight', 'mouthLowerDownLeft', 'mouthLowerDownRight', 'mouthUpperUpLeft', 'mouthUpperUpRight', 'browDownLeft', 'browDownRight', 'browInnerUp', 'browOuterUpLeft', 'browOuterUpRight', 'cheekPuff', 'cheekSquintLeft', 'cheekSquintRight', 'noseSneerLeft', 'noseSneerRight', 'tongueOut']
+from ai_animator.arkit import _ARKIT_BLENDSHAPES
+from ai_animator.keyframes import FcurveBaker, conform_frames
+from ai_animator.timecode import Timecode
+from ai_animator.timing import NULL_TIMER
+
+# compiled ARKit -> shape key index maps, keyed by the shape key layout (the ordered tuple of key block names) they were resolved against
+# targets that share a layout (e.g. duplicated heads, or the same head re-baked) only resolve names once
+_SHAPEKEY_INDEX_MAPS = {}
+
+'''
+Returns the signature used to cache shape key index maps for [target], i.e. the ordered names of its key blocks (empty if it has no shape keys).
+'''
+def shapekey_layout_signature(target):
+    try:
+        return tuple(kb.name for kb in target.data.shape_keys.key_blocks)
+    except AttributeError:
+        return ()
+
+'''
+Returns the frame rate of [scene] (render.fps / render.fps_base) as a Fraction, so NTSC rates such as 29.97 are exactly 30000/1001.
+'''
+def scene_framerate(scene):
+    return Timecode((scene.render.fps, scene.render.fps_base)).rational_framerate
 
 '''
 Interface for looking up shape key/custom properties by name and setting their respective weights on frames.
 '''
-class AnimatableObject:
+class AnimatableObject(FcurveBaker):
     '''
     Construct an instance to manipulate frames on a single target object (which is an object within the Blender context).
     If the number of frames is known ahead of time (i.e. you are not working with streaming), this can be passed here.
     If you are streaming, pass num_frames=0 (or simply don't pass anything for the parameter and leave empty).
     The target should have at least one shape key or custom property with a name that corresponds to one of the entries in LIVE_LINK_FACE_HEADER.
     An exception will be raised if neither of these are present.
+    If [sparse] is True, fcurves are only created for shape keys that an ARKit blendshape maps to (so Basis and correctives are left unanimated).
+    If [drop_constant] is True, shape key fcurves whose value never changes over the clip are removed when keyframes are written
+    and the constant is set directly on the shape key instead.
+    If [simplify_tolerance] is set, keyframes are reduced (see keyframes.simplify_channels) so no channel deviates from the baked values by more than the tolerance.
+    Row i of the frame matrices is keyed at scene frame [start_frame] + i.
+    If [new_actions] is True, new actions are created even if ones named after [action_name] already exist (see keyframes.FcurveBaker.create_actions).
     '''
-    def __init__(self, target, num_frames=0, action_name=None):
+    def __init__(self, target, num_frames=0, action_name=None, sparse=False, drop_constant=False, simplify_tolerance=None, start_frame=0, new_actions=False):
         self.target = target
+        self.new_actions = new_actions
+        self.start_frame = start_frame
+        self.sparse = sparse
+        self.drop_constant = drop_constant
+        self.simplify_tolerance = simplify_tolerance
         # first, let's create a placeholder for all shape keys that exist on the target mesh
-        # sk_frames is a list where each entry (itself a list) represents one frame
-        # each frame will contain N values (where N is the number of shape keys in the target mesh)
+        # sk_frames is a (num_frames x N) float32 matrix where each row represents one frame
+        # and N is the number of shape keys in the target mesh
         # (note this will also create keyframes for non-LiveLinkFace shape keys on the mesh)
         # I can't find a better way to check if an object has shapekeys, so just use try-except
         try:
-            self.sk_frames = [ [0] * len(self.target.data.shape_keys.key_blocks) for _ in range(num_frames) ] 
+            self.sk_frames = np.zeros((num_frames, len(self.target.data.shape_keys.key_blocks)), dtype=np.float32)
         except:
             self.sk_frames = None
         print(f"Created {num_frames} empty frames for {len(self.target.data.shape_keys.key_blocks)} existing blendshapes in mesh")
+        # resolve every ARKit blendshape to a shape key index up front (-1 where the mesh has no matching shape key)
+        # so writing values afterwards is plain array indexing rather than name lookups
+        self.arkit_sk_idx = self.compile_shapekey_index_map()
         # some ARKit blendshapes may drive bone rotations, rather than mesh-deforming shape keys
         # if a custom property exists on the target object whose name matches the incoming ARkit shape, the property will be animated
         # it is then your responsibility to create a driver in Blender to rotate the bone between its extremities (blendshape values -1 to 1 )
-#        self.custom_props = [] 
-#        for i in range(len(LIVE_LINK_FACE_HEADER) - 2):
-#            custom_prop = self.livelink_to_custom_prop(i)
-#            if custom_prop is not None:
-#                self.custom_props += [custom_prop]
-#                print(f"Found custom property {custom_prop} for ARkit blendshape : {LIVE_LINK_FACE_HEADER[i+2]}")
-                
-#        for k in ["HeadPitch","HeadRoll","HeadYaw"]:
-#            if k not in self.custom_props:
-#                self.target[k] = 0.0
-#                print(f"Created custom property {k} on target object")
-#                self.custom_props += [ k ] 
-#        print(f"Set custom_props to {self.custom_props}")
-#        self.custom_prop_frames = [[0] * len(self.custom_props) for _ in range(num_frames)]               
-#        print(f"Created {len(self.custom_prop_frames)} frames for {len(self.custom_props)} custom properties")
+        # a matching shape key takes precedence, so only unmapped blendshapes are looked up as custom properties
+        # custom_prop_frames is a (num_frames x len(custom_props)) matrix laid out like sk_frames,
+        # and arkit_prop_idx maps every ARKit blendshape to its column (-1 where there's no custom property)
+        self.custom_props = []
+        self.arkit_prop_idx = np.full(len(_ARKIT_BLENDSHAPES), -1, dtype=np.int32)
+        for arkit_bs_idx in np.flatnonzero(self.arkit_sk_idx == -1).tolist():
+            custom_prop = self.arkit_to_custom_prop(arkit_bs_idx)
+            if custom_prop is not None:
+                self.arkit_prop_idx[arkit_bs_idx] = len(self.custom_props)
+                self.custom_props += [custom_prop]
+                print(f"Found custom property {custom_prop} for ARkit blendshape : {_ARKIT_BLENDSHAPES[arkit_bs_idx]}")
+            else:
+                print(f"Failed to find shape key or custom property for ARkit blendshape {_ARKIT_BLENDSHAPES[arkit_bs_idx]}")
+        self.custom_prop_frames = np.zeros((num_frames, len(self.custom_props)), dtype=np.float32)
         if action_name is not None:
             self.create_action(action_name, num_frames)
             
@@ -55,123 +93,230 @@ class AnimatableObject:
     ARKit blendshape IDs are the integer index within LIVE_LINK_FACE_HEADER (offset to exclude the first two columns.
     '''
     def arkit_to_shapekey_idx(self, arkit_bs_idx):
-        name = _ARKIT_BLENDSHAPES[arkit_bs_idx]
-        for n in [name, name[0].lower() + name[1:]]:
-            idx = self.target.data.shape_keys.key_blocks.find(n)
-            if idx != -1:
-                return idx
-        return idx
+        return int(self.arkit_sk_idx[arkit_bs_idx])
 
     '''
-    Try and resolve an ARKit blendshape-id to a custom property in the target object.
-    ARKit blendshape IDs are the integer index within LIVE_LINK_FACE_HEADER (offset to exclude the first two columns.
+    Resolves every ARKit blendshape to a shape key index in the target object, returning an int32 array with one entry per ARKit blendshape (-1 if unmapped).
+    Maps are cached by shape key layout, so this only hits key_blocks.find() the first time a given layout is seen.
     '''
-    def livelink_to_custom_prop(self, ll_idx):
-        name = LIVE_LINK_FACE_HEADER[ll_idx+2]
-
-        # Invert Mouth Left and Rigth shapes to compensate for LiveLinkFace bug
-        if bpy.context.scene.invert_lr_mouth:
-            if name == 'MouthLeft':
-                name = 'MouthRight'
-            elif name == 'MouthRight':
-                name = 'MouthLeft'
-                
-        for n in [name, name[0].lower() + name[1:]]:
-            try:
-                self.target[n]
+    def compile_shapekey_index_map(self):
+        signature = shapekey_layout_signature(self.target)
+        index_map = _SHAPEKEY_INDEX_MAPS.get(signature)
+        if index_map is None:
+            index_map = np.full(len(_ARKIT_BLENDSHAPES), -1, dtype=np.int32)
+            if signature:
+                key_blocks = self.target.data.shape_keys.key_blocks
+                for arkit_bs_idx, name in enumerate(_ARKIT_BLENDSHAPES):
+                    for n in [name, name[0].lower() + name[1:]]:
+                        idx = key_blocks.find(n)
+                        if idx != -1:
+                            index_map[arkit_bs_idx] = idx
+                            break
+            index_map.flags.writeable = False
+            _SHAPEKEY_INDEX_MAPS[signature] = index_map
+        return index_map
+
+    '''
+    Try and resolve an ARKit blendshape-id to a custom property in the target object (returns the property name, or None).
+    ARKit blendshape IDs are the integer index within _ARKIT_BLENDSHAPES. Both the ARKit name (e.g. jawOpen) and its LiveLinkFace spelling (JawOpen) are accepted.
+    '''
+    def arkit_to_custom_prop(self, arkit_bs_idx):
+        name = _ARKIT_BLENDSHAPES[arkit_bs_idx]
+        for n in [name, name[0].upper() + name[1:]]:
+            if n in self.target:
                 return n
-            except:
-                pass
-        return None    
+        return None
             
     '''Sets the value for the ARKit blendshape at index [arkit_bs_idxl] to [val] for frame [frame] (note the underlying target may be a blendshape or a bone).'''
     def set_frame_value(self, arkit_bs_idx, frame, val):
-        i_sk = self.arkit_to_shapekey_idx(arkit_bs_idx)
+        i_sk = self.arkit_sk_idx[arkit_bs_idx]
         
         if i_sk != -1:
-            self.sk_frames[frame][i_sk] = val
-        else:
-            #custom_prop = self.livelink_to_custom_prop(i_ll)
-            #if custom_prop is not None:
-            #    custom_prop_idx =self.custom_props.index(custom_prop)
-            #    self.custom_prop_frames[frame][custom_prop_idx] = val
-#            else:
-            print(f"Failed to find custom property for ARkit blendshape {_ARKIT_BLENDSHAPES[arkit_bs_idx]}")
-            pass
-
-    # this method actually sets the keyframe values via bpy
-    def update_keyframes(self):
-        # a bit slow to use bpy.context.object.data.shape_keys.keyframe_insert(datapath,frame=frame)
-        # (where datapath is 'key_blocks["MouthOpen"].value') 
-        # better to add a new fcurve for each shape key then set the points in one go        
-        frame_nums = list(range(len(self.sk_frames)))
-        print(frame_nums)
-        for i_sk,fc in enumerate(self.sk_fcurves):
-            frame_values = [self.sk_frames[i][i_sk] for i in frame_nums]
-            
-            frame_data = [x for co in zip(frame_nums, frame_values) for x in co]
-            print(f"frame-values len {len(frame_values)} frame_Data len {len(frame_data)}")
-            print(frame_data)
-            fc.keyframe_points.foreach_set('co',frame_data)
-            
-        for i_b,fc, in enumerate(self.custom_prop_fcurves):
-            frame_values = [self.custom_prop_frames[i][i_b] for i in frame_nums]
-            frame_data = [x for co in zip(frame_nums, frame_values) for x in co]
-            fc.keyframe_points.foreach_set('co',frame_data)
-       
+            self.sk_frames[frame, i_sk] = val
+        elif self.arkit_prop_idx[arkit_bs_idx] != -1:
+            self.custom_prop_frames[frame, self.arkit_prop_idx[arkit_bs_idx]] = val
+        # unmapped channels were already reported once when the target was set up
+
+    '''
+    Copies a (num_frames x len(_ARKIT_BLENDSHAPES)) matrix of ARKit weights into sk_frames and custom_prop_frames in one go, starting at frame [start].
+    Every mapped ARKit channel is scattered into its shape key (or custom property) column with a single fancy-indexing assignment.
+    The frame matrices grow if the frames run past their end.
+    '''
+    def set_frames(self, frames, start=0):
+        end = start + len(frames)
+        if end > len(self.sk_frames):
+            self.resize_frames(end)
+        mapped = self.arkit_sk_idx != -1
+        self.sk_frames[start:end, self.arkit_sk_idx[mapped]] = frames[:, mapped]
+        mapped = self.arkit_prop_idx != -1
+        self.custom_prop_frames[start:end, self.arkit_prop_idx[mapped]] = frames[:, mapped]
+
+    '''
+    Truncates the frame matrices to [num_frames], or pads them with rest-pose (zero) frames.
+    '''
+    def resize_frames(self, num_frames):
+        def resized(frames):
+            if num_frames <= len(frames):
+                return frames[:num_frames]
+            return np.concatenate([frames, np.zeros((num_frames - len(frames), frames.shape[1]), dtype=np.float32)])
+        self.sk_frames = resized(self.sk_frames)
+        self.custom_prop_frames = resized(self.custom_prop_frames)
+
     def create_action(self, action_name, num_frames):
-        # create a new Action so we can directly create fcurves and set the keyframe points
-        try:
-            self.sk_action = bpy.data.actions[f"{action_name}_shapekey"]
-        except: 
-            self.sk_action = bpy.data.actions.new(f"{action_name}_shapekey") 
-                
-        # create the bone AnimData if it doesn't exist 
-        # important - we create this on the target (e.g. bpy.context.object), not its data (bpy.context.object.data)
-        if self.target.animation_data is None:
-            self.target.animation_data_create()
-                                   
-        # create the shape key AnimData if it doesn't exist 
-        if self.target.data.shape_keys.animation_data is None:
-            self.target.data.shape_keys.animation_data_create()
-            
-        self.target.data.shape_keys.animation_data.action = self.sk_action
-        
-        self.sk_fcurves = []
-        self.custom_prop_fcurves = []
-        
-        for sk in self.target.data.shape_keys.key_blocks:
-            datapath = f"{sk.path_from_id()}.value"
-            
-            fc = self.sk_action.fcurves.find(datapath)
-            if fc is None:
-                print(f"Creating fcurve for shape key {sk.path_from_id()}")
-                fc = self.sk_action.fcurves.new(datapath)                
-                fc.keyframe_points.add(count=num_frames)
-            else:
-                print(f"Found fcurve for shape key {sk.path_from_id()}")
-            self.sk_fcurves += [fc]
-
-        #for custom_prop in self.custom_props:
-        #    datapath = f"[\"{custom_prop}\"]"
-        #    for i in range(num_frames):
-        #        self.target.keyframe_insert(datapath,frame=i)
-        #    self.custom_prop_fcurves += [fc for fc in self.target.animation_data.action.fcurves if fc.data_path == datapath]
-    
+        self.create_actions(bpy.data.actions, action_name, num_frames, self.arkit_sk_idx, self.new_actions)
+
     def update_to_frame(self, frame=0):
-        self.target.data.shape_keys.key_blocks.foreach_set("value", self.sk_frames[frame])        
-        for i,custom_prop in enumerate(self.custom_props):
-            self.target[custom_prop] = self.custom_prop_frames[frame][i]
+        # sk_frames[frame] is a contiguous float32 row, so foreach_set can copy it straight from the buffer
+        self.target.data.shape_keys.key_blocks.foreach_set("value", self.sk_frames[frame])
+        for custom_prop,val in zip(self.custom_props, self.custom_prop_frames[frame].tolist()):
+            self.target[custom_prop] = val
         self.target.data.shape_keys.user.update()
 
-def create_action_with_blendshapes(targets, frame_data, action_name="BlenderAIAnimatorAction"):
-    num_frames = len(frame_data)
-    animatable_objects = [AnimatableObject(t, num_frames, action_name=action_name) for t in targets]
-    for frame_num in range(num_frames):
-        for target in animatable_objects:
-            frame = frame_data[frame_num]
-            assert len(frame) == len(_ARKIT_BLENDSHAPES), f"Expected frame to contain {len(_ARKIT_BLENDSHAPES)} values, but {len(frame)} were found"
-            for arkit_bs_idx in range(len(frame)):
-                val = frame[arkit_bs_idx]
-                target.set_frame_value(arkit_bs_idx, frame_num, val)
+'''
+Bakes [frame_data] (one row of len(_ARKIT_BLENDSHAPES) weights per frame) into an action on each of [targets].
+The rows are packed into a single float32 matrix up front, each target copies the columns it can resolve into its own shape key matrix, 
+then every fcurve is written exactly once.
+[sparse], [drop_constant], [simplify_tolerance] and [new_actions] are passed through to each AnimatableObject.
+The first frame is keyed at scene frame [start_frame]. If [source_fps] (the rate of [frame_data]) and [target_fps] (the scene's rate) are passed,
+the frames are first resampled onto whole scene frames (see keyframes.conform_frames), in which case [start_frame] may be fractional.
+If a [timer] (timing.StageTimer) is passed, the time spent creating the actions, copying frames and writing keyframes is recorded to it.
+'''
+def create_action_with_blendshapes(targets, frame_data, action_name="BlenderAIAnimatorAction", sparse=False, drop_constant=False, simplify_tolerance=None, start_frame=0, source_fps=None, target_fps=None, new_actions=False, timer=NULL_TIMER):
+    frames = np.asarray(frame_data, dtype=np.float32)
+    if frames.size == 0:
+        frames = frames.reshape(0, len(_ARKIT_BLENDSHAPES))
+    assert frames.ndim == 2 and frames.shape[1] == len(_ARKIT_BLENDSHAPES), f"Expected each frame to contain {len(_ARKIT_BLENDSHAPES)} values, but frame data has shape {frames.shape}"
+    if source_fps is not None and target_fps is not None:
+        with timer.stage("bake_conform", num_frames=len(frames)):
+            frames, start_frame = conform_frames(frames, source_fps, target_fps, start_frame)
+    num_frames = frames.shape[0]
+    with timer.stage("bake_setup"):
+        animatable_objects = [AnimatableObject(t, num_frames, action_name=action_name, sparse=sparse, drop_constant=drop_constant, simplify_tolerance=simplify_tolerance, start_frame=start_frame, new_actions=new_actions) for t in targets]
+    for target in animatable_objects:
+        with timer.stage("bake_frames", num_frames=num_frames):
+            target.set_frames(frames)
+        with timer.stage("bake_keyframes", num_frames=num_frames):
             target.update_keyframes()
+    return animatable_objects
+
+'''
+Moves the actions baked on each of [animatable_objects] (shape keys, and custom properties if any were animated) into a new NLA track
+(named [strip_name]) starting at [start_frame], and clears the active action so the next bake doesn't overwrite it.
+Each call gets its own track, so strips that overlap in time don't collide (the upper track wins where they do).
+The object's own action (e.g. transform animation the custom-property action displaced) is made active again,
+unless it animates any of the baked custom properties, in which case it would override the strips.
+'''
+def push_actions_to_nla(animatable_objects, start_frame, strip_name):
+    for target in animatable_objects:
+        baked = [(target.target.data.shape_keys.animation_data, target.sk_action, None)]
+        if target.prop_action is not None:
+            restored = target.replaced_action
+            if restored is not None and any(restored.fcurves.find(path) is not None for path in target.custom_prop_paths):
+                restored = None
+            baked += [(target.target.animation_data, target.prop_action, restored)]
+        for animation_data, action, restored in baked:
+            track = animation_data.nla_tracks.new()
+            track.name = strip_name
+            track.strips.new(strip_name, int(start_frame), action)
+            animation_data.action = restored
+
+'''
+Bakes [frames] into new actions named after [action_name] on each of [targets] (see create_action_with_blendshapes, which the remaining keyword arguments are passed to)
+and pushes them to an NLA strip named [strip_name] at [start_frame] (see push_actions_to_nla). New actions are always created,
+so baking several strips (or re-baking one) never rewrites the action of a strip that is already in the NLA.
+'''
+def bake_to_nla(targets, frames, strip_name, start_frame, action_name, **kwargs):
+    animatable_objects = create_action_with_blendshapes(targets, frames, action_name=action_name, new_actions=True, **kwargs)
+    push_actions_to_nla(animatable_objects, start_frame, strip_name)
+    return animatable_objects
+
+'''
+Bakes frames into an action on each of [targets] progressively, as they arrive from a streamed inference response.
+The fcurves are created up front with [expected_frames] keyframe points (frames that haven't arrived yet sit at the rest pose),
+chunks are pushed from any thread with push(), and apply_pending() (called on the main thread, e.g. from a bpy.app.timers poll)
+copies the chunks received since the last call into the frame matrices and writes just those frames' keyframes (see FcurveBaker.update_keyframe_range),
+so a stream costs time in proportion to its length rather than to its length squared.
+finish() applies the last chunks, trims the clip to the frames actually received and runs the final (non-partial) bake.
+[start_frame], [source_fps] and [target_fps] work as in create_action_with_blendshapes. When converting frame rates, the frames received so far
+are kept at [source_fps] and every apply_pending() resamples the scene frames that interpolate between new source frames
+(plus the one or two before them, so chunk boundaries are interpolated across).
+Stage times are recorded to [timer] (see create_action_with_blendshapes). The remaining keyword arguments are passed through to each AnimatableObject.
+'''
+class ProgressiveBake:
+    def __init__(self, targets, expected_frames=0, action_name="BlenderAIAnimatorAction", start_frame=0, source_fps=None, target_fps=None, timer=NULL_TIMER, **kwargs):
+        self.timer = timer
+        self.start_frame = start_frame
+        self.framerates = (source_fps, target_fps) if source_fps is not None and target_fps is not None else None
+        self.source_frames = np.zeros((expected_frames, len(_ARKIT_BLENDSHAPES)), dtype=np.float32) if self.framerates else None
+        if self.framerates:
+            placeholder, start_frame = conform_frames(self.source_frames, *self.framerates, start_frame)
+            expected_frames = len(placeholder)
+        with timer.stage("bake_setup"):
+            self.animatable_objects = [AnimatableObject(t, expected_frames, action_name=action_name, start_frame=start_frame, **kwargs) for t in targets]
+            # lay out the rest-pose keyframes of every expected frame once, so each apply_pending() only has to overwrite the frames it received
+            for target in self.animatable_objects:
+                target.update_keyframes(partial=True)
+        self.num_received = 0
+        self.num_conformed = 0
+        self._pending = queue.SimpleQueue()
+
+    '''
+    Queues [frames] (num_frames x len(_ARKIT_BLENDSHAPES)) starting at frame [start]. Safe to call from a worker thread.
+    '''
+    def push(self, start, frames):
+        self._pending.put((start, np.asarray(frames, dtype=np.float32)))
+
+    def apply_pending(self):
+        # the first frame (at the incoming rate) that changed since the last call
+        first_changed = None
+        while True:
+            try:
+                start, frames = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if self.framerates:
+                self.store_source_frames(start, frames)
+            else:
+                for target in self.animatable_objects:
+                    target.set_frames(frames, start)
+            self.num_received = max(self.num_received, start + len(frames))
+            first_changed = start if first_changed is None else min(first_changed, start)
+        if first_changed is None:
+            return False
+        with self.timer.stage("bake_partial", num_frames=self.num_received):
+            first_row = self.conform_received(first_changed)
+            for target in self.animatable_objects:
+                target.update_keyframe_range(first_row, self.num_conformed)
+        return True
+
+    def store_source_frames(self, start, frames):
+        end = start + len(frames)
+        if end > len(self.source_frames):
+            self.source_frames = np.concatenate([self.source_frames, np.zeros((end - len(self.source_frames), self.source_frames.shape[1]), dtype=np.float32)])
+        self.source_frames[start:end] = frames
+
+    # resamples the frames received since source frame [first_changed] onto the targets (if converting frame rates),
+    # records the number of scene frames received so far and returns the first scene frame row that changed
+    def conform_received(self, first_changed=0):
+        if not self.framerates:
+            self.num_conformed = self.num_received
+            return first_changed
+        source_fps, target_fps = self.framerates
+        # scene row j interpolates source frames floor(p) and floor(p) + 1 at p >= j * step, so rows before this one never touch a changed frame
+        step = float(source_fps) / float(target_fps)
+        first_row = min(self.num_conformed, max(0, math.floor((first_changed - 1) / step) - 1))
+        with self.timer.stage("bake_conform", num_frames=self.num_received - first_changed):
+            frames, _ = conform_frames(self.source_frames[:self.num_received], source_fps, target_fps, self.start_frame, first_row)
+        for target in self.animatable_objects:
+            target.set_frames(frames, first_row)
+        self.num_conformed = first_row + len(frames)
+        return first_row
+
+    def finish(self):
+        self.apply_pending()
+        num_frames = self.num_conformed
+        with self.timer.stage("bake_keyframes", num_frames=num_frames):
+            for target in self.animatable_objects:
+                target.resize_frames(num_frames)
+                target.update_keyframes()
+        return self.animatable_objects
@@ -0,0 +1,216 @@
+import io
+import math
+import wave
+
+import numpy as np
+
+# WAV files are decoded in blocks of this many sample frames, so only the downmixed mono signal is ever held in memory in full
+_DECODE_BLOCK_FRAMES = 1 << 20
+
+# half-width of the windowed-sinc resampling filter, in samples at the lower of the two rates
+_RESAMPLE_HALF_WIDTH = 16
+
+# voice activity is measured over frames of this many seconds
+_VAD_FRAME_SECONDS = 0.02
+
+# frames quieter than this (in dBFS) are silent however quiet the loudest frame is, so near-silent files aren't treated as all speech
+_VAD_FLOOR_DB = -70.0
+
+# resampled output is computed in blocks of this many samples per filter phase, bounding the size of the (block x taps) matrix gathered from the input
+_RESAMPLE_BLOCK = 1 << 16
+
+'''
+Returns the duration in seconds of the WAV file at [path], or None if it isn't a WAV file the stdlib wave module can read.
+'''
+def wav_duration(path):
+    try:
+        with wave.open(path, "rb") as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError):
+        return None
+
+'''
+Splits [duration] seconds of audio into (start, end) windows of at most [window_seconds], each overlapping the previous one by [overlap_seconds].
+'''
+def split_windows(duration, window_seconds, overlap_seconds):
+    if overlap_seconds >= window_seconds:
+        raise ValueError(f"Window overlap ({overlap_seconds}s) must be shorter than the window ({window_seconds}s)")
+    step = window_seconds - overlap_seconds
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + window_seconds, duration)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start += step
+
+'''
+Returns the audio between [start] and [end] seconds of the WAV file at [path] as the bytes of a standalone WAV file in the same format.
+Only that window is read from disk.
+'''
+def read_wav_window(path, start, end):
+    with wave.open(path, "rb") as wav:
+        rate = wav.getframerate()
+        first = int(round(start * rate))
+        wav.setpos(first)
+        pcm = wav.readframes(int(round(end * rate)) - first)
+        params = wav.getparams()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setparams(params)
+        out.writeframes(pcm)
+    return buffer.getvalue()
+
+'''
+Converts little-endian PCM [data] with [sample_width] bytes per sample (8-bit unsigned, 16/24/32-bit signed) into float32 samples in [-1, 1).
+'''
+def pcm_to_float(data, sample_width):
+    if sample_width == 1:
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if sample_width == 2:
+        return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768
+    if sample_width == 3:
+        b = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        # assemble the 24-bit value in the top three bytes of an int32 so the arithmetic shift sign-extends it
+        return ((b[:, 0] << 8 | b[:, 1] << 16 | b[:, 2] << 24) >> 8).astype(np.float32) / 8388608
+    if sample_width == 4:
+        return np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648
+    raise ValueError(f"Unsupported WAV sample width {sample_width}")
+
+'''
+Decodes the WAV file [source] (a path or a file object) and downmixes it to mono.
+Returns the float32 samples and the sample rate.
+'''
+def read_wav_mono(source):
+    with wave.open(source, "rb") as wav:
+        num_channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        rate = wav.getframerate()
+        blocks = []
+        while True:
+            data = wav.readframes(_DECODE_BLOCK_FRAMES)
+            if not data:
+                break
+            blocks.append(pcm_to_float(data, sample_width).reshape(-1, num_channels).mean(axis=1, dtype=np.float32))
+    samples = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    return samples, rate
+
+'''
+Resamples the mono signal [samples] from [rate_in] to [rate_out] Hz with a Hann-windowed sinc filter
+(cut off at the lower of the two Nyquist frequencies, so downsampling doesn't alias).
+The output has round(len(samples) * rate_out / rate_in) samples, so the duration is preserved.
+Output sample k sits at input position k * rate_in / rate_out. With q / p the reduced ratio, every p-th output has the same fractional position
+and therefore the same filter kernel, so the outputs are computed per phase as strided matrix-vector products over a sliding-window view of the input.
+'''
+def resample(samples, rate_in, rate_out):
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate_in == rate_out or len(samples) == 0:
+        return samples
+    g = math.gcd(int(rate_in), int(rate_out))
+    q, p = int(rate_in) // g, int(rate_out) // g
+    num_out = int(round(len(samples) * p / q))
+    cutoff = min(1.0, p / q)
+    half = int(math.ceil(_RESAMPLE_HALF_WIDTH / cutoff))
+    taps = np.arange(-half + 1, half + 1)
+    padded = np.pad(samples, (half, half + q + 1))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half)
+    out = np.empty(num_out, dtype=np.float32)
+    for r in range(min(p, num_out)):
+        # output r + m * p reads input samples base + taps, where base = floor((r + m * p) * q / p) = floor(r * q / p) + m * q
+        first, frac = divmod(r * q, p)
+        d = taps - frac / p
+        kernel = np.sinc(cutoff * d) * (0.5 + 0.5 * np.cos(np.pi * d / half))
+        kernel = (kernel / kernel.sum()).astype(np.float32)
+        # row i of windows covers samples[i - half:i + half], so base + taps starts at row base + 1
+        rows = windows[first + 1::q][:len(range(r, num_out, p))]
+        phase = out[r::p]
+        for start in range(0, len(rows), _RESAMPLE_BLOCK):
+            phase[start:start + _RESAMPLE_BLOCK] = rows[start:start + _RESAMPLE_BLOCK] @ kernel
+    return out
+
+'''
+Converts float [samples] to the bytes of a 16-bit mono WAV file at [rate].
+'''
+def encode_wav(samples, rate):
+    pcm = np.clip(np.round(samples * 32767), -32768, 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+'''
+Decodes the WAV file [source] (a path or a file object), downmixes it to mono and resamples it to at most [sample_rate] Hz,
+returning the bytes of the resulting 16-bit mono WAV file and the duration (in seconds) of the original audio.
+Audio already at or below [sample_rate] keeps its rate.
+'''
+def compact_wav(source, sample_rate=16000):
+    samples, rate = read_wav_mono(source)
+    duration = len(samples) / rate
+    if rate > sample_rate:
+        samples, rate = resample(samples, rate, sample_rate), sample_rate
+    return encode_wav(samples, rate), duration
+
+'''
+Energy-based voice activity detection over the mono signal [samples] at [rate] Hz.
+A _VAD_FRAME_SECONDS frame is voiced if its energy is within [threshold_db] of the loudest frame (and above _VAD_FLOOR_DB).
+Voiced runs are padded by [padding_seconds] on both sides, and runs separated by less than [min_silence_seconds] of silence are merged,
+so short pauses between words aren't cut out.
+Returns the voiced regions as a list of (start, end) times in seconds (empty if the whole signal is silent).
+'''
+def voiced_regions(samples, rate, threshold_db=-40.0, min_silence_seconds=0.5, padding_seconds=0.2):
+    samples = np.asarray(samples, dtype=np.float32)
+    duration = len(samples) / rate
+    hop = max(int(round(rate * _VAD_FRAME_SECONDS)), 1)
+    num_frames = int(math.ceil(len(samples) / hop))
+    if num_frames == 0:
+        return []
+    # the last (partial) frame is zero-padded, which only ever makes it look quieter
+    frames = np.zeros(num_frames * hop, dtype=np.float32)
+    frames[:len(samples)] = samples
+    db = 10 * np.log10(np.square(frames.reshape(num_frames, hop)).mean(axis=1) + 1e-12)
+    voiced = (db > db.max() + threshold_db) & (db > _VAD_FLOOR_DB)
+    if not voiced.any():
+        return []
+    pad = int(round(padding_seconds / _VAD_FRAME_SECONDS))
+    if pad:
+        voiced = np.convolve(voiced, np.ones(2 * pad + 1), mode='same') > 0
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], voiced.astype(np.int8), [0]])))
+    starts, ends = edges[0::2], edges[1::2]
+    merge = starts[1:] - ends[:-1] < min_silence_seconds / _VAD_FRAME_SECONDS
+    starts = np.concatenate([starts[:1], starts[1:][~merge]])
+    ends = np.concatenate([ends[:-1][~merge], ends[-1:]])
+    return [(start * hop / rate, min(end * hop / rate, duration)) for start, end in zip(starts.tolist(), ends.tolist())]
+
+'''
+Joins per-window frame matrices back into one (num_frames x num_channels) matrix.
+[segments][i] starts at frame [offsets][i] of the whole clip. Where consecutive windows overlap, the earlier window is faded out
+and the later one faded in linearly over the overlapping frames, so there are no jumps at window boundaries.
+'''
+def stitch_windows(segments, offsets):
+    # windows the server returned no frames for (e.g. shorter than one frame) don't contribute anything
+    pairs = [(np.asarray(segment, dtype=np.float32), offset) for segment, offset in zip(segments, offsets) if len(segment)]
+    segments = [segment for segment, _ in pairs]
+    offsets = [offset for _, offset in pairs]
+    if not segments:
+        return np.zeros((0, 0), dtype=np.float32)
+    num_channels = segments[0].shape[1]
+    num_frames = max(offset + len(segment) for segment, offset in zip(segments, offsets))
+    total = np.zeros((num_frames, num_channels), dtype=np.float32)
+    weight = np.zeros(num_frames, dtype=np.float32)
+    for i, (segment, offset) in enumerate(zip(segments, offsets)):
+        w = np.ones(len(segment), dtype=np.float32)
+        if i > 0:
+            overlap = min(max(offsets[i - 1] + len(segments[i - 1]) - offset, 0), len(segment))
+            # ramps exclude both end points, so the two windows' weights sum to exactly 1 across the overlap
+            w[:overlap] = np.arange(1, overlap + 1, dtype=np.float32) / (overlap + 1)
+        if i < len(segments) - 1:
+            overlap = min(max(offset + len(segment) - offsets[i + 1], 0), len(segment))
+            if overlap:
+                w[len(segment) - overlap:] = np.minimum(w[len(segment) - overlap:], np.arange(overlap, 0, -1, dtype=np.float32) / (overlap + 1))
+        total[offset:offset + len(segment)] += segment * w[:, None]
+        weight[offset:offset + len(segment)] += w
+    return total / np.maximum(weight, 1e-6)[:, None]
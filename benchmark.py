@@ -0,0 +1,90 @@
+'''
+Benchmarks for the baking pipeline. The bake benchmarks need a running Blender, so run them headless with the add-on installed:
+
+    blender --background --factory-startup --python benchmark.py
+
+bpy is only imported by those, so outside Blender (e.g. `python -m ai_animator.benchmark`) only the timecode benchmark runs.
+Each benchmark prints one line per measurement so the numbers can be diffed between runs.
+'''
+import importlib.util
+import time
+
+import numpy as np
+
+from ai_animator.arkit import _ARKIT_BLENDSHAPES
+from ai_animator.pylivelinkface import PyLiveLinkFace, seconds_since_midnight
+from ai_animator.timecode import CompactTimecode, Timecode
+
+'''
+Creates a mesh object with a Basis key, one shape key per ARKit blendshape and [num_extra] unrelated (corrective) shape keys.
+'''
+def create_benchmark_target(name="AIAnimatorBenchmarkHead", num_extra=20):
+    import bpy
+    bpy.ops.mesh.primitive_cube_add()
+    obj = bpy.context.object
+    obj.name = name
+    obj.shape_key_add(name="Basis")
+    for bs in _ARKIT_BLENDSHAPES:
+        obj.shape_key_add(name=bs)
+    for i in range(num_extra):
+        obj.shape_key_add(name=f"corrective_{i:03d}")
+    return obj
+
+def remove_actions(prefix):
+    import bpy
+    for action in [a for a in bpy.data.actions if a.name.startswith(prefix)]:
+        bpy.data.actions.remove(action)
+
+'''
+Times create_action_with_blendshapes for clips of increasing length at [fps].
+Baking should scale near-linearly, i.e. the time per frame should stay roughly flat as the clip grows.
+'''
+def bench_bake(minutes=(0.5, 1, 2.5, 5, 10), fps=60, repeats=3):
+    from ai_animator.action import create_action_with_blendshapes
+
+    target = create_benchmark_target()
+    rng = np.random.default_rng(0)
+    baseline = None
+    for m in minutes:
+        num_frames = int(m * 60 * fps)
+        frame_data = rng.random((num_frames, len(_ARKIT_BLENDSHAPES)), dtype=np.float32)
+        best = None
+        for _ in range(repeats):
+            action_name = f"AIAnimatorBenchmark_{num_frames}"
+            remove_actions(action_name)
+            start = time.perf_counter()
+            create_action_with_blendshapes([target], frame_data, action_name=action_name)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        per_frame_us = best / num_frames * 1e6
+        if baseline is None:
+            baseline = per_frame_us
+        print(f"bake {m:>5} min @ {fps} fps ({num_frames:>6} frames): {best:8.3f} s, {per_frame_us:7.2f} us/frame, {per_frame_us / baseline:5.2f}x baseline per-frame cost")
+
+'''
+Times stamping one LiveLinkFace packet with a timecode, per call: the old way of formatting the wall-clock time as a string and parsing it into a Timecode,
+CompactTimecode.from_seconds, and a whole PyLiveLinkFace.encode (which now uses the latter).
+'''
+def bench_timecode(calls=100000, fps=60):
+    def per_call_us(fn):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        return (time.perf_counter() - start) / calls * 1e6
+
+    seconds = seconds_since_midnight()
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    # the string PyLiveLinkFace used to build for every packet
+    timecode = f"{int(hours)}:{int(minutes)}:{int(secs)}:{secs % 1 * 1000}"
+    before = per_call_us(lambda: Timecode(fps, timecode).frames)
+    after = per_call_us(lambda: CompactTimecode.from_seconds(fps, seconds).frames)
+    face = PyLiveLinkFace(fps=fps)
+    encode = per_call_us(face.encode)
+    print(f"timecode @ {fps} fps: Timecode from string {before:6.2f} us/call, CompactTimecode.from_seconds {after:6.2f} us/call ({before / after:5.1f}x), "
+          f"PyLiveLinkFace.encode {encode:6.2f} us/call")
+
+if __name__ == "__main__":
+    if importlib.util.find_spec("bpy") is not None:
+        bench_bake()
+    bench_timecode()
@@ -3,17 +3,29 @@ import socket
 import bpy 
 import csv
 import random 
+import numpy as np
 
-from livelinkface.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from ai_animator.pylivelinkface import PyLiveLinkFace, FaceBlendShape
+from ai_animator.capture import LIVE_LINK_FACE_HEADER, load_capture, place_frames, read_livelink_csv
+from ai_animator.keyframes import FcurveBaker
+from ai_animator.timecode import Timecode
 
-class Client:
-
-    def __init__(self):
+'''
+Places the rows of [frames] by their LiveLinkFace [timecodes] (e.g. b'12:01:44:21.483') at [framerate] (anything Timecode accepts, e.g. "60" or "59.94"),
+with all of the timecodes converted to frame numbers in one vectorized pass. The earliest timecode lands on frame 0, and frames the capture app dropped are
+interpolated rather than the rows after them being shifted earlier (see capture.place_frames). Returns the placed frames and the number of dropped frames.
+'''
+def place_by_timecode(frames, timecodes, framerate):
+    frame_numbers = Timecode(framerate).tc_array_to_frames(timecodes)
+    frames, _, dropped = place_frames(frames, frame_numbers)
+    if dropped:
+        print(f"Filled in {dropped} dropped frames")
+    return frames, dropped
 
 '''
 Interface for looking up shape key/custom properties by name and setting their respective weights on frames.
 '''
-class LiveLinkTarget:
+class LiveLinkTarget(FcurveBaker):
 
     '''
     Construct an instance to manipulate frames on a single target object (which is an object within the Blender context).
@@ -21,18 +33,26 @@ class LiveLinkTarget:
     If you are streaming, pass num_frames=0 (or simply don't pass anything for the parameter and leave empty).
     The target should have at least one shape key or custom property with a name that corresponds to one of the entries in LIVE_LINK_FACE_HEADER.
     An exception will be raised if neither of these are present.
+    If [sparse] is True, fcurves are only created for shape keys that a LiveLinkFace blendshape maps to (so Basis and correctives are left unanimated).
+    If [drop_constant] is True, shape key fcurves whose value never changes over the clip are removed when keyframes are written
+    and the constant is set directly on the shape key instead.
+    If [simplify_tolerance] is set, keyframes are reduced (see keyframes.simplify_channels) so no channel deviates from the baked values by more than the tolerance.
     '''
-    def __init__(self, target, num_frames=0, action_name=None):
+    def __init__(self, target, num_frames=0, action_name=None, sparse=False, drop_constant=False, simplify_tolerance=None):
         
         self.target = target
+        self.sparse = sparse
+        self.drop_constant = drop_constant
+        self.simplify_tolerance = simplify_tolerance
                 
         # first, let's create a placeholder for all shape keys that exist on the target mesh
-        # sk_frames is a list where each entry (itself a list) represents one frame
-        # each frame will contain N values (where N is the number of shape keys in the target mesh)
+        # sk_frames is a (num_frames x N) float32 matrix where each row represents one frame
+        # and N is the number of shape keys in the target mesh
+        # rows are contiguous, so a single frame can be handed straight to foreach_set
         # (note this will also create keyframes for non-LiveLinkFace shape keys on the mesh)
         # I can't find a better way to check if an object has shapekeys, so just use try-except
         try:
-            self.sk_frames = [ [0] * len(self.target.data.shape_keys.key_blocks) for _ in range(num_frames) ] 
+            self.sk_frames = np.zeros((num_frames, len(self.target.data.shape_keys.key_blocks)), dtype=np.float32)
         except:
             self.sk_frames = None
         # some ARKit blendshapes may drive bone rotations, rather than mesh-deforming shape keys
@@ -53,7 +73,17 @@ class LiveLinkTarget:
                 self.custom_props += [ k ] 
                 
         print(f"Set custom_props to {self.custom_props}")
-        self.custom_prop_frames = [[0] * len(self.custom_props) for _ in range(num_frames)]
+        self.custom_prop_frames = np.zeros((num_frames, len(self.custom_props)), dtype=np.float32)
+
+        # resolve every LiveLinkFace channel to its shape key index and custom property column up front (-1 where there is none)
+        # so whole frame matrices can be scattered into sk_frames/custom_prop_frames without any name lookups (see set_frames)
+        num_channels = len(LIVE_LINK_FACE_HEADER) - 2
+        self.ll_sk_idx = np.array([self.livelink_to_shapekey_idx(i) if self.sk_frames is not None else -1 for i in range(num_channels)], dtype=np.int64)
+        self.ll_prop_idx = np.full(num_channels, -1, dtype=np.int64)
+        for i in np.flatnonzero(self.ll_sk_idx == -1).tolist():
+            custom_prop = self.livelink_to_custom_prop(i)
+            if custom_prop is not None:
+                self.ll_prop_idx[i] = self.custom_props.index(custom_prop)
                 
         print(f"Created {len(self.custom_prop_frames)} frames for {len(self.custom_props)} custom properties")
         if action_name is not None:
@@ -88,110 +118,63 @@ class LiveLinkTarget:
             
     '''Sets the value for the LiveLink blendshape at index [i_ll] to [val] for frame [frame] (note the underlying target may be a blendshape or a bone).'''
     def set_frame_value(self, i_ll, frame, val):
-        i_sk = self.livelink_to_shapekey_idx(i_ll)
+        i_sk = self.ll_sk_idx[i_ll]
         
         if i_sk != -1:
-            self.sk_frames[frame][i_sk] = val
-        else:
-            custom_prop = self.livelink_to_custom_prop(i_ll)
-            if custom_prop is not None:
-                custom_prop_idx =self.custom_props.index(custom_prop)
-                self.custom_prop_frames[frame][custom_prop_idx] = val
-            else:
-#                print(f"Failed to find custom property for ARkit blendshape id {i_ll}")
-                pass
+            self.sk_frames[frame, i_sk] = val
+        elif self.ll_prop_idx[i_ll] != -1:
+            self.custom_prop_frames[frame, self.ll_prop_idx[i_ll]] = val
 
-    '''Loads a CSV in LiveLinkFace format. First line is the header (Timecode,BlendshapeCount,etc,etc), every line thereafter is a single frame with comma-separated weights'''
-    @staticmethod
-    def from_csv(targets,path,action_name="LiveLinkAction",use_first_frame_as_zero=False):        
-        with open(path,"r") as csv_file:
-            csvdata = list(csv.reader(csv_file))
+    '''
+    Copies a (num_frames x (len(LIVE_LINK_FACE_HEADER) - 2)) matrix of LiveLinkFace weights into sk_frames and custom_prop_frames, starting at frame [start].
+    Every channel is scattered into its shape key (or custom property) column with one fancy-indexing assignment per matrix.
+    '''
+    def set_frames(self, frames, start=0):
+        end = start + len(frames)
+        mapped = self.ll_sk_idx != -1
+        if self.sk_frames is not None:
+            self.sk_frames[start:end, self.ll_sk_idx[mapped]] = frames[:, mapped]
+        mapped = self.ll_prop_idx != -1
+        self.custom_prop_frames[start:end, self.ll_prop_idx[mapped]] = frames[:, mapped]
 
-        num_frames = len(csvdata) - 1
+    '''
+    Loads a CSV in LiveLinkFace format. First line is the header (Timecode,BlendshapeCount,etc,etc), every line thereafter is a single frame with comma-separated weights.
+    The weights are parsed straight into a float32 matrix (see capture.read_livelink_csv), the rest frame is subtracted from the whole matrix at once
+    if [use_first_frame_as_zero] is set, and each target copies it in with set_frames before its fcurves are written in bulk.
+    If [use_sidecar] is set the parsed take is cached in a binary sidecar next to the CSV, which later imports memory-map instead of re-parsing (see capture.load_capture).
+    If [timecode_framerate] is set (the rate of the CSV timecodes, e.g. "60"), rows are placed by their timecodes and dropped frames filled in (see place_by_timecode).
+    '''
+    @staticmethod
+    def from_csv(targets,path,action_name="LiveLinkAction",use_first_frame_as_zero=False,sparse=False,drop_constant=False,simplify_tolerance=None,use_sidecar=True,timecode_framerate=None):        
+        capture = load_capture(path) if use_sidecar else read_livelink_csv(path)
+        frames = capture.relative_to_first_frame() if use_first_frame_as_zero else capture.frames
+        if timecode_framerate and len(capture.timecodes):
+            frames, _ = place_by_timecode(frames, capture.timecodes, timecode_framerate)
+        return LiveLinkTarget.from_frames(targets, frames, action_name=action_name, sparse=sparse, drop_constant=drop_constant, simplify_tolerance=simplify_tolerance)
 
-        targets = [LiveLinkTarget(target, num_frames, action_name=action_name) for target in targets]
-        for idx,blendshape in enumerate(LIVE_LINK_FACE_HEADER):
-            if idx < 2:
-                continue
-            
-            rest_weight = float(csvdata[1][idx])
-                        
-            for i in range(1, num_frames):
-                val = float(csvdata[i][idx])
-                if use_first_frame_as_zero:
-                    val -= rest_weight
-                for target in targets:
-                    ll_idx = idx - 2
-                    frame=i-1
-                    target.set_frame_value(ll_idx, i, val)
+    '''
+    Bakes [frames] (a matrix of LiveLinkFace weights, e.g. capture.Capture.frames) into an action named [action_name] on each of [targets],
+    with one set_frames copy and one bulk fcurve write per target.
+    '''
+    @staticmethod
+    def from_frames(targets,frames,action_name="LiveLinkAction",sparse=False,drop_constant=False,simplify_tolerance=None):
+        num_frames = len(frames)
 
+        targets = [LiveLinkTarget(target, num_frames, action_name=action_name, sparse=sparse, drop_constant=drop_constant, simplify_tolerance=simplify_tolerance) for target in targets]
         for target in targets:
+            target.set_frames(frames)
             target.update_keyframes()
         
         return targets
     
-    # this method actually sets the keyframe values via bpy
-    def update_keyframes(self):
-        # a bit slow to use bpy.context.object.data.shape_keys.keyframe_insert(datapath,frame=frame)
-        # (where datapath is 'key_blocks["MouthOpen"].value') 
-        # better to add a new fcurve for each shape key then set the points in one go        
-        frame_nums = list(range(len(self.sk_frames)))
-
-        for i_sk,fc in enumerate(self.sk_fcurves):
-            frame_values = [self.sk_frames[i][i_sk] for i in frame_nums]
-            frame_data = [x for co in zip(frame_nums, frame_values) for x in co]
-            fc.keyframe_points.foreach_set('co',frame_data)
-            
-        for i_b,fc, in enumerate(self.custom_prop_fcurves):
-            frame_values = [self.custom_prop_frames[i][i_b] for i in frame_nums]
-            frame_data = [x for co in zip(frame_nums, frame_values) for x in co]
-            fc.keyframe_points.foreach_set('co',frame_data)
-       
     def create_action(self, action_name, num_frames):
-    
-        # create a new Action so we can directly create fcurves and set the keyframe points
-        try:
-            self.sk_action = bpy.data.actions[f"{action_name}_shapekey"]
-        except: 
-            self.sk_action = bpy.data.actions.new(f"{action_name}_shapekey") 
-                
-        # create the bone AnimData if it doesn't exist 
-        # important - we create this on the target (e.g. bpy.context.object), not its data (bpy.context.object.data)
-        if self.target.animation_data is None:
-            self.target.animation_data_create()
-                                   
-        # create the shape key AnimData if it doesn't exist 
-        if self.target.data.shape_keys.animation_data is None:
-            self.target.data.shape_keys.animation_data_create()
-            
-        self.target.data.shape_keys.animation_data.action = self.sk_action
-        
-        self.sk_fcurves = []
-        self.custom_prop_fcurves = []
-        
-        for sk in self.target.data.shape_keys.key_blocks:
-            datapath = f"{sk.path_from_id()}.value"
-            
-            fc = self.sk_action.fcurves.find(datapath)
-            if fc is None:
-                print(f"Creating fcurve for shape key {sk.path_from_id()}")
-                fc = self.sk_action.fcurves.new(datapath)                
-                fc.keyframe_points.add(count=num_frames)
-            else:
-                print(f"Found fcurve for shape key {sk.path_from_id()}")
-            self.sk_fcurves += [fc]
-
-        for custom_prop in self.custom_props:
-            datapath = f"[\"{custom_prop}\"]"
-            for i in range(num_frames):
-                self.target.keyframe_insert(datapath,frame=i)
-            self.custom_prop_fcurves += [fc for fc in self.target.animation_data.action.fcurves if fc.data_path == datapath]
-    
-       
+        self.create_actions(bpy.data.actions, action_name, num_frames, self.ll_sk_idx)
+
     def update_to_frame(self, frame=0):
-        self.target.data.shape_keys.key_blocks.foreach_set("value", self.sk_frames[frame])        
-        for i,custom_prop in enumerate(self.custom_props):
-            self.target[custom_prop] = self.custom_prop_frames[frame][i]
+        # sk_frames[frame] is a contiguous float32 row, so foreach_set can copy it straight from the buffer
+        self.target.data.shape_keys.key_blocks.foreach_set("value", self.sk_frames[frame])
+        for custom_prop,val in zip(self.custom_props, self.custom_prop_frames[frame].tolist()):
+            self.target[custom_prop] = val
         self.target.data.shape_keys.user.update()
 
 class LiveLinkFaceServer:
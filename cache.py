@@ -0,0 +1,162 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+# audio is hashed in blocks of this many bytes, so hashing doesn't load whole stems into memory
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# used when no cache directory is configured in the add-on preferences
+DEFAULT_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "ai_animator_cache")
+
+_SUFFIX = ".npy"
+
+'''
+Content-addressed on-disk cache of inference results.
+Entries are keyed by a hash of the audio bytes plus a namespace (the model version and the endpoints that serve it),
+so re-running generation on the same audio skips the upload and inference entirely.
+Each entry is the returned (num_frames x num_channels) float32 matrix saved as a .npy file.
+Once the cache grows past [max_bytes] the least recently used entries (by file mtime, which is bumped on every hit) are evicted.
+The number of entries and their total size are kept as running totals (counted once when the cache is created and updated by put/evict/clear),
+so stats() and puts that don't need to evict never list the directory.
+'''
+class InferenceCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._count_entries(self._entries())
+
+    '''
+    Returns the cache key for the audio at [audio_filepath] under [namespace].
+    '''
+    def key_for(self, audio_filepath, namespace=""):
+        digest = hashlib.sha256()
+        digest.update(namespace.encode("utf-8"))
+        digest.update(b"\0")
+        with open(audio_filepath, "rb") as infile:
+            for chunk in iter(lambda: infile.read(_HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    '''
+    Returns the cached frame matrix for [key], or None on a miss.
+    '''
+    def get(self, key):
+        path = self._path(key)
+        try:
+            frames = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return frames
+
+    '''
+    Stores [frames] under [key] and evicts least recently used entries if the cache is now over its size limit.
+    '''
+    def put(self, key, frames):
+        path = self._path(key)
+        # write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as outfile:
+            np.save(outfile, np.asarray(frames, dtype=np.float32), allow_pickle=False)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            try:
+                # an existing entry for the same key is replaced, so only the difference is added
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = None
+            os.replace(tmp_path, path)
+            if replaced is None:
+                self.num_entries += 1
+                self.num_bytes += size
+            else:
+                self.num_bytes += size - replaced
+        self.evict()
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def _count_entries(self, entries):
+        self.num_entries = len(entries)
+        self.num_bytes = sum(size for _, size, _ in entries)
+
+    '''
+    Removes the least recently used entries until the cache fits in max_bytes.
+    The directory is only listed once the running total is over the limit, and that listing also resyncs the totals
+    (e.g. with entries written or removed by another Blender instance sharing the directory).
+    '''
+    def evict(self):
+        with self._lock:
+            if self.num_bytes <= self.max_bytes:
+                return
+            entries = sorted(self._entries())
+            self._count_entries(entries)
+            for _, size, name in entries:
+                if self.num_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                self.num_entries -= 1
+                self.num_bytes -= size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for _, _, name in self._entries():
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self._count_entries(self._entries())
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits":self.hits,
+                "misses":self.misses,
+                "hit_rate":self.hits / lookups if lookups else 0.0,
+                "evictions":self.evictions,
+                "entries":self.num_entries,
+                "bytes":self.num_bytes,
+            }
+
+# caches are shared per directory so hit/miss stats accumulate across generations
+_CACHES = {}
+
+'''
+Returns the shared InferenceCache for [directory] (creating it if needed), with its size limit set to [max_bytes].
+'''
+def get_cache(directory=DEFAULT_CACHE_DIRECTORY, max_bytes=512 * 1024 * 1024):
+    directory = os.path.abspath(directory or DEFAULT_CACHE_DIRECTORY)
+    cache = _CACHES.get(directory)
+    if cache is None:
+        cache = _CACHES[directory] = InferenceCache(directory, max_bytes)
+    cache.max_bytes = max_bytes
+    return cache
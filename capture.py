@@ -0,0 +1,260 @@
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# column layout of a LiveLinkFace capture CSV: the timecode and blendshape count, then one column per channel in FaceBlendShape order
+LIVE_LINK_FACE_HEADER = ['Timecode', 'BlendShapeCount', 'EyeBlinkLeft', 'EyeLookDownLeft', 'EyeLookInLeft', 'EyeLookOutLeft', 'EyeLookUpLeft', 'EyeSquintLeft', 'EyeWideLeft', 'EyeBlinkRight', 'EyeLookDownRight', 'EyeLookInRight', 'EyeLookOutRight', 'EyeLookUpRight', 'EyeSquintRight', 'EyeWideRight', 'JawForward', 'JawLeft', 'JawRight', 'JawOpen', 'MouthClose', 'MouthFunnel', 'MouthPucker', 'MouthLeft', 'MouthRight', 'MouthSmileLeft', 'MouthSmileRight', 'MouthFrownLeft', 'MouthFrownRight', 'MouthDimpleLeft', 'MouthDimpleRight', 'MouthStretchLeft', 'MouthStretchRight', 'MouthRollLower', 'MouthRollUpper', 'MouthShrugLower', 'MouthShrugUpper', 'MouthPressLeft', 'MouthPressRight', 'MouthLowerDownLeft', 'MouthLowerDownRight', 'MouthUpperUpLeft', 'MouthUpperUpRight', 'BrowDownLeft', 'BrowDownRight', 'BrowInnerUp', 'BrowOuterUpLeft', 'BrowOuterUpRight', 'CheekPuff', 'CheekSquintLeft', 'CheekSquintRight', 'NoseSneerLeft', 'NoseSneerRight', 'TongueOut', 'HeadYaw', 'HeadPitch', 'HeadRoll', 'LeftEyeYaw', 'LeftEyePitch', 'LeftEyeRoll', 'RightEyeYaw', 'RightEyePitch', 'RightEyeRoll']
+
+# the weight channels, i.e. the columns of the frame matrices returned below
+LIVE_LINK_FACE_CHANNELS = LIVE_LINK_FACE_HEADER[2:]
+
+# CSV rows are parsed in blocks of this many lines, so the text of a multi-hour take is never held in memory all at once
+_PARSE_BLOCK_LINES = 1 << 16
+
+# bumped whenever the sidecar layout changes, so sidecars written by older versions are re-parsed rather than misread
+_SIDECAR_VERSION = 1
+
+'''
+A LiveLinkFace take loaded into memory: [frames] is a (num_frames x len(LIVE_LINK_FACE_CHANNELS)) float32 matrix with one row per CSV row,
+and [timecodes] is a bytes array of the row timecode strings (e.g. b'12:01:44:21.483', empty if the CSV has no Timecode column).
+Captures loaded from a sidecar (see load_capture) hold read-only views into the memory-mapped sidecar rather than copies.
+'''
+class Capture:
+    def __init__(self, frames, timecodes):
+        self.frames = frames
+        self.timecodes = timecodes
+
+    def __len__(self):
+        return len(self.frames)
+
+    '''
+    Returns the frames with the first (rest) frame subtracted from every frame, e.g. to remove the neutral expression of the performer.
+    '''
+    def relative_to_first_frame(self):
+        if len(self.frames) == 0:
+            return self.frames
+        return self.frames - self.frames[:1]
+
+'''
+Resolves the columns of a CSV [header] to LIVE_LINK_FACE_CHANNELS, returning the CSV column index of each channel in order.
+Columns are matched by name, so files that reorder or add columns still load. Raises ValueError if a channel is missing.
+'''
+def channel_columns(header):
+    names = [name.strip() for name in header]
+    missing = [name for name in LIVE_LINK_FACE_CHANNELS if name not in names]
+    if missing:
+        more = f" and {len(missing) - 5} more" if len(missing) > 5 else ""
+        raise ValueError(f"Not a LiveLinkFace CSV, missing columns : {', '.join(missing[:5])}{more}")
+    return [names.index(name) for name in LIVE_LINK_FACE_CHANNELS]
+
+'''
+Parses the LiveLinkFace CSV at [path] into a Capture.
+Lines are read in blocks of _PARSE_BLOCK_LINES and each block is converted straight to float32 by np.loadtxt
+(only the timecode, i.e. the text before the first comma, is split off in Python), so there is no per-cell float() call.
+'''
+def read_livelink_csv(path):
+    blocks = []
+    timecodes = []
+    with open(path, "r", newline="") as csv_file:
+        header = csv_file.readline().rstrip("\r\n").split(",")
+        columns = channel_columns(header)
+        timecode_column = header.index("Timecode") if "Timecode" in header else None
+        while True:
+            lines = list(itertools.islice(csv_file, _PARSE_BLOCK_LINES))
+            if not lines:
+                break
+            lines = [line for line in lines if line.strip()]
+            if not lines:
+                continue
+            blocks.append(np.loadtxt(lines, delimiter=",", usecols=columns, dtype=np.float32, ndmin=2))
+            if timecode_column == 0:
+                timecodes += [line.split(",", 1)[0] for line in lines]
+            elif timecode_column is not None:
+                timecodes += [line.rstrip("\r\n").split(",")[timecode_column] for line in lines]
+    frames = np.concatenate(blocks) if blocks else np.zeros((0, len(LIVE_LINK_FACE_CHANNELS)), dtype=np.float32)
+    return Capture(frames, np.asarray(timecodes, dtype=bytes))
+
+'''
+Returns the paths of the binary sidecar for the CSV at [path]: the .npy holding the parsed rows and the .json describing the source it was parsed from.
+'''
+def sidecar_paths(path):
+    return f"{path}.npy", f"{path}.json"
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {"version":_SIDECAR_VERSION, "source_size":st.st_size, "source_mtime_ns":st.st_mtime_ns}
+
+'''
+Writes [capture] (parsed from the CSV at [path]) to its sidecar. The rows are saved as one .npy of (timecode, frame) records,
+so a single memory map serves both, and the .json records the source size and mtime the sidecar is valid for.
+The .json is written last (both via a temporary file and os.replace), so a sidecar is never picked up half-written.
+Pass [source_stat] (from before the CSV was parsed) so a CSV modified while it was being parsed isn't recorded as up to date.
+'''
+def write_sidecar(path, capture, source_stat=None):
+    npy_path, json_path = sidecar_paths(path)
+    width = max(capture.timecodes.dtype.itemsize, 1)
+    records = np.empty(len(capture), dtype=[("timecode", f"S{width}"), ("frames", "<f4", (len(LIVE_LINK_FACE_CHANNELS),))])
+    if len(capture.timecodes):
+        records["timecode"] = capture.timecodes
+    records["frames"] = capture.frames
+    suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(npy_path + suffix, "wb") as outfile:
+        np.save(outfile, records)
+    os.replace(npy_path + suffix, npy_path)
+    with open(json_path + suffix, "w") as outfile:
+        json.dump(dict(source_stat or _source_stat(path), num_frames=len(capture), has_timecodes=bool(len(capture.timecodes))), outfile)
+    os.replace(json_path + suffix, json_path)
+
+'''
+Returns the Capture stored in the sidecar of the CSV at [path], memory-mapped so nothing is read until it is used,
+or None if there is no sidecar or it is stale (the CSV's size or mtime has changed since it was written).
+'''
+def read_sidecar(path):
+    npy_path, json_path = sidecar_paths(path)
+    try:
+        with open(json_path, "r") as infile:
+            meta = json.load(infile)
+        if any(meta.get(key) != value for key, value in _source_stat(path).items()):
+            return None
+        records = np.load(npy_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if len(records) != meta["num_frames"]:
+        return None
+    timecodes = records["timecode"] if meta["has_timecodes"] else np.zeros(0, dtype=bytes)
+    return Capture(records["frames"], timecodes)
+
+'''
+Loads the LiveLinkFace CSV at [path], from its sidecar if there is an up-to-date one.
+Otherwise the CSV is parsed and (if [write] is set) a sidecar is written next to it for next time;
+failing to write one (e.g. in a read-only capture library) only prints a warning.
+'''
+def load_capture(path, write=True):
+    capture = read_sidecar(path)
+    if capture is not None:
+        return capture
+    source_stat = _source_stat(path)
+    capture = read_livelink_csv(path)
+    if write:
+        try:
+            write_sidecar(path, capture, source_stat)
+        except OSError as e:
+            print(f"Failed to write sidecar for {path} : {e}")
+    return capture
+
+
+'''
+Places the rows of [frames] at their [frame_numbers] (e.g. the capture's timecodes converted with Timecode.tc_array_to_frames)
+instead of assuming the rows are consecutive frames. Frames missing between the first and last frame number (dropped by the capture app)
+are interpolated linearly from the captured frames either side, and where several rows share a frame number the last one wins.
+Returns the placed frames, the frame number of the first of them and the number of dropped frames that were filled in.
+'''
+def place_frames(frames, frame_numbers):
+    frame_numbers = np.asarray(frame_numbers, dtype=np.int64)
+    if len(frame_numbers) != len(frames):
+        raise ValueError(f"Got {len(frame_numbers)} frame numbers for {len(frames)} frames")
+    if len(frames) == 0:
+        return frames, 0, 0
+    order = np.argsort(frame_numbers, kind="stable")
+    numbers = frame_numbers[order]
+    # the last row of each run of equal frame numbers
+    last = np.append(numbers[1:] != numbers[:-1], True)
+    numbers, rows = numbers[last], order[last]
+    first = int(numbers[0])
+    offsets = numbers - first
+    num_frames = int(offsets[-1]) + 1
+    if num_frames == len(frames) and (rows == np.arange(len(frames))).all():
+        # already one row per frame, in order: keep the (possibly memory-mapped) frames as they are
+        return frames, first, 0
+    placed = np.empty((num_frames,) + frames.shape[1:], dtype=np.float32)
+    placed[offsets] = frames[rows]
+    dropped = num_frames - len(offsets)
+    if dropped:
+        missing = np.ones(num_frames, dtype=bool)
+        missing[offsets] = False
+        missing = np.flatnonzero(missing)
+        after = np.searchsorted(offsets, missing)
+        before = after - 1
+        t = ((missing - offsets[before]) / (offsets[after] - offsets[before])).astype(np.float32)
+        placed[missing] = placed[offsets[before]] + (placed[offsets[after]] - placed[offsets[before]]) * t[:, None]
+    return placed, first, dropped
+
+'''
+Parses the LiveLinkFace CSVs at [paths] in up to [max_workers] child processes (this module run as a script, so they need neither Blender nor bpy).
+Each worker writes the take's sidecar, so the parsed frames never have to be sent back: load the takes with load_capture afterwards,
+which memory-maps the fresh sidecars. Paths are handed out one at a time as workers become free, so one long take doesn't hold up the rest.
+[progress] (if passed) is called with (path, result) as each take finishes, from a thread of this process; whatever it raises stops the parse.
+Returns a dict of path -> result, a dict with "num_frames", "seconds" (spent in the worker), "cached" (whether the sidecar was already up to date)
+and "sidecar" (whether there is one to load now), or with "error" if the take couldn't be parsed.
+'''
+def parse_takes(paths, max_workers=None, progress=None):
+    paths = list(paths)
+    pending = queue.SimpleQueue()
+    for path in paths:
+        pending.put(path)
+    results = {}
+    # set once any worker's progress callback raises (e.g. the job was cancelled), so the other workers stop after their current take too
+    stopped = threading.Event()
+
+    def drive_worker(_):
+        with subprocess.Popen([sys.executable, "-X", "utf8", "-u", __file__], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8") as worker:
+            try:
+                while not stopped.is_set():
+                    try:
+                        path = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    worker.stdin.write(path + "\n")
+                    worker.stdin.flush()
+                    line = worker.stdout.readline()
+                    if not line:
+                        results[path] = {"error":f"Worker exited with code {worker.wait()}"}
+                        return
+                    results[path] = json.loads(line)
+                    if progress is not None:
+                        progress(path, results[path])
+            except BaseException:
+                stopped.set()
+                raise
+            finally:
+                # closing stdin tells the worker to exit once it's done with the current take
+                worker.stdin.close()
+
+    num_workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    if num_workers:
+        with ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="ai_animator_parse") as executor:
+            list(executor.map(drive_worker, range(num_workers)))
+    for path in paths:
+        results.setdefault(path, {"error":"Not parsed (every worker exited)"})
+    return results
+
+# worker side of parse_takes: reads CSV paths from stdin, one per line, and answers each with one JSON line on stdout
+def _run_worker():
+    out = sys.stdout
+    # anything printed while loading (e.g. sidecar warnings) goes to stderr so it can't corrupt the replies
+    sys.stdout = sys.stderr
+    for line in sys.stdin:
+        path = line.rstrip("\n")
+        start = time.perf_counter()
+        try:
+            capture = read_sidecar(path)
+            cached = capture is not None
+            if not cached:
+                capture = load_capture(path)
+            result = {"num_frames":len(capture), "cached":cached, "sidecar":cached or read_sidecar(path) is not None}
+        except Exception as e:
+            result = {"error":f"{type(e).__name__}: {e}"}
+        result["seconds"] = time.perf_counter() - start
+        out.write(json.dumps(result) + "\n")
+        out.flush()
+
+if __name__ == "__main__":
+    _run_worker()
@@ -1,7 +1,6 @@
 import os
 import time
 import socket 
-import bpy 
 import csv
 import random 
 import urllib.request
@@ -9,15 +8,126 @@ import urllib.request
 import io
 import mimetypes
 from urllib import request
+from urllib.parse import urlsplit
+import http.client
+import threading
 import uuid
 import json
+import struct
+import queue
+import collections
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+
+from ai_animator.timing import NULL_TIMER
+from ai_animator.arkit import _ARKIT_BLENDSHAPES
+from ai_animator.audio import wav_duration, split_windows, read_wav_window, stitch_windows, compact_wav, read_wav_mono, resample, encode_wav, voiced_regions
+
+# used when no endpoints are configured in the add-on preferences
+DEFAULT_ENDPOINT = 'http://10.224.2.142:8080/'
+
+# rate (frames per second of audio) at which the inference model outputs blendshape frames
+MODEL_FPS = 60
+
+# binary frame responses: FRAMES_MAGIC, then uint32 num_frames and uint32 num_channels (little-endian), then num_frames * num_channels little-endian float32s (row-major)
+FRAMES_CONTENT_TYPE = 'application/x-ai-animator-frames'
+FRAMES_MAGIC = b'AIFR'
+_FRAMES_HEADER = struct.Struct('<4sII')
+NPY_CONTENT_TYPE = 'application/x-npy'
+
+# streamed frame responses, sent as the frames are inferred:
+# a sequence of chunks, each a uint32 num_frames and uint32 num_channels (little-endian) followed by that many little-endian float32s (row-major),
+# ended by a chunk with num_frames = 0 (or by the end of the response)
+FRAME_STREAM_CONTENT_TYPE = 'application/x-ai-animator-frame-stream'
+_FRAME_STREAM_HEADER = struct.Struct('<II')
+# alternatively, one JSON array per line, holding either a single frame or a list of frames
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# servers that understand it send the raw matrix, older servers ignore the header and keep sending JSON
+_ACCEPT = f'{FRAMES_CONTENT_TYPE}, {NPY_CONTENT_TYPE};q=0.9, application/json;q=0.5'
+_STREAM_ACCEPT = f'{FRAME_STREAM_CONTENT_TYPE}, {NDJSON_CONTENT_TYPE};q=0.9, {FRAMES_CONTENT_TYPE};q=0.8, {NPY_CONTENT_TYPE};q=0.7, application/json;q=0.5'
+
+'''
+Packs a (num_frames x num_channels) matrix into the FRAMES_CONTENT_TYPE format (used by test servers).
+'''
+def encode_frames(frames):
+    frames = np.ascontiguousarray(frames, dtype='<f4')
+    num_frames, num_channels = frames.shape
+    return _FRAMES_HEADER.pack(FRAMES_MAGIC, num_frames, num_channels) + frames.tobytes()
+
+'''
+Decodes a response [body] into a (num_frames x num_channels) float32 matrix according to its [content_type].
+The binary formats are read with np.frombuffer, so the matrix is a read-only view over the body rather than a copy.
+Anything else is assumed to be the original JSON list of lists.
+'''
+def decode_frames(body, content_type):
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type == FRAMES_CONTENT_TYPE:
+        magic, num_frames, num_channels = _FRAMES_HEADER.unpack_from(body)
+        if magic != FRAMES_MAGIC:
+            raise ValueError(f"Unexpected frame data header {magic!r}")
+        return np.frombuffer(body, dtype='<f4', count=num_frames * num_channels, offset=_FRAMES_HEADER.size).reshape(num_frames, num_channels)
+    if content_type == NPY_CONTENT_TYPE:
+        header = io.BytesIO(body)
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+        else:
+            return np.load(io.BytesIO(body), allow_pickle=False).astype(np.float32)
+        frames = np.frombuffer(body, dtype=dtype, count=int(np.prod(shape)), offset=header.tell())
+        frames = frames.reshape(shape[::-1]).T if fortran_order else frames.reshape(shape)
+        return frames if frames.dtype == np.float32 else frames.astype(np.float32)
+    frames = np.asarray(json.loads(body), dtype=np.float32)
+    if frames.size == 0:
+        return frames.reshape(0, 0)
+    return frames
+
+# files are streamed into the request body in blocks of this many bytes, so memory use doesn't grow with the file size
+_UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# number of recent response latencies kept per endpoint, and the fewest needed before they're used to decide when to hedge
+_LATENCY_WINDOW = 100
+_MIN_LATENCY_SAMPLES = 5
+
+# how often a request waiting on a server wakes up to check for cancellation, hedging and deadlines
+_WAIT_POLL_SECONDS = 0.25
+
+class InferenceError(IOError):
+    """Raised when an inference server answers with an error status."""
+
+    def __init__(self, url, status, reason):
+        super().__init__(f"Inference server {url} returned {status} {reason}")
+        self.url = url
+        self.status = status
+
+    @property
+    def retryable(self):
+        """Server errors and rate limiting may go away on a retry, other
+        client errors won't."""
+        return self.status >= 500 or self.status == 429
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request hasn't completed within the Client's deadline."""
+    pass
 
 class MultiPartForm:
-    """Accumulate the data to be used when posting a form."""
+    """Accumulate the data to be used when posting a form.
+
+    Attached files are not read into memory: iterating the form (see
+    iter_chunks) streams the MIME preamble, then each file in
+    _UPLOAD_CHUNK_SIZE blocks, then the epilogue, and content_length
+    gives the exact body size up front.
+    """
 
     def __init__(self):
         self.form_fields = []
         self.files = []
+        # attached files are read under this lock, so the form can be sent
+        # on several connections at once (e.g. a hedged request)
+        self._lock = threading.Lock()
         # Use a large random byte string to separate
         # parts of the MIME data.
         self.boundary = uuid.uuid4().hex.encode('utf-8')
@@ -33,14 +143,20 @@ class MultiPartForm:
 
     def add_file(self, fieldname, filename, fileHandle,
                  mimetype=None):
-        """Add a file to be uploaded."""
-        body = fileHandle.read()
+        """Add a file to be uploaded.
+
+        The handle must stay open (and seekable) until the form has been
+        sent. Only the bytes from its current position onwards are sent.
+        """
         if mimetype is None:
             mimetype = (
                 mimetypes.guess_type(filename)[0] or
                 'application/octet-stream'
             )
-        self.files.append((fieldname, filename, mimetype, body))
+        start = fileHandle.tell()
+        size = fileHandle.seek(0, io.SEEK_END) - start
+        fileHandle.seek(start)
+        self.files.append((fieldname, filename, mimetype, fileHandle, start, size))
         return
 
     @staticmethod
@@ -58,54 +174,740 @@ class MultiPartForm:
     def _content_type(ct):
         return 'Content-Type: {}\r\n'.format(ct).encode('utf-8')
 
-    def __bytes__(self):
-        """Return a byte-string representing the form data,
-        including attached files.
+    def _parts(self):
+        """Yield the body as a sequence of byte-strings (the MIME framing)
+        and (fileHandle, start, size) tuples (the file contents).
         """
-        buffer = io.BytesIO()
         boundary = b'--' + self.boundary + b'\r\n'
 
         # Add the form fields
         for name, value in self.form_fields:
-            buffer.write(boundary)
-            buffer.write(self._form_data(name))
-            buffer.write(b'\r\n')
-            buffer.write(value.encode('utf-8'))
-            buffer.write(b'\r\n')
+            yield (boundary + self._form_data(name) + b'\r\n' +
+                   value.encode('utf-8') + b'\r\n')
 
         # Add the files to upload
-        for f_name, filename, f_content_type, body in self.files:
-            buffer.write(boundary)
-            buffer.write(self._attached_file(f_name, filename))
-            buffer.write(self._content_type(f_content_type))
-            buffer.write(b'\r\n')
-            buffer.write(body)
-            buffer.write(b'\r\n')
+        for f_name, filename, f_content_type, fileHandle, start, size in self.files:
+            yield (boundary + self._attached_file(f_name, filename) +
+                   self._content_type(f_content_type) + b'\r\n')
+            yield (fileHandle, start, size)
+            yield b'\r\n'
+
+        yield b'--' + self.boundary + b'--\r\n'
+
+    def content_length(self):
+        """Return the size in bytes of the full form body."""
+        return sum(len(part) if isinstance(part, bytes) else part[2]
+                   for part in self._parts())
+
+    def iter_chunks(self, chunk_size=_UPLOAD_CHUNK_SIZE):
+        """Yield the form body in pieces of at most chunk_size bytes
+        (framing is yielded as-is), reading attached files as it goes.
+        """
+        for part in self._parts():
+            if isinstance(part, bytes):
+                yield part
+                continue
+            fileHandle, start, size = part
+            offset = 0
+            while offset < size:
+                with self._lock:
+                    fileHandle.seek(start + offset)
+                    chunk = fileHandle.read(min(chunk_size, size - offset))
+                if not chunk:
+                    raise IOError('File was truncated while it was being uploaded')
+                offset += len(chunk)
+                yield chunk
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def __bytes__(self):
+        """Return a byte-string representing the form data,
+        including attached files.
+        """
+        return b''.join(self.iter_chunks())
+
+
+
+class ConnectionPool:
+    """Keep-alive HTTP connections, shared by every Client.
+
+    Idle connections are kept per (scheme, host, port) so consecutive
+    requests to the same inference server skip the TCP (and TLS) setup.
+    The pool also counts the requests in flight to each server, which is
+    what Client uses to pick the least-loaded endpoint, and keeps each
+    server's recent response latencies (time to the response headers),
+    which Client uses to decide when to hedge.
+    """
+
+    def __init__(self, max_idle_per_host=4):
+        self.max_idle_per_host = max_idle_per_host
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._in_flight = {}
+        self._latencies = {}
+        self._round_robin = 0
+
+    @staticmethod
+    def _key(url):
+        parts = urlsplit(url)
+        default_port = 443 if parts.scheme == 'https' else 80
+        return parts.scheme, parts.hostname, parts.port or default_port
 
-        buffer.write(b'--' + self.boundary + b'--\r\n')
-        return buffer.getvalue()
+    def choose(self, endpoints, strategy='LEAST_LOADED', exclude=(), hedge=False):
+        """Pick one of endpoints, either in turn ('ROUND_ROBIN') or the
+        one with the fewest requests in flight ('LEAST_LOADED', ties are
+        broken round-robin so idle servers share the load). Endpoints in
+        exclude are skipped, unless that would leave none. Picks for a
+        hedge don't take a turn, so hedging doesn't skew the rotation of
+        primary requests."""
+        endpoints = [url for url in endpoints if url not in exclude] or endpoints
+        with self._lock:
+            if not hedge:
+                self._round_robin += 1
+            rotated = endpoints[self._round_robin % len(endpoints):] + \
+                endpoints[:self._round_robin % len(endpoints)]
+            if strategy == 'ROUND_ROBIN':
+                return rotated[0]
+            return min(rotated, key=lambda url: self._in_flight.get(self._key(url), 0))
 
+    def in_flight(self, url):
+        with self._lock:
+            return self._in_flight.get(self._key(url), 0)
+
+    def record_latency(self, url, seconds):
+        with self._lock:
+            key = self._key(url)
+            if key not in self._latencies:
+                self._latencies[key] = collections.deque(maxlen=_LATENCY_WINDOW)
+            self._latencies[key].append(seconds)
+
+    def latency_percentile(self, urls, percentile):
+        """Return the given percentile (0-100) of the latencies recently
+        recorded for urls, or None if there are too few samples."""
+        with self._lock:
+            samples = [s for url in urls for s in self._latencies.get(self._key(url), ())]
+        if len(samples) < _MIN_LATENCY_SAMPLES:
+            return None
+        return float(np.percentile(samples, percentile))
+
+    def latency_stats(self):
+        """Return {(scheme, host, port): (count, p50, p95)} for every
+        server with recorded latencies."""
+        with self._lock:
+            latencies = {key: list(samples) for key, samples in self._latencies.items() if samples}
+        return {key: (len(samples), float(np.percentile(samples, 50)), float(np.percentile(samples, 95)))
+                for key, samples in latencies.items()}
+
+    def acquire(self, url, timeout=None):
+        """Return a connection to the server at url, reusing an idle one
+        if there is one. Every acquire must be paired with a release.
+        timeout (in seconds, None for no limit) applies to connecting and
+        to every blocking send and receive."""
+        key = self._key(url)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            idle = self._idle.get(key)
+            conn = idle.pop() if idle else None
+        if conn is not None:
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            return conn
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def release(self, url, conn, reusable=True):
+        """Hand a connection back. Connections that aren't reusable (the
+        response wasn't fully read, the server asked to close, or the
+        request failed) are closed instead of being kept."""
+        key = self._key(url)
+        with self._lock:
+            self._in_flight[key] = max(self._in_flight.get(key, 0) - 1, 0)
+            idle = self._idle.setdefault(key, [])
+            if reusable and len(idle) < self.max_idle_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+'''
+Reads exactly [size] bytes from [stream], returning None if it ends before any were read.
+'''
+def _read_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            if data:
+                raise IOError(f"Response ended after {len(data)} of {size} bytes")
+            return None
+        data += chunk
+    return data
+
+# every Client shares this pool (unless given its own), so connections survive across generations and batch jobs
+_CONNECTION_POOL = ConnectionPool()
+
+'''
+Returns the recent response latencies of every server the shared connection pool has talked to (see ConnectionPool.latency_stats).
+'''
+def endpoint_latency_stats():
+    return _CONNECTION_POOL.latency_stats()
+
+'''
+Splits the endpoint list stored in the add-on preferences (URLs separated by commas, semicolons or whitespace) into a list of URLs.
+'''
+def parse_endpoints(text):
+    return [url for url in text.replace(',', ' ').replace(';', ' ').split() if url]
 
 class Client:
-    def __init__(self):
-        print("Created client")
+    '''
+    [endpoints] is a list of inference server URLs (defaults to DEFAULT_ENDPOINT).
+    Each request goes to one of them, picked by [strategy] ('LEAST_LOADED' or 'ROUND_ROBIN').
+    If [cache] (a cache.InferenceCache) is passed, results are looked up by audio content before anything is uploaded.
+    Cached results are shared between every server reporting the same [model_version]. Without a version the cache isn't used,
+    since nothing would tell results of an upgraded model apart from stale ones.
+    If [window_seconds] is set, WAV files longer than that are split into windows overlapping by [overlap_seconds],
+    which are sent concurrently (up to [max_workers] at once, spread over the endpoints) and crossfaded back together.
+    If [preprocess_sample_rate] is set, WAV audio is downmixed to mono and resampled to (at most) that rate before it is uploaded,
+    as 16-bit PCM (see audio.compact_wav). The original duration is sent alongside it in a 'duration' form field.
+    If [silence_threshold_db] is set, only the voiced regions of WAV audio (see audio.voiced_regions) are sent, concurrently like windows,
+    and the frames for the silence in between are filled with the rest pose (all weights zero).
+    The total length of audio skipped this way is accumulated in skipped_seconds.
+    Every upload is limited by [timeout] seconds of socket inactivity and the whole of it (including retries) by a [deadline] in seconds (None for no limit).
+    Failed uploads are retried up to [max_retries] times, waiting [backoff_seconds] (doubling, with jitter) in between.
+    If [hedge_percentile] is set, an upload that has had no response once the endpoints' recent latencies reach that percentile
+    (see hedge_delay) is duplicated to another endpoint, and whichever responds first is used.
+    If a [timer] (timing.StageTimer) is passed, the time spent in each stage of every request is recorded to it.
+    '''
+    def __init__(self, endpoints=None, strategy='LEAST_LOADED', pool=None, cache=None, model_version="",
+                 window_seconds=None, overlap_seconds=1.0, max_workers=4, preprocess_sample_rate=None, silence_threshold_db=None,
+                 timeout=None, deadline=None, max_retries=2, backoff_seconds=0.5, hedge_percentile=None, hedge_min_delay=0.5, timer=NULL_TIMER):
+        self.endpoints = list(endpoints or [DEFAULT_ENDPOINT])
+        self.strategy = strategy
+        self.pool = pool or _CONNECTION_POOL
+        if cache is not None and not model_version:
+            print("Not caching inference results: no model version is set")
+            cache = None
+        self.cache = cache
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_workers = max_workers
+        self.preprocess_sample_rate = preprocess_sample_rate
+        self.silence_threshold_db = silence_threshold_db
+        self.skipped_seconds = 0.0
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.timer = timer
+        self._skipped_lock = threading.Lock()
+        self.cache_namespace = model_version
+        if window_seconds:
+            # stitched results differ (slightly) from whole-file results, so they get their own cache entries
+            self.cache_namespace += f"|windows:{window_seconds}:{overlap_seconds}"
+        if preprocess_sample_rate:
+            self.cache_namespace += f"|preprocess:{preprocess_sample_rate}"
+        if silence_threshold_db is not None:
+            self.cache_namespace += f"|vad:{silence_threshold_db}"
+        print(f"Created client for {', '.join(self.endpoints)}")
 
-    def request(self, audio_filepath):
-        if audio_filepath.startswith("//"):
-            abspath = bpy.path.abspath("//")
-            print(f"Normalizing to {abspath}")
-            audio_filepath = abspath + audio_filepath[1:]
+    '''
+    Uploads the audio at [audio_filepath] for inference and returns the decoded frame data as a (num_frames x num_channels) float32 matrix.
+    The path must already be absolute: Blender's '//' relative paths are resolved by the caller (with bpy.path.abspath), so the client doesn't need bpy.
+    If [progress] is passed it is called with (fraction, message) as the request moves through each stage.
+    It may raise to abort the request (e.g. jobs.Job.set_progress raises JobCancelled once the job is cancelled).
+    If [on_frames] is passed, a streamed response is requested and on_frames(start_frame, frames) is called (on this thread)
+    with each chunk as it arrives. Servers (or cache hits, or windowed requests) that return everything at once produce a single call.
+    '''
+    def request(self, audio_filepath, progress=None, on_frames=None):
+        progress = progress or (lambda fraction, message: None)
         print(f"Using audio @ {audio_filepath}")
-        with open(audio_filepath, "rb") as infile: 
-            data = infile.read()
-            form = MultiPartForm()
-            form.add_file('audio', os.path.basename(audio_filepath), fileHandle=io.BytesIO(data))
-            data = bytes(form)
-            r = request.Request('http://10.224.2.142:8080/', data=data)
-            r.add_header(       'User-agent',        'PyMOTW (https://pymotw.com/)',    )
-            r.add_header('Content-type', form.get_content_type())
-            r.add_header('Content-length', len(data))
-            with urllib.request.urlopen(r) as response:    
-                frame_data = response.read()  
-                return json.loads(frame_data)
+        if self.cache is not None:
+            progress(0.0, "Hashing audio")
+            with self.timer.stage("hash", os.path.getsize(audio_filepath)):
+                cache_key = self.cache.key_for(audio_filepath, self.cache_namespace)
+            with self.timer.stage("cache") as counts:
+                frames = self.cache.get(cache_key)
+                counts["frames"] = 0 if frames is None else len(frames)
+            if frames is not None:
+                print(f"Using cached frames for {audio_filepath}")
+                progress(0.9, "Loaded frames from cache")
+                if on_frames is not None:
+                    on_frames(0, frames)
+                return frames
+        frames = self._request_voiced(audio_filepath, progress) if self.silence_threshold_db is not None else None
+        duration = wav_duration(audio_filepath) if self.window_seconds else None
+        if frames is None and duration is not None and duration > self.window_seconds:
+            frames = self._request_windowed(audio_filepath, duration, progress)
+        if frames is not None:
+            # voiced and windowed results are only known once every request has come back, so they're passed on in one go
+            if on_frames is not None:
+                on_frames(0, frames)
+        else:
+            progress(0.0, "Reading audio")
+            compacted = self._compact(audio_filepath)
+            if compacted is not None:
+                frames = self._request_upload(os.path.basename(audio_filepath), io.BytesIO(compacted[0]), progress, on_frames, duration=compacted[1])
+            else:
+                with open(audio_filepath, "rb") as infile: 
+                    frames = self._request_upload(os.path.basename(audio_filepath), infile, progress, on_frames)
+        if self.cache is not None:
+            with self.timer.stage("cache", num_frames=len(frames)):
+                self.cache.put(cache_key, frames)
+        return frames
+
+    '''
+    Returns the audio in [source] (a path or file object) as compact 16-bit mono WAV bytes, along with the duration of the original audio.
+    Returns None if preprocessing is off or [source] can't be decoded as WAV, in which case it should be uploaded as-is.
+    '''
+    def _compact(self, source):
+        if not self.preprocess_sample_rate:
+            return None
+        try:
+            with self.timer.stage("preprocess") as counts:
+                data, duration = compact_wav(source, self.preprocess_sample_rate)
+                counts["bytes"] = len(data)
+        except (wave.Error, EOFError, ValueError) as e:
+            print(f"Uploading audio as-is, it couldn't be preprocessed : {e}")
+            return None
+        print(f"Preprocessed {duration:.1f}s of audio to {len(data)} bytes")
+        return data, duration
+
+    # uploads the audio in [file_handle] as [filename] and returns the decoded frames (streaming them to [on_frames] if passed)
+    # [duration] is the length of the original audio, if what's being uploaded has been preprocessed
+    def _request_upload(self, filename, file_handle, progress, on_frames=None, duration=None):
+        form = MultiPartForm()
+        if duration is not None:
+            form.add_field('duration', repr(duration))
+        form.add_file('audio', filename, fileHandle=file_handle)
+        if on_frames is not None:
+            frames, _ = self._post(form, progress, accept=_STREAM_ACCEPT, read=lambda response: self._read_stream(response, on_frames, progress))
+            return frames
+        frame_data, content_type = self._post(form, progress)
+        progress(0.9, "Decoding frames")
+        with self.timer.stage("decode") as counts:
+            frames = decode_frames(frame_data, content_type)
+            counts["frames"] = len(frames)
+        return frames
+
+    '''
+    Reads a (possibly) streamed response chunk by chunk, passing each chunk to on_frames(start_frame, frames) as soon as it has arrived.
+    Returns all the frames joined into one matrix.
+    '''
+    def _read_stream(self, response, on_frames, progress):
+        content_type = (response.getheader('Content-Type') or '').split(';')[0].strip().lower()
+        if content_type == FRAME_STREAM_CONTENT_TYPE:
+            chunks = self._frame_stream_chunks(response)
+        elif content_type == NDJSON_CONTENT_TYPE:
+            chunks = self._ndjson_chunks(response)
+        else:
+            chunks = [decode_frames(response.read(), content_type)]
+        received = []
+        start = 0
+        for frames in chunks:
+            on_frames(start, frames)
+            received.append(frames)
+            start += len(frames)
+            progress(0.6, f"Received {start} frames")
+        # consume whatever follows the last chunk (e.g. the end of a chunked body), or the connection can't be reused
+        response.read()
+        progress(0.9, "Received all frames")
+        if not received:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.concatenate(received)
+
+    # yields the lines of an NDJSON_CONTENT_TYPE response as (num_frames x num_channels) matrices
+    @staticmethod
+    def _ndjson_chunks(response):
+        for line in response:
+            if line.strip():
+                frames = np.asarray(json.loads(line), dtype=np.float32)
+                yield frames.reshape(1, -1) if frames.ndim == 1 else frames
+
+    # yields the chunks of a FRAME_STREAM_CONTENT_TYPE response as (num_frames x num_channels) matrices
+    @staticmethod
+    def _frame_stream_chunks(response):
+        while True:
+            header = _read_exactly(response, _FRAME_STREAM_HEADER.size)
+            if header is None:
+                return
+            num_frames, num_channels = _FRAME_STREAM_HEADER.unpack(header)
+            if num_frames == 0:
+                return
+            data = _read_exactly(response, num_frames * num_channels * 4)
+            if data is None:
+                raise IOError("Frame stream ended in the middle of a chunk")
+            yield np.frombuffer(data, dtype='<f4').reshape(num_frames, num_channels)
+
+    '''
+    Sends overlapping windows of the WAV file at [audio_filepath] concurrently and stitches the returned frames together.
+    Each window is only read from disk by the thread that uploads it, so at most max_workers windows are in memory at once.
+    '''
+    def _request_windowed(self, audio_filepath, duration, progress):
+        windows = split_windows(duration, self.window_seconds, self.overlap_seconds)
+        print(f"Splitting {duration:.1f}s of audio into {len(windows)} windows of {self.window_seconds}s")
+        filename = os.path.basename(audio_filepath)
+        # progress is reported from the calling thread only, as windows complete
+        silent = lambda fraction, message: None
+
+        def request_window(start, end):
+            with self.timer.stage("read_window") as counts:
+                window = read_wav_window(audio_filepath, start, end)
+                counts["bytes"] = len(window)
+            compacted = self._compact(io.BytesIO(window))
+            if compacted is not None:
+                return self._request_upload(filename, io.BytesIO(compacted[0]), silent, duration=compacted[1])
+            return self._request_upload(filename, io.BytesIO(window), silent)
+
+        segments = self._request_concurrently([lambda start=start, end=end: request_window(start, end) for start, end in windows], progress, "windows")
+        offsets = [int(round(start * MODEL_FPS)) for start, _ in windows]
+        with self.timer.stage("stitch") as counts:
+            frames = stitch_windows(segments, offsets)
+            counts["frames"] = len(frames)
+        return frames
+
+    '''
+    Sends only the voiced regions of the WAV file at [audio_filepath] (split into windows if they're longer than window_seconds) concurrently,
+    and places the returned frames at their regions' offsets in a rest-pose matrix covering the whole file.
+    The regions are uploaded as 16-bit mono (resampled if preprocess_sample_rate is set).
+    Returns None if the file can't be decoded as WAV or no speech was found, in which case the whole file should be sent as usual.
+    If speech was found but the server returns no frames for any of it, the whole file is animated with the rest pose.
+    '''
+    def _request_voiced(self, audio_filepath, progress):
+        progress(0.0, "Finding speech")
+        try:
+            with self.timer.stage("decode_audio", os.path.getsize(audio_filepath)):
+                samples, rate = read_wav_mono(audio_filepath)
+        except (wave.Error, EOFError, ValueError) as e:
+            print(f"Sending the whole file, it couldn't be decoded to find speech : {e}")
+            return None
+        duration = len(samples) / rate
+        with self.timer.stage("vad"):
+            regions = voiced_regions(samples, rate, self.silence_threshold_db)
+        if not regions:
+            print(f"No speech found in {audio_filepath}, sending the whole file")
+            return None
+        skipped = duration - sum(end - start for start, end in regions)
+        with self._skipped_lock:
+            self.skipped_seconds += skipped
+        print(f"Found {len(regions)} voiced regions, skipping {skipped:.1f}s of {duration:.1f}s of silence")
+        if self.preprocess_sample_rate and rate > self.preprocess_sample_rate:
+            with self.timer.stage("preprocess"):
+                samples, rate = resample(samples, rate, self.preprocess_sample_rate), self.preprocess_sample_rate
+        # (region index, start, end) for every upload
+        pieces = []
+        for i, (start, end) in enumerate(regions):
+            windows = split_windows(end - start, self.window_seconds, self.overlap_seconds) if self.window_seconds else [(0.0, end - start)]
+            pieces += [(i, start + window_start, start + window_end) for window_start, window_end in windows]
+        filename = os.path.basename(audio_filepath)
+        silent = lambda fraction, message: None
+
+        def request_piece(start, end):
+            pcm = samples[int(round(start * rate)):int(round(end * rate))]
+            with self.timer.stage("encode") as counts:
+                data = encode_wav(pcm, rate)
+                counts["bytes"] = len(data)
+            return self._request_upload(filename, io.BytesIO(data), silent, duration=end - start)
+
+        results = self._request_concurrently([lambda start=start, end=end: request_piece(start, end) for _, start, end in pieces], progress, "voiced segments")
+        num_frames = int(round(duration * MODEL_FPS))
+        frames = None
+        stitch_started = time.perf_counter()
+        for i, (start, _) in enumerate(regions):
+            segments = [result for (region, _, _), result in zip(pieces, results) if region == i]
+            offsets = [int(round((piece_start - start) * MODEL_FPS)) for region, piece_start, _ in pieces if region == i]
+            region_frames = stitch_windows(segments, offsets)
+            if len(region_frames) == 0:
+                continue
+            if frames is None:
+                frames = np.zeros((num_frames, region_frames.shape[1]), dtype=np.float32)
+            offset = int(round(start * MODEL_FPS))
+            region_frames = region_frames[:max(num_frames - offset, 0)]
+            frames[offset:offset + len(region_frames)] = region_frames
+        if frames is None:
+            # the server returned no frames for any voiced region, sending the whole file wouldn't get any more
+            print(f"No frames returned for the voiced regions of {audio_filepath}, using the rest pose")
+            frames = np.zeros((num_frames, len(_ARKIT_BLENDSHAPES)), dtype=np.float32)
+        self.timer.add("stitch", time.perf_counter() - stitch_started, num_frames=num_frames)
+        progress(0.9, f"Skipped {skipped:.1f}s of silence")
+        return frames
+
+    '''
+    Runs every callable in [requests] on up to max_workers threads, reporting progress (as [label]) as each completes,
+    and returns their results in order. If any of them raises, the ones that haven't started are cancelled and the exception is re-raised.
+    '''
+    def _request_concurrently(self, requests, progress, label):
+        results = [None] * len(requests)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(request):i for i, request in enumerate(requests)}
+            try:
+                for done, future in enumerate(as_completed(futures)):
+                    results[futures[future]] = future.result()
+                    progress(0.1 + 0.8 * (done + 1) / len(requests), f"Received {done + 1}/{len(requests)} {label}")
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+
+    '''
+    Returns how long to wait for a response before hedging, i.e. the hedge_percentile of the latencies recently recorded for this client's endpoints
+    (but at least hedge_min_delay), or None if there aren't enough samples yet to know what a slow response looks like.
+    '''
+    def hedge_delay(self):
+        if self.hedge_percentile is None:
+            return None
+        observed = self.pool.latency_percentile(self.endpoints, self.hedge_percentile)
+        if observed is None:
+            return None
+        return max(observed, self.hedge_min_delay)
+
+    # sends [form] to one of the endpoints over a pooled keep-alive connection and returns the response body and its content type
+    # (or, if [read] is passed, whatever read(response) returns in place of the body)
+    # failed sends are retried up to max_retries times with exponential backoff, all within the deadline if there is one
+    def _post(self, form, progress, accept=_ACCEPT, read=None):
+        content_length = form.content_length()
+        headers = {
+            'User-agent': 'PyMOTW (https://pymotw.com/)',
+            'Content-type': form.get_content_type(),
+            'Content-length': str(content_length),
+            'Connection': 'keep-alive',
+            'Accept': accept,
+        }
+        deadline = time.monotonic() + self.deadline if self.deadline else None
+        # endpoints that have already failed this request, retries go elsewhere if there's anywhere else to go
+        failed = []
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._post_hedged(form, content_length, headers, progress, read, deadline, failed)
+            except DeadlineExceeded:
+                raise
+            except InferenceError as e:
+                if not e.retryable:
+                    raise
+                error = e
+            except (OSError, http.client.HTTPException) as e:
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff_seconds * 2 ** attempt * random.uniform(0.5, 1.0)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise DeadlineExceeded(f"Request failed ({error}) and there's no time left before the {self.deadline}s deadline to retry it")
+            print(f"Request failed ({error}), retrying in {delay:.1f}s")
+            progress(0.1, f"Retrying ({attempt + 1}/{self.max_retries})")
+            time.sleep(delay)
+
+    '''
+    Sends [form] once, plus (if hedging is on and no response has arrived within hedge_delay) one duplicate to a different endpoint.
+    The first successful response wins: the other send is aborted and the winner's body is read on this thread.
+    Endpoints that fail are appended to [failed].
+    '''
+    def _post_hedged(self, form, content_length, headers, progress, read, deadline, failed):
+        outcomes = queue.SimpleQueue()
+        attempts = []
+        silent = lambda fraction, message: None
+
+        def start(attempt_progress):
+            exclude = failed + [a.url for a in attempts]
+            url = self.pool.choose(self.endpoints, self.strategy, exclude=exclude, hedge=bool(attempts))
+            attempt = _Attempt(self.pool, url, form, content_length, headers, attempt_progress, outcomes, self.timeout)
+            attempts.append(attempt)
+            attempt.thread.start()
+
+        start(progress)
+        hedge_delay = self.hedge_delay()
+        hedge_at = time.monotonic() + hedge_delay if hedge_delay is not None else None
+        pending = 1
+        error = None
+        winner = None
+        try:
+            while pending:
+                now = time.monotonic()
+                wait = _WAIT_POLL_SECONDS
+                for t in (hedge_at, deadline):
+                    if t is not None:
+                        wait = min(wait, max(t - now, 0))
+                try:
+                    attempt, e = outcomes.get(timeout=wait)
+                except queue.Empty:
+                    now = time.monotonic()
+                    if deadline is not None and now >= deadline:
+                        raise DeadlineExceeded(f"No response from {', '.join(a.url for a in attempts)} within the {self.deadline}s deadline")
+                    if hedge_at is not None and now >= hedge_at:
+                        print(f"No response from {attempts[0].url} after {hedge_delay:.1f}s, sending a hedged request")
+                        start(silent)
+                        pending += 1
+                        hedge_at = None
+                    elif attempts[0].uploaded:
+                        # lets the caller cancel (e.g. jobs.Job.set_progress raises) while the server is busy
+                        progress(0.55, "Waiting for inference")
+                    continue
+                pending -= 1
+                if e is not None:
+                    # anything other than a network error (e.g. JobCancelled raised by [progress]) ends the request
+                    if not isinstance(e, (OSError, http.client.HTTPException)):
+                        raise e
+                    print(f"Request to {attempt.url} failed : {e}")
+                    failed.append(attempt.url)
+                    error = e
+                    continue
+                if attempt.response.status != 200:
+                    attempt.response.read()
+                    attempt.release(not attempt.response.will_close)
+                    failed.append(attempt.url)
+                    error = InferenceError(attempt.url, attempt.response.status, attempt.response.reason)
+                    if not error.retryable:
+                        raise error
+                    continue
+                winner = attempt
+                break
+            else:
+                raise error
+        finally:
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.abort()
+        self.pool.record_latency(winner.url, winner.latency)
+        # the file is read as the body is sent, so that time is taken out of the upload
+        self.timer.add("read", winner.read_seconds, content_length)
+        self.timer.add("upload", winner.upload_seconds - winner.read_seconds, content_length)
+        self.timer.add("inference", winner.latency - winner.upload_seconds)
+        progress(0.6, "Downloading frames")
+        response = winner.response
+        reusable = False
+        try:
+            if deadline is not None and winner.conn.sock is not None:
+                winner.conn.sock.settimeout(max(deadline - time.monotonic(), 0.001))
+            # streamed responses are decoded as they're read, so for those this includes decoding
+            with self.timer.stage("download") as counts:
+                body = read(response) if read is not None else response.read()
+                counts["bytes"] = len(body) if isinstance(body, bytes) else 0
+                counts["frames"] = 0 if isinstance(body, bytes) else len(body)
+            reusable = not response.will_close
+        finally:
+            if reusable and winner.conn.sock is not None:
+                winner.conn.sock.settimeout(self.timeout)
+            winner.release(reusable)
+        return body, response.getheader('Content-Type')
+
+class _Attempt:
+    """One send of a form to one endpoint, on its own thread so it can be
+    raced against a hedged duplicate.
+
+    The attempt is over once the response headers are in: (attempt, None)
+    or (attempt, exception) is put on the shared outcomes queue. Whoever
+    takes a response off the queue owns the connection and must call
+    release, unless it aborts the attempt instead.
+    """
+
+    def __init__(self, pool, url, form, content_length, headers, progress, outcomes, timeout=None):
+        self.pool = pool
+        self.url = url
+        self.form = form
+        self.content_length = content_length
+        self.headers = headers
+        self.progress = progress
+        self.outcomes = outcomes
+        self.timeout = timeout
+        self.conn = None
+        self.response = None
+        self.latency = None
+        self.read_seconds = 0.0
+        self.upload_seconds = None
+        self.uploaded = False
+        self.aborted = False
+        self.released = False
+        self._lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name=f"ai_animator_request_{url}", daemon=True)
+
+    def _run(self):
+        self.started = time.monotonic()
+        try:
+            conn, response = self._send()
+        except BaseException as e:
+            self.outcomes.put((self, e))
+            return
+        self.latency = time.monotonic() - self.started
+        with self._lock:
+            if not self.aborted:
+                self.response = response
+                self.outcomes.put((self, None))
+                return
+        self.release(False)
+
+    def _send(self):
+        path = urlsplit(self.url).path or '/'
+        # a pooled connection may have been closed by the server while it sat idle, in which case retry once on a fresh one
+        for retry in range(2):
+            conn = self.pool.acquire(self.url, self.timeout)
+            reused = conn.sock is not None
+            with self._lock:
+                aborted = self.aborted
+                self.conn = conn
+            try:
+                if aborted:
+                    raise ConnectionAbortedError(f"Request to {self.url} was aborted")
+                # the body is streamed straight from the file, so only one chunk is ever held in memory
+                conn.request('POST', path, body=self._upload(), headers=self.headers)
+                return conn, conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.pool.release(self.url, conn, False)
+                if retry == 1 or not reused or self.aborted:
+                    raise
+                print(f"Connection to {self.url} was closed, reconnecting")
+            except BaseException:
+                self.pool.release(self.url, conn, False)
+                raise
+
+    # yields the chunks of the form, reporting upload progress (from 0.1 to 0.5) as each one is handed to the connection
+    # (upload_seconds is the time from the start of the attempt until the body has been sent, read_seconds the part of that spent reading the file)
+    def _upload(self):
+        sent = 0
+        chunks = self.form.iter_chunks()
+        while True:
+            read_started = time.monotonic()
+            chunk = next(chunks, None)
+            self.read_seconds += time.monotonic() - read_started
+            if chunk is None:
+                break
+            self.progress(0.1 + 0.4 * sent / max(self.content_length, 1), "Uploading audio")
+            yield chunk
+            sent += len(chunk)
+        self.upload_seconds = time.monotonic() - self.started
+        self.uploaded = True
+
+    def release(self, reusable):
+        with self._lock:
+            if self.released:
+                return
+            self.released = True
+        self.pool.release(self.url, self.conn, reusable)
 
+    def abort(self):
+        """Stop the attempt. A response that has already been delivered is
+        released, otherwise the socket is shut down so the thread's blocking
+        send or receive fails (and the thread releases the connection)."""
+        with self._lock:
+            self.aborted = True
+            delivered = self.response is not None
+            conn = self.conn
+        if delivered:
+            self.release(False)
+            return
+        sock = conn.sock if conn is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
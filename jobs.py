@@ -0,0 +1,138 @@
+import threading
+import time
+import uuid
+
+import bpy
+
+# how often (in seconds) the main thread checks on running jobs
+_POLL_INTERVAL = 0.1
+
+# all jobs that haven't been handed back to the main thread yet, keyed by Job.id
+_JOBS = {}
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker thread (from Job.set_progress) once the job has been cancelled."""
+    pass
+
+'''
+A unit of background work (e.g. uploading audio and waiting for inference) that runs on a worker thread.
+[work] is called on the worker thread with the Job itself, so it can call set_progress (which doubles as the cancellation point).
+Nothing in [work] may touch bpy data - whatever it returns is handed to [on_done] on the main thread via a bpy.app.timers poll,
+which is where results should be baked into the scene.
+If [on_poll] is passed it is called with the Job on the main thread every poll while the work is running (e.g. to apply partial results).
+'''
+class Job:
+    def __init__(self, label, work, on_done, on_poll=None):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.started = time.time()
+        self.finished_at = None
+        self._work = work
+        self._on_done = on_done
+        self._on_poll = on_poll
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ai_animator_job_{self.id}", daemon=True)
+        # bpy.app.timers matches callbacks by identity, so keep the one bound method we register
+        self._timer = self._poll
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started
+
+    def cancel(self):
+        self.message = "Cancelling"
+        self._cancelled.set()
+
+    '''
+    Called from the worker thread to report progress (0-1) and an optional status message.
+    Raises JobCancelled if the job has been cancelled, so long-running work stops at the next progress update.
+    '''
+    def set_progress(self, fraction, message=None):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self.progress = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def _run(self):
+        try:
+            self.result = self._work(self)
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.time()
+            self._finished.set()
+
+    # runs on the main thread via bpy.app.timers until the worker thread is done
+    def _poll(self):
+        _tag_redraw()
+        if not self._finished.is_set():
+            if self._on_poll is not None and not self.cancelled:
+                try:
+                    self._on_poll(self)
+                except Exception as e:
+                    print(f"Job {self.label} poll failed : {e}")
+            return _POLL_INTERVAL
+        del _JOBS[self.id]
+        if self.cancelled:
+            print(f"Job {self.label} cancelled after {self.elapsed:.1f}s")
+        else:
+            try:
+                self._on_done(self)
+            except Exception as e:
+                self.error = e
+            if self.error is not None:
+                print(f"Job {self.label} failed : {self.error}")
+        _tag_redraw()
+        return None
+
+'''
+Starts [work] on a new worker thread and returns the Job. [on_done] is called with the Job on the main thread once the work has finished
+(unless it was cancelled), whether or not it raised - check job.error. [on_poll] is called on the main thread while it runs.
+'''
+def submit(label, work, on_done, on_poll=None):
+    job = Job(label, work, on_done, on_poll)
+    _JOBS[job.id] = job
+    job._thread.start()
+    bpy.app.timers.register(job._timer, first_interval=_POLL_INTERVAL)
+    return job
+
+def get_job(job_id):
+    return _JOBS.get(job_id)
+
+def active_jobs():
+    return list(_JOBS.values())
+
+'''
+Cancels every running job and stops polling them, e.g. when the add-on is unregistered (their results are discarded).
+'''
+def cancel_all():
+    for job in active_jobs():
+        job.cancel()
+        if bpy.app.timers.is_registered(job._timer):
+            bpy.app.timers.unregister(job._timer)
+        del _JOBS[job.id]
+
+def _tag_redraw():
+    wm = bpy.context.window_manager
+    if wm is None:
+        return
+    for window in wm.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
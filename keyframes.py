@@ -0,0 +1,299 @@
+import math
+
+import numpy as np
+
+# raw values of the 'LINEAR' and 'BEZIER' items in Blender's keyframe interpolation enum (CONSTANT = 0, LINEAR = 1, BEZIER = 2)
+_LINEAR_INTERPOLATION = 1
+_BEZIER_INTERPOLATION = 2
+
+# plain RDP degrades to O(frames^2) on long periodic channels (each split only peels one period off the end of the chord)
+# so every channel is first cut into windows of this many frames, which bounds the recursion depth at the cost of one extra key per window
+_MAX_SEGMENT_FRAMES = 256
+
+# channels whose peak-to-peak range over a clip is within this are treated as constant (see remove_constant_fcurves)
+_CONSTANT_EPSILON = 1e-5
+
+'''
+Keyframe reduction for dense (num_frames x num_channels) weight matrices.
+Runs Ramer-Douglas-Peucker on every channel at once, measuring error as the vertical distance between a frame's value
+and the straight line through the surrounding kept keyframes (which is what a LINEAR fcurve evaluates to).
+Each pass handles every open segment (across all channels) together, splitting those whose worst frame is further than [tolerance] from the line,
+so the number of passes is the depth of the RDP recursion rather than the number of segments.
+Returns a boolean (num_frames x num_channels) mask of the keyframes to keep, and the maximum error over all dropped frames.
+The first and last frame of every channel are always kept.
+'''
+def simplify_channels(values, tolerance):
+    values = np.asarray(values, dtype=np.float32)
+    num_frames, num_channels = values.shape
+    keep = np.zeros(values.shape, dtype=bool)
+    if num_frames == 0 or num_channels == 0:
+        return keep, 0.0
+    bounds = np.unique(np.append(np.arange(0, num_frames, _MAX_SEGMENT_FRAMES), num_frames - 1))
+    keep[bounds] = True
+    # open segments as parallel arrays of (channel, first frame, last frame), both ends are already kept
+    channel = np.repeat(np.arange(num_channels), len(bounds) - 1)
+    start = np.tile(bounds[:-1], num_channels)
+    end = np.tile(bounds[1:], num_channels)
+    # channel-major copy so each segment's frames are contiguous
+    flat = np.ascontiguousarray(values.T).ravel()
+    max_error = 0.0
+    while True:
+        inner = end - start - 1
+        open_ = inner > 0
+        channel, start, end, inner = channel[open_], start[open_], end[open_], inner[open_]
+        if len(channel) == 0:
+            return keep, max_error
+        # expand every segment into the frames strictly between its ends
+        offsets = np.cumsum(inner) - inner
+        segment = np.repeat(np.arange(len(channel)), inner)
+        frames = start[segment] + 1 + (np.arange(int(inner.sum())) - offsets[segment])
+        row = channel[segment] * num_frames
+        v0 = flat[row + start[segment]]
+        v1 = flat[row + end[segment]]
+        t = (frames - start[segment]) / (end[segment] - start[segment])
+        error = np.abs(flat[row + frames] - (v0 + (v1 - v0) * t))
+        segment_error = np.maximum.reduceat(error, offsets)
+        split = segment_error > tolerance
+        if not split.all():
+            max_error = max(max_error, float(segment_error[~split].max()))
+        # the first frame in each segment that reaches the segment's maximum error becomes a new keyframe
+        at_max = np.flatnonzero(error == segment_error[segment])
+        first = np.ones(len(at_max), dtype=bool)
+        first[1:] = segment[at_max][1:] != segment[at_max][:-1]
+        worst = np.empty(len(channel), dtype=frames.dtype)
+        worst[segment[at_max[first]]] = frames[at_max[first]]
+        channel, start, end, worst = channel[split], start[split], end[split], worst[split]
+        keep[worst, channel] = True
+        channel = np.concatenate([channel, channel])
+        start, end = np.concatenate([start, worst]), np.concatenate([worst, end])
+
+'''
+Finds the columns of [values] (one per fcurve in [data_paths]) whose peak-to-peak range over the clip is within _CONSTANT_EPSILON
+and removes those fcurves from the collection [fcurves] (e.g. action.fcurves). Returns the boolean mask of constant columns.
+Fcurves are looked up by data path rather than passed in, as targets baking into the same action share them:
+a curve another target has already removed is simply skipped instead of being removed twice.
+'''
+def remove_constant_fcurves(fcurves, data_paths, values):
+    if len(values) == 0 or len(data_paths) == 0:
+        return np.zeros(len(data_paths), dtype=bool)
+    constant = np.ptp(values, axis=0) <= _CONSTANT_EPSILON
+    for data_path, is_constant in zip(data_paths, constant.tolist()):
+        if is_constant:
+            fc = fcurves.find(data_path)
+            if fc is not None:
+                fcurves.remove(fc)
+    print(f"Dropped {int(constant.sum())} constant shape key fcurves")
+    return constant
+
+'''
+Runs simplify_channels over [values] (one column per fcurve) if [tolerance] is set, returning the mask of keyframes to keep
+and a dict of stats (keyframes before and after, reduction ratio and maximum error), which are also printed.
+Returns (None, None) if [tolerance] is None, meaning every frame is keyed.
+'''
+def simplify_keyframes(values, tolerance):
+    if tolerance is None or values.size == 0:
+        return None, None
+    keep, max_error = simplify_channels(values, tolerance)
+    kept = int(keep.sum())
+    stats = { "keyframes_before":values.size, "keyframes_after":kept, "reduction_ratio":values.size / max(kept, 1), "max_error":max_error }
+    print(f"Simplified {values.size} keyframes to {kept} ({stats['reduction_ratio']:.1f}x reduction), max error {max_error:.6f}")
+    return keep, stats
+
+'''
+Returns the fcurve for [data_path] in the collection [fcurves], creating it with [num_frames] keyframe points if it doesn't exist yet,
+so the points can then be filled in with one foreach_set (see write_keyframes) rather than one keyframe_insert per frame.
+'''
+def find_or_create_fcurve(fcurves, data_path, num_frames):
+    fc = fcurves.find(data_path)
+    if fc is None:
+        fc = fcurves.new(data_path)
+        fc.keyframe_points.add(count=num_frames)
+    return fc
+
+'''
+Resamples [frames] (a (num_frames x num_channels) matrix sampled at [source_fps]) onto whole scene frames at [target_fps],
+for a clip whose first frame plays at scene frame [start_frame] (which may be fractional, e.g. a sound strip's frame_start).
+Every channel is linearly interpolated at the time of each whole scene frame within the clip, so keyframes never land on subframes.
+Returns the resampled matrix and the scene frame its first row belongs to (the first whole frame at or after [start_frame]).
+If [first_row] is set, only the rows of the resampled matrix from that one on are computed and returned (e.g. just the end of a clip that is still growing),
+while the returned scene frame is still the one of row 0.
+'''
+def conform_frames(frames, source_fps, target_fps, start_frame=0, first_row=0):
+    frames = np.asarray(frames, dtype=np.float32)
+    first = math.ceil(start_frame - 1e-6)
+    # source frames per scene frame, and the source position of scene frame [first]
+    step = float(source_fps) / float(target_fps)
+    offset = (first - start_frame) * float(source_fps) / float(target_fps)
+    if abs(step - 1) < 1e-9 and abs(offset) < 1e-6:
+        return frames[first_row:] if first_row else frames, first
+    num_frames = len(frames)
+    if num_frames == 0 or offset > num_frames - 1:
+        return np.zeros((0,) + frames.shape[1:], dtype=np.float32), first
+    positions = offset + np.arange(first_row, math.floor((num_frames - 1 - offset) / step + 1e-9) + 1) * step
+    lower = np.minimum(positions.astype(np.int64), num_frames - 1)
+    upper = np.minimum(lower + 1, num_frames - 1)
+    weight = (positions - lower).astype(np.float32)[:, None]
+    return frames[lower] + (frames[upper] - frames[lower]) * weight, first
+
+'''
+Resizes the keyframe points of the fcurve [fc] to [count] in place, adding points at the end or removing them
+(so the fcurve itself, and its group, survive, unlike removing and recreating the curve).
+'''
+def resize_keyframe_points(fc, count):
+    points = fc.keyframe_points
+    if len(points) > count:
+        if hasattr(points, "clear"):
+            # every point is rewritten anyway, so where the collection can be cleared in one call, clear it and add the new count back below
+            points.clear()
+        else:
+            for i in range(len(points) - 1, count - 1, -1):
+                points.remove(points[i], fast=True)
+    if len(points) < count:
+        points.add(count=count - len(points))
+
+'''
+Writes [values] at [frame_nums] to the fcurve [fc] with a single foreach_set, resizing its keyframe points to fit first (see resize_keyframe_points).
+If [keep] is passed, only the keyframes where keep is True are written and they are set to LINEAR interpolation
+(so the curve evaluates to exactly what simplify_channels measured against), otherwise they are set to BEZIER (Blender's default).
+The interpolation is written every time, since the points are reused: a curve simplified by an earlier bake would otherwise stay LINEAR.
+'''
+def write_keyframes(fc, frame_nums, values, keep=None):
+    if keep is not None:
+        frame_nums = frame_nums[keep]
+        values = values[keep]
+    count = len(frame_nums)
+    if len(fc.keyframe_points) != count:
+        resize_keyframe_points(fc, count)
+    co = np.empty(count * 2, dtype=np.float32)
+    co[0::2] = frame_nums
+    co[1::2] = values
+    fc.keyframe_points.foreach_set('co', co)
+    interpolation = _BEZIER_INTERPOLATION if keep is None else _LINEAR_INTERPOLATION
+    fc.keyframe_points.foreach_set('interpolation', np.full(count, interpolation, dtype=np.int32))
+    fc.update()
+
+'''
+Writes [values] at [frame_nums] to the keyframe points of the fcurve [fc] from point [start] on, one point at a time, adding points at the end if they run past it.
+This is for appending a few frames to a curve whose earlier keyframes are already in place (see FcurveBaker.update_keyframe_range):
+foreach_set always writes every point, so write_keyframes costs as much as the whole curve however few frames changed.
+The curve isn't update()d, which would recalculate the handles of every point: the points stay in frame order, and with a keyframe on every frame
+the curve still evaluates to exactly the written values on whole frames. Its handles are only right again after the next write_keyframes.
+'''
+def write_keyframe_range(fc, start, frame_nums, values):
+    points = fc.keyframe_points
+    end = start + len(frame_nums)
+    if len(points) < end:
+        points.add(count=end - len(points))
+    for i, frame, value in zip(range(start, end), frame_nums.tolist(), values.tolist()):
+        points[i].co = (frame, value)
+
+'''
+Returns the action named [name] in [actions] (i.e. bpy.data.actions), creating it if there is none.
+If [new] is set a new action is always created (Blender numbers the name, e.g. name.001, if it is taken).
+'''
+def get_or_create_action(actions, name, new=False):
+    if not new:
+        try:
+            return actions[name]
+        except KeyError:
+            pass
+    return actions.new(name)
+
+'''
+Fcurve baking shared by action.AnimatableObject and blendshapes.LiveLinkTarget, so the two bake paths can't drift apart.
+Subclasses keep the weights of every shape key of [target] in sk_frames (one column per key block) and the values of the custom properties
+named in custom_props in custom_prop_frames, set sparse, drop_constant and simplify_tolerance, then call create_actions.
+Row i of the frame matrices is keyed at scene frame start_frame + i.
+'''
+class FcurveBaker:
+    start_frame = 0
+    simplify_stats = None
+
+    '''
+    Makes the actions named [action_name]_shapekey and [action_name]_customprop in [actions] (i.e. bpy.data.actions, reused if they already exist)
+    the active actions of the target's shape keys and of the target itself, and creates an fcurve with [num_frames] keyframe points for every channel.
+    [channel_sk_idx] holds the shape key index of every incoming channel (-1 where there is none), which decides the animated shape keys when sparse is set.
+    Custom properties get their own action rather than being keyed into the object's existing animation, and it is only created if there are any.
+    The object's previous action is kept in replaced_action. Pass [new_actions] to always create new actions, e.g. for NLA strips,
+    whose actions must not be rewritten by a later bake of the same name.
+    '''
+    def create_actions(self, actions, action_name, num_frames, channel_sk_idx, new_actions=False):
+        self.sk_action = get_or_create_action(actions, f"{action_name}_shapekey", new_actions)
+        # create the bone AnimData if it doesn't exist
+        # important - we create this on the target (e.g. bpy.context.object), not its data (bpy.context.object.data)
+        if self.target.animation_data is None:
+            self.target.animation_data_create()
+        # create the shape key AnimData if it doesn't exist
+        if self.target.data.shape_keys.animation_data is None:
+            self.target.data.shape_keys.animation_data_create()
+        self.target.data.shape_keys.animation_data.action = self.sk_action
+
+        # sk_fcurve_idx[i] is the index (in key_blocks and therefore in the columns of sk_frames) of the shape key animated by the fcurve at sk_fcurve_paths[i]
+        key_blocks = self.target.data.shape_keys.key_blocks
+        if self.sparse:
+            self.sk_fcurve_idx = np.unique(channel_sk_idx[channel_sk_idx != -1]).astype(np.int64)
+        else:
+            self.sk_fcurve_idx = np.arange(len(key_blocks))
+        self.sk_fcurve_paths = [f"{key_blocks[i_sk].path_from_id()}.value" for i_sk in self.sk_fcurve_idx.tolist()]
+        for data_path in self.sk_fcurve_paths:
+            find_or_create_fcurve(self.sk_action.fcurves, data_path, num_frames)
+
+        # custom properties are animated on the object itself, so their fcurves go in a second action on the object's AnimData
+        # (created with every keyframe point up front, just like the shape key fcurves, rather than one keyframe_insert per frame)
+        self.prop_action = None
+        self.replaced_action = self.target.animation_data.action
+        if self.custom_props:
+            self.prop_action = get_or_create_action(actions, f"{action_name}_customprop", new_actions)
+            self.target.animation_data.action = self.prop_action
+        self.custom_prop_paths = [f"[\"{custom_prop}\"]" for custom_prop in self.custom_props]
+        for data_path in self.custom_prop_paths:
+            find_or_create_fcurve(self.prop_action.fcurves, data_path, num_frames)
+
+    '''
+    Writes the frame matrices to the fcurves with one foreach_set per fcurve (see write_keyframes).
+    Pass [partial] while frames are still arriving: this skips dropping constant channels and keyframe reduction, which only make sense once the whole clip is known.
+    '''
+    def update_keyframes(self, partial=False):
+        if self.drop_constant and not partial:
+            self.drop_constant_fcurves()
+        frame_nums = self.start_frame + np.arange(len(self.sk_frames), dtype=np.float32)
+        # one column per fcurve, shape keys first then custom properties
+        values = np.hstack([self.sk_frames[:, self.sk_fcurve_idx], self.custom_prop_frames])
+        keep = None
+        if not partial:
+            keep, self.simplify_stats = simplify_keyframes(values, self.simplify_tolerance)
+        for i,fc in enumerate(self.find_fcurves()):
+            write_keyframes(fc, frame_nums, values[:, i], None if keep is None else keep[:, i])
+
+    '''
+    Writes rows [start] to [end] of the frame matrices to the fcurves (see write_keyframe_range), leaving the keyframes of every other row as they are,
+    so streaming frames in costs as much as the new frames rather than the whole clip so far. Like update_keyframes with [partial] set,
+    this doesn't drop or simplify anything. Rows between the end of a (shorter) fcurve and [start] are written as well, so no curve is left with a gap.
+    '''
+    def update_keyframe_range(self, start, end):
+        fcurves = self.find_fcurves()
+        start = min([start] + [len(fc.keyframe_points) for fc in fcurves])
+        frame_nums = self.start_frame + np.arange(start, end, dtype=np.float32)
+        values = np.hstack([self.sk_frames[start:end, self.sk_fcurve_idx], self.custom_prop_frames[start:end]])
+        for i,fc in enumerate(fcurves):
+            write_keyframe_range(fc, start, frame_nums, values[:, i])
+
+    '''
+    Returns the fcurve of every column written by update_keyframes, shape keys first then custom properties.
+    Fcurves are looked up by data path just before writing rather than held on to, as another target baking into the same action
+    may have removed them since (see drop_constant_fcurves).
+    '''
+    def find_fcurves(self):
+        columns = [(self.sk_action.fcurves, path) for path in self.sk_fcurve_paths] + [(self.prop_action.fcurves, path) for path in self.custom_prop_paths]
+        return [find_or_create_fcurve(fcurves, data_path, 0) for fcurves,data_path in columns]
+
+    '''
+    Removes every shape key fcurve whose values stay constant across all frames (see remove_constant_fcurves), and sets that constant on the shape key itself.
+    '''
+    def drop_constant_fcurves(self):
+        constant = remove_constant_fcurves(self.sk_action.fcurves, self.sk_fcurve_paths, self.sk_frames[:, self.sk_fcurve_idx])
+        key_blocks = self.target.data.shape_keys.key_blocks
+        for i_sk in self.sk_fcurve_idx[constant].tolist():
+            key_blocks[i_sk].value = float(self.sk_frames[0, i_sk])
+        self.sk_fcurve_paths = [path for path,is_constant in zip(self.sk_fcurve_paths, constant.tolist()) if not is_constant]
+        self.sk_fcurve_idx = self.sk_fcurve_idx[~constant]
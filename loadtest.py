@@ -0,0 +1,116 @@
+'''
+End-to-end load test of Client -> inference server -> create_action_with_blendshapes.
+Like benchmark.py this needs a running Blender, so run it headless with the add-on installed:
+
+    blender --background --factory-startup --python loadtest.py -- [--endpoints URL [URL ...]] [--concurrency 1 2 4 8] [--seconds 5 30 120]
+
+Without --endpoints a stand-in server (see standin_server.py) is started in-process, and the remaining stand-in options
+(--latency, --realtime-factor, --jitter, --error-rate) configure it.
+For each payload size and concurrency level, the same synthetic WAV file is requested repeatedly from that many threads at once,
+then one request per payload size is baked onto a benchmark target to time the whole round trip.
+'''
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ai_animator.audio import encode_wav
+from ai_animator.action import create_action_with_blendshapes
+from ai_animator.benchmark import create_benchmark_target, remove_actions
+from ai_animator.client import Client, ConnectionPool
+from ai_animator.standin_server import start_standin_server
+
+'''
+Writes [seconds] of synthetic speech-like audio (an amplitude-modulated tone) at [rate] Hz to a 16-bit mono WAV file in [directory].
+'''
+def write_test_audio(directory, seconds, rate=16000):
+    t = np.arange(int(seconds * rate)) / rate
+    samples = 0.3 * np.sin(2 * np.pi * 220 * t) * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    path = os.path.join(directory, f"loadtest_{seconds}s.wav")
+    with open(path, "wb") as outfile:
+        outfile.write(encode_wav(samples.astype(np.float32), rate))
+    return path
+
+'''
+Sends [num_requests] requests for [filepath] through [client], [concurrency] at a time.
+Returns the latency of every successful request, the wall-clock time for all of them and the number that failed.
+'''
+def run_load(client, filepath, concurrency, num_requests):
+    def timed_request(_):
+        start = time.perf_counter()
+        try:
+            client.request(filepath)
+        except Exception as e:
+            print(f"Request failed : {e}")
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_request, range(num_requests)))
+    elapsed = time.perf_counter() - start
+    latencies = [r for r in results if r is not None]
+    return latencies, elapsed, len(results) - len(latencies)
+
+'''
+Prints throughput and p50/p95/p99 latency for every combination of [concurrency] level and payload length in [seconds],
+then the time to request and bake one clip of each length.
+Requests go to [endpoints], or to an in-process stand-in server configured by [standin_kwargs] if none are given.
+'''
+def load_test(endpoints=None, concurrency=(1, 2, 4, 8), seconds=(5, 30, 120), requests_per_level=16, **standin_kwargs):
+    server = None
+    if not endpoints:
+        server = start_standin_server(**standin_kwargs)
+        endpoints = [server.url]
+        print(f"Started stand-in server at {server.url}")
+    client = Client(endpoints, pool=ConnectionPool(max_idle_per_host=max(concurrency)))
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            files = {s: write_test_audio(directory, s) for s in seconds}
+            for s in seconds:
+                for c in concurrency:
+                    latencies, elapsed, errors = run_load(client, files[s], c, requests_per_level)
+                    if not latencies:
+                        print(f"{s:>5}s audio x{c:<3}: all {errors} requests failed")
+                        continue
+                    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+                    throughput = len(latencies) / elapsed
+                    print(f"{s:>5}s audio x{c:<3}: {throughput:7.2f} req/s ({throughput * s:8.1f}s of audio/s), "
+                          f"p50 {p50:6.3f}s, p95 {p95:6.3f}s, p99 {p99:6.3f}s, {errors} errors")
+            target = create_benchmark_target()
+            for s in seconds:
+                action_name = f"AIAnimatorLoadTest_{s}"
+                remove_actions(action_name)
+                start = time.perf_counter()
+                frames = client.request(files[s])
+                requested = time.perf_counter()
+                create_action_with_blendshapes([target], frames, action_name=action_name)
+                baked = time.perf_counter()
+                print(f"round trip {s:>5}s audio ({len(frames)} frames): request {requested - start:6.3f}s, bake {baked - requested:6.3f}s")
+    finally:
+        client.pool.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Load test the inference round trip")
+    parser.add_argument("--endpoints", nargs="*", default=None)
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", nargs="+", type=float, default=[5, 30, 120])
+    parser.add_argument("--requests", type=int, default=16, help="requests per concurrency level and payload size")
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--realtime-factor", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+    load_test(args.endpoints, tuple(args.concurrency), tuple(args.seconds), args.requests,
+        latency=args.latency, realtime_factor=args.realtime_factor, jitter=args.jitter, error_rate=args.error_rate)
+
+if __name__ == "__main__":
+    # blender passes the script's own arguments after "--"
+    main(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
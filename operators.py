@@ -1,11 +1,23 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import bpy
+import numpy as np
 from bpy_extras.io_utils import ImportHelper
 
-from ai_animator.client import Client
-from ai_animator.action import create_action_with_blendshapes
+from ai_animator import jobs, timing
+from ai_animator.client import Client, parse_endpoints, MODEL_FPS
+from ai_animator.cache import get_cache
+from ai_animator.audio import wav_duration
+from ai_animator.keyframes import conform_frames
+from ai_animator.capture import load_capture, parse_takes
+from ai_animator.blendshapes import LiveLinkTarget, place_by_timecode
+from ai_animator.action import _ARKIT_BLENDSHAPES, ProgressiveBake, bake_to_nla, create_action_with_blendshapes, push_actions_to_nla, scene_framerate
 
 from bpy.props import (IntProperty,
                        BoolProperty,
+                       EnumProperty,
                        StringProperty,
                        CollectionProperty,
                        PointerProperty)
@@ -15,35 +27,454 @@ from bpy.types import (Operator,
                        PropertyGroup,
                        UIList)
 
-class GenerateBlendshapesOperator(bpy.types.Operator):
+def addon_preferences(context):
+    return context.preferences.addons[__package__].preferences
+
+'''
+Creates a Client for the inference servers configured in the add-on preferences (must be called on the main thread).
+Stage timings of its requests are recorded to [timer].
+'''
+def create_client(context, timer=timing.NULL_TIMER):
+    prefs = addon_preferences(context)
+    cache = None
+    if prefs.cache_enabled:
+        cache = get_cache(bpy.path.abspath(prefs.cache_directory), prefs.cache_max_mb * 1024 * 1024)
+    return Client(parse_endpoints(prefs.endpoints), strategy=prefs.endpoint_strategy, cache=cache, model_version=prefs.model_version,
+        window_seconds=prefs.window_seconds if prefs.windowed_inference else None,
+        overlap_seconds=prefs.window_overlap_seconds, max_workers=prefs.max_parallel_requests,
+        preprocess_sample_rate=prefs.preprocess_sample_rate if prefs.preprocess_audio else None,
+        silence_threshold_db=prefs.silence_threshold_db if prefs.skip_silence else None,
+        timeout=prefs.request_timeout or None, deadline=prefs.request_deadline or None, max_retries=prefs.max_retries,
+        hedge_percentile=prefs.hedge_percentile if prefs.hedge_requests else None, timer=timer)
+
+'''
+Returns a timing.StageTimer for a run labelled [label] if timing is enabled in the add-on preferences (otherwise timing.NULL_TIMER).
+'''
+def create_run_timer(context, label):
+    prefs = addon_preferences(context)
+    return timing.create_timer(label, prefs.timing_enabled, bpy.path.abspath(prefs.timing_log_path) if prefs.timing_log_path else None)
+
+'''
+Returns the keyframe options from the add-on preferences ([sparse], [drop_constant] and [simplify_tolerance]) as keyword arguments
+for create_action_with_blendshapes, ProgressiveBake and LiveLinkTarget.from_frames.
+'''
+def bake_options(context):
+    prefs = addon_preferences(context)
+    return {
+        "sparse":prefs.sparse_fcurves,
+        "drop_constant":prefs.drop_constant_fcurves,
+        "simplify_tolerance":prefs.simplify_tolerance if prefs.simplify_keyframes else None,
+    }
+
+def skipped_summary(client):
+    if client.skipped_seconds == 0:
+        return ""
+    return f" (skipped {client.skipped_seconds:.1f}s of silence)"
+
+'''
+Bakes the frame data returned by a finished generation job into [target_names] (runs on the main thread), then finishes [timer].
+The frames are resampled from MODEL_FPS to [scene_fps] (if passed) and keyed from scene frame [start_frame], i.e. where the sound starts playing.
+[options] (see bake_options) are passed through to create_action_with_blendshapes.
+'''
+def bake_generation(job, target_names, start_frame=0, scene_fps=None, options=None, timer=timing.NULL_TIMER):
+    if job.error is not None:
+        return
+    job.message = "Baking"
+    targets = [bpy.data.objects[name] for name in target_names if name in bpy.data.objects]
+    create_action_with_blendshapes(targets, job.result, start_frame=start_frame, source_fps=MODEL_FPS, target_fps=scene_fps, timer=timer, **(options or {}))
+    timer.finish()
+
+'''
+Starts a generation job for [filepath] that bakes frames into [target_names] as they are streamed back
+(resampled to [scene_fps] and placed at [start_frame], see bake_generation).
+The fcurves are sized from the WAV duration up front (if it can be read) so partial updates don't have to recreate them.
+[options] (see bake_options) are passed through to ProgressiveBake.
+'''
+def submit_progressive_generation(client, filepath, target_names, start_frame=0, scene_fps=None, options=None):
+    duration = wav_duration(filepath)
+    expected_frames = int(round(duration * MODEL_FPS)) if duration else 0
+    targets = [bpy.data.objects[name] for name in target_names if name in bpy.data.objects]
+    bake = ProgressiveBake(targets, expected_frames, start_frame=start_frame, source_fps=MODEL_FPS, target_fps=scene_fps, timer=client.timer, **(options or {}))
+
+    def finish(job):
+        if job.error is None:
+            job.message = "Baking"
+            bake.finish()
+            client.timer.finish()
+
+    return jobs.submit(os.path.basename(filepath),
+        lambda job: client.request(filepath, progress=job.set_progress, on_frames=bake.push),
+        finish,
+        on_poll=lambda job: bake.apply_pending())
+
+'''
+Returns the unmuted sound strips in the sequencer of [scene], ordered by frame_start.
+If [channel] is non-zero, only strips in that channel are returned.
+'''
+def collect_sound_strips(scene, channel=0):
+    if scene.sequence_editor is None:
+        return []
+    strips = [s for s in scene.sequence_editor.sequences_all if s.type == 'SOUND' and not s.mute and (channel == 0 or s.channel == channel)]
+    return sorted(strips, key=lambda s: s.frame_start)
+
+'''
+Worker-thread half of a batch generation: requests frames for every path in [filepaths] concurrently (at most [max_workers] at once).
+Progress is reported to [job] as the average over all files.
+Returns a dict of filepath -> (frames, seconds taken) for the files that succeeded, and a dict of filepath -> exception for those that failed.
+'''
+def generate_batch(job, client, filepaths, max_workers):
+    fractions = dict.fromkeys(filepaths, 0.0)
+    results = {}
+    errors = {}
+
+    def report(filepath, fraction):
+        fractions[filepath] = fraction
+        done = len(results) + len(errors)
+        job.set_progress(sum(fractions.values()) / len(fractions), f"{done}/{len(fractions)} strips done")
+
+    def generate(filepath):
+        start = time.perf_counter()
+        try:
+            frames = client.request(filepath, progress=lambda fraction, message: report(filepath, fraction))
+        except jobs.JobCancelled:
+            raise
+        except Exception as e:
+            errors[filepath] = e
+            print(f"Generation failed for {filepath} : {e}")
+        else:
+            results[filepath] = (frames, time.perf_counter() - start)
+        report(filepath, 1.0)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ai_animator_batch") as executor:
+        # list() re-raises the first worker exception (e.g. JobCancelled) once every request has stopped
+        list(executor.map(generate, fractions))
+    if not results and errors:
+        raise next(iter(errors.values()))
+    return results, errors
+
+'''
+Bakes the results of a finished batch job into [target_names] (runs on the main thread).
+[strips] is a list of (strip name, filepath, frame_start) tuples ordered by frame_start.
+Every result is first resampled from MODEL_FPS to [scene_fps] (if passed) onto the whole scene frames from its strip's frame_start on.
+With [output] 'ACTION' every result is placed at its strip's frame_start in a single action (later strips win where strips overlap,
+gaps between strips are keyed at the rest pose). With 'NLA' each strip is baked to its own new actions (shape keys and custom properties)
+and pushed to an NLA strip at frame_start (see action.bake_to_nla).
+[options] (see bake_options) are passed through to create_action_with_blendshapes.
+'''
+def bake_batch(job, strips, target_names, output, scene_fps=None, action_name="BlenderAIAnimatorAction", options=None, timer=timing.NULL_TIMER):
+    if job.error is not None:
+        return
+    job.message = "Baking"
+    results, errors = job.result
+    targets = [bpy.data.objects[name] for name in target_names if name in bpy.data.objects]
+    placed = []
+    for name, filepath, frame_start in strips:
+        if filepath in results:
+            frames = np.asarray(results[filepath][0], dtype=np.float32)
+            if frames.size == 0:
+                frames = frames.reshape(0, len(_ARKIT_BLENDSHAPES))
+            if frames.ndim != 2 or frames.shape[1] != len(_ARKIT_BLENDSHAPES):
+                raise ValueError(f"Expected each frame for {name} to contain {len(_ARKIT_BLENDSHAPES)} values, but frame data has shape {frames.shape}")
+            if scene_fps is not None:
+                with timer.stage("bake_conform", num_frames=len(frames)):
+                    frames, frame_start = conform_frames(frames, MODEL_FPS, scene_fps, frame_start)
+            placed += [(name, int(round(frame_start)), frames)]
+    for name, filepath, _ in strips:
+        if filepath in results:
+            print(f"{name}: {len(results[filepath][0])} frames in {results[filepath][1]:.1f}s")
+        else:
+            print(f"{name}: failed ({errors[filepath]})")
+    if output == 'NLA':
+        for name, frame_start, frames in placed:
+            bake_to_nla(targets, frames, name, frame_start, f"{action_name}_{name}", timer=timer, **(options or {}))
+        timer.finish()
+        return
+    first = min(frame_start for _, frame_start, _ in placed)
+    end = max(frame_start + len(frames) for _, frame_start, frames in placed)
+    combined = np.zeros((end - first, len(_ARKIT_BLENDSHAPES)), dtype=np.float32)
+    for _, frame_start, frames in placed:
+        combined[frame_start - first:frame_start - first + len(frames)] = frames
+    create_action_with_blendshapes(targets, combined, action_name=action_name, start_frame=first, timer=timer, **(options or {}))
+    timer.finish()
+
+'''
+Returns the LiveLinkFace CSV takes in [directory], ordered by name.
+'''
+def collect_takes(directory):
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".csv"))
+
+def take_name(filepath):
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+'''
+Worker-thread half of a bulk import: parses every take in [filepaths] in up to [max_workers] processes (see capture.parse_takes).
+Progress is reported to [job] per take. Returns the dict of filepath -> parse result and the wall-clock seconds the parse took.
+'''
+def parse_take_files(job, filepaths, max_workers):
+    done = []
+
+    def report(filepath, result):
+        done.append(filepath)
+        job.set_progress(len(done) / len(filepaths), f"{len(done)}/{len(filepaths)} takes parsed")
+
+    start = time.perf_counter()
+    results = parse_takes(filepaths, max_workers, progress=report)
+    return results, time.perf_counter() - start
+
+'''
+Bakes every take parsed by a finished bulk import job into [target_names] (runs on the main thread), each into an action named after its file.
+Takes are loaded from the sidecars the workers wrote (so they are memory-mapped rather than re-parsed).
+With [output] 'NLA' each take is also pushed to its own NLA track, one after another from [start_frame].
+The time spent baking each take is added to its result as "bake_seconds", and per-take timings are printed to the console.
+[options] (see bake_options) are passed through to LiveLinkTarget.from_frames.
+'''
+def bake_takes(job, filepaths, target_names, output, use_first_frame_as_zero, start_frame, timecode_framerate=None, options=None, timer=timing.NULL_TIMER):
+    if job.error is not None:
+        return
+    job.message = "Baking"
+    results, _ = job.result
+    targets = [bpy.data.objects[name] for name in target_names if name in bpy.data.objects]
+    frame = start_frame
+    for filepath in filepaths:
+        name = take_name(filepath)
+        result = results[filepath]
+        if "error" in result:
+            print(f"{name}: failed ({result['error']})")
+            continue
+        start = time.perf_counter()
+        with timer.stage("load", num_frames=result["num_frames"]):
+            capture = load_capture(filepath, write=False)
+        frames = capture.relative_to_first_frame() if use_first_frame_as_zero else capture.frames
+        result["dropped_frames"] = 0
+        if timecode_framerate and len(capture.timecodes):
+            with timer.stage("place_by_timecode", num_frames=len(frames)):
+                frames, result["dropped_frames"] = place_by_timecode(frames, capture.timecodes, timecode_framerate)
+        with timer.stage("bake_keyframes", num_frames=len(frames)):
+            baked = LiveLinkTarget.from_frames(targets, frames, action_name=name, **(options or {}))
+        if output == 'NLA':
+            push_actions_to_nla(baked, frame, name)
+            frame += len(frames)
+        result["bake_seconds"] = time.perf_counter() - start
+        source = "sidecar" if result["cached"] else "CSV"
+        dropped = f" ({result['dropped_frames']} dropped frames filled in)" if result["dropped_frames"] else ""
+        print(f"{name}: {len(frames)} frames{dropped}, parsed from {source} in {result['seconds']:.2f}s, baked in {result['bake_seconds']:.2f}s")
+    timer.finish()
+
+'''
+Base class for operators that run a jobs.Job and stay modal until it has been handed back, so they can report the outcome.
+Subclasses set self.job in execute and then return start_modal(context); Esc cancels the job.
+'''
+class JobOperator(bpy.types.Operator):
+    def start_modal(self, context):
+        self._timer = context.window_manager.event_timer_add(0.1, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    # the message reported once the job has finished successfully
+    def summary(self):
+        return f"Finished {self.job.label} in {self.job.elapsed:.1f}s"
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS' and not self.job.finished:
+            self.job.cancel()
+            return {'RUNNING_MODAL'}
+        # the job is only dropped from the registry once its result has been handed back (and baked) on the main thread
+        if jobs.get_job(self.job.id) is not None:
+            return {'PASS_THROUGH'}
+        context.window_manager.event_timer_remove(self._timer)
+        if self.job.error is not None:
+            self.report({"ERROR"}, str(self.job.error))
+            return {"CANCELLED"}
+        if self.job.cancelled:
+            self.report({"INFO"}, f"Cancelled generation for {self.job.label}")
+            return {"CANCELLED"}
+        self.report({"INFO"}, self.summary())
+        return {'FINISHED'}
+
+class GenerateBlendshapesOperator(JobOperator):
+    """Generate blendshape animation for the active sound strip (runs in the background, press Esc to cancel)"""
     bl_idname = "scene.ai_animator_generate_blendshapes_operator"
     bl_label = "ai_animator_generate_blendshapes_button"
     
     def checkPrereqs(self, context):
         if len(context.scene.ai_animator_targets) == 0:
             self.report({"ERROR"}, "No target object selected")
-        elif bpy.context.scene.sequence_editor.active_strip is None:
+        elif context.scene.sequence_editor is None or context.scene.sequence_editor.active_strip is None:
             self.report({"ERROR"}, "No audio is selected in the Sequencer")
+        elif context.scene.sequence_editor.active_strip.type != 'SOUND':
+            # only sound strips have a .sound to upload
+            self.report({"ERROR"}, f"The active strip '{context.scene.sequence_editor.active_strip.name}' is not a sound strip")
         else:
             return True
         return False
 
+    # the upload and inference run on a worker thread (see jobs.py), this operator just stays modal so it can report the outcome
     def execute(self, context):
         if self.checkPrereqs(context):
-            try:
-                client = Client()
-                frame_data = client.request(bpy.context.scene.sequence_editor.active_strip.sound.filepath)
-                #frame_data = [[float(i)/60.0 for i in range(51)] for _ in range(60)]
-                create_action_with_blendshapes([t.obj for t in context.scene.ai_animator_targets], frame_data)
-                # do something 
-                return {'FINISHED'}
-            except Exception as e:
-                self.report({"ERROR"}, e)
-                return {"CANCELLED"}
+            # resolve everything that needs bpy here, the worker thread only gets plain values
+            filepath = bpy.path.abspath(context.scene.sequence_editor.active_strip.sound.filepath)
+            target_names = [t.obj.name for t in context.scene.ai_animator_targets]
+            start_frame = context.scene.sequence_editor.active_strip.frame_start
+            scene_fps = scene_framerate(context.scene)
+            options = bake_options(context)
+            timer = create_run_timer(context, os.path.basename(filepath))
+            with timer.stage("prepare"):
+                client = self.client = create_client(context, timer)
+            if addon_preferences(context).progressive_preview:
+                self.job = submit_progressive_generation(client, filepath, target_names, start_frame, scene_fps, options)
+            else:
+                self.job = jobs.submit(os.path.basename(filepath),
+                    lambda job: client.request(filepath, progress=job.set_progress),
+                    lambda job: bake_generation(job, target_names, start_frame, scene_fps, options, timer))
+            return self.start_modal(context)
         else:
             print("Prereq check failed")
             return {"CANCELLED"}
 
+    def summary(self):
+        return f"Generated {len(self.job.result)} frames for {self.job.label} in {self.job.elapsed:.1f}s" + skipped_summary(self.client)
+
+class GenerateAllBlendshapesOperator(JobOperator):
+    """Generate blendshape animation for every sound strip in the sequencer at once (runs in the background, press Esc to cancel)"""
+    bl_idname = "scene.ai_animator_generate_all_blendshapes_operator"
+    bl_label = "ai_animator_generate_all_blendshapes_button"
+
+    channel: IntProperty(
+        name="Channel",
+        description="Only generate for sound strips in this sequencer channel (0 for every channel)",
+        default=0,
+        min=0)
+
+    output: EnumProperty(
+        name="Output",
+        items=(
+            ('ACTION', "Single action", "Bake every strip into one action, each at its strip's start frame"),
+            ('NLA', "NLA strips", "Bake each strip into its own action and place it in an NLA strip at the strip's start frame")),
+        default='ACTION')
+
+    def execute(self, context):
+        if len(context.scene.ai_animator_targets) == 0:
+            self.report({"ERROR"}, "No target object selected")
+            return {"CANCELLED"}
+        sound_strips = collect_sound_strips(context.scene, self.channel)
+        if not sound_strips:
+            self.report({"ERROR"}, "No sound strips found in the Sequencer")
+            return {"CANCELLED"}
+        # resolve everything that needs bpy here, the worker thread only gets plain values
+        strips = [(s.name, bpy.path.abspath(s.sound.filepath), s.frame_start) for s in sound_strips]
+        # strips that share a sound only need to be generated once
+        filepaths = list(dict.fromkeys(filepath for _, filepath, _ in strips))
+        target_names = [t.obj.name for t in context.scene.ai_animator_targets]
+        timer = create_run_timer(context, f"{len(strips)} sound strips")
+        with timer.stage("prepare"):
+            client = self.client = create_client(context, timer)
+        max_workers = addon_preferences(context).max_parallel_requests
+        output = self.output
+        scene_fps = scene_framerate(context.scene)
+        options = bake_options(context)
+        self.job = jobs.submit(f"{len(strips)} sound strips",
+            lambda job: generate_batch(job, client, filepaths, max_workers),
+            lambda job: bake_batch(job, strips, target_names, output, scene_fps, options=options, timer=timer))
+        return self.start_modal(context)
+
+    def summary(self):
+        results, errors = self.job.result
+        num_frames = sum(len(frames) for frames, _ in results.values())
+        request_seconds = sum(seconds for _, seconds in results.values())
+        summary = f"Generated {num_frames} frames for {len(results)} sounds in {self.job.elapsed:.1f}s ({request_seconds:.1f}s of requests)"
+        if errors:
+            summary += f", {len(errors)} failed (see console)"
+        return summary + skipped_summary(self.client)
+
+class BulkImportTakesOperator(JobOperator):
+    """Import every LiveLinkFace CSV take in a folder as its own action (parsed in parallel in the background, press Esc to cancel)"""
+    bl_idname = "scene.ai_animator_bulk_import_takes_operator"
+    bl_label = "Import LiveLinkFace Takes"
+
+    directory: StringProperty(
+        name="Folder",
+        subtype='DIR_PATH')
+
+    output: EnumProperty(
+        name="Output",
+        items=(
+            ('ACTION', "Actions", "Bake each take into its own action"),
+            ('NLA', "NLA strips", "Bake each take into its own action and place them one after another in NLA strips from the scene start")),
+        default='ACTION')
+
+    use_first_frame_as_zero: BoolProperty(
+        name="Use first frame as rest pose",
+        description="Subtract the first frame of each take from every frame",
+        default=False)
+
+    timecode_framerate: StringProperty(
+        name="Timecode rate",
+        description="Frame rate of the take timecodes (e.g. 60 or 59.94). If set, frames are placed by their timecode and dropped frames are filled in, otherwise every row is the next frame",
+        default="")
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        if len(context.scene.ai_animator_targets) == 0:
+            self.report({"ERROR"}, "No target object selected")
+            return {"CANCELLED"}
+        directory = bpy.path.abspath(self.directory)
+        filepaths = collect_takes(directory) if os.path.isdir(directory) else []
+        if not filepaths:
+            self.report({"ERROR"}, f"No CSV takes found in {directory}")
+            return {"CANCELLED"}
+        # resolve everything that needs bpy here, the worker thread only gets plain values
+        target_names = [t.obj.name for t in context.scene.ai_animator_targets]
+        output = self.output
+        use_first_frame_as_zero = self.use_first_frame_as_zero
+        timecode_framerate = self.timecode_framerate.strip() or None
+        if timecode_framerate is not None:
+            try:
+                valid = float(timecode_framerate) > 0
+            except ValueError:
+                valid = False
+            if not valid:
+                self.report({"ERROR"}, f"Not a valid timecode rate : {timecode_framerate}")
+                return {"CANCELLED"}
+        start_frame = context.scene.frame_start
+        options = bake_options(context)
+        timer = create_run_timer(context, f"{len(filepaths)} takes")
+        self.job = jobs.submit(f"{len(filepaths)} takes",
+            lambda job: parse_take_files(job, filepaths, os.cpu_count()),
+            lambda job: bake_takes(job, filepaths, target_names, output, use_first_frame_as_zero, start_frame, timecode_framerate, options, timer))
+        return self.start_modal(context)
+
+    def summary(self):
+        results, parse_seconds = self.job.result
+        baked = [result for result in results.values() if "bake_seconds" in result]
+        num_frames = sum(result["num_frames"] for result in baked)
+        bake_seconds = sum(result["bake_seconds"] for result in baked)
+        cached = sum(1 for result in baked if result["cached"])
+        summary = (f"Imported {len(baked)} takes ({num_frames} frames) in {parse_seconds + bake_seconds:.1f}s: "
+            f"parsed in {parse_seconds:.1f}s ({cached} from sidecars), baked in {bake_seconds:.1f}s")
+        failed = len(results) - len(baked)
+        if failed:
+            summary += f", {failed} failed (see console)"
+        return summary
+
+class CancelJobOperator(bpy.types.Operator):
+    """Cancel a running generation"""
+    bl_idname = "scene.ai_animator_cancel_job_operator"
+    bl_label = "Cancel"
+    bl_options = {'INTERNAL'}
+
+    job_id: StringProperty()
+
+    def execute(self, context):
+        job = jobs.get_job(self.job_id)
+        if job is None:
+            self.report({'INFO'}, "Job already finished")
+            return {"CANCELLED"}
+        job.cancel()
+        return {'FINISHED'}
+
 class SynthesizeSpeechOperator(bpy.types.Operator):
     bl_idname = "scene.ai_animator_synthesize_speech_operator"
     bl_label = "ai_animator_synthesize_speech_button"
@@ -368,7 +799,24 @@ class AIAnimatorBlendshapeTab(bpy.types.Panel):
         col.operator("custom.list_action", icon='ADD', text="").action = 'ADD'
         col.operator("custom.list_action", icon='REMOVE', text="").action = 'REMOVE'
         row = box.row()
-        row.operator("scene.ai_animator_generate_operator", text="Generate Blendshapes")
+        row.operator("scene.ai_animator_generate_blendshapes_operator", text="Generate Blendshapes")
+        row = box.row()
+        row.prop(context.scene, "ai_animator_batch_channel")
+        row.prop(context.scene, "ai_animator_batch_output", text="")
+        op = row.operator("scene.ai_animator_generate_all_blendshapes_operator", text="Generate All Strips")
+        op.channel = context.scene.ai_animator_batch_channel
+        op.output = context.scene.ai_animator_batch_output
+        row = box.row()
+        row.operator("scene.ai_animator_bulk_import_takes_operator", text="Import LiveLinkFace Takes")
+        for job in jobs.active_jobs():
+            row = box.row()
+            row.label(text=f"{job.label}: {job.message} ({job.progress * 100:.0f}%, {job.elapsed:.0f}s)")
+            row.operator("scene.ai_animator_cancel_job_operator", icon='CANCEL', text="").job_id = job.id
+        run = timing.last_run()
+        if run is not None and addon_preferences(context).timing_enabled:
+            box.label(text=f"Last run: {run.label} in {run.total_seconds:.2f}s")
+            for name, stage in run.stages.items():
+                box.label(text=timing.format_stage(name, stage))
 
 #class AIAnimatorPanel(bpy.types.Panel):
 #    bl_idname = "VIEW3D_PT_ai_animator"
@@ -6,7 +6,7 @@ from typing import Tuple
 import datetime
 import uuid
 import numpy as np
-from livelinkface.timecode import Timecode
+from ai_animator.timecode import CompactTimecode
 
 class FaceBlendShape(Enum):
     EyeBlinkLeft = 0
@@ -72,6 +72,13 @@ class FaceBlendShape(Enum):
     RightEyeRoll = 60
 
 
+def seconds_since_midnight() -> float:
+    """ The local wall-clock time in seconds, which LiveLinkFace packets are 
+    timecoded with. """
+    now = datetime.datetime.now()
+    return now.hour * 3600 + now.minute * 60 + now.second + now.microsecond * 1e-6
+
+
 class PyLiveLinkFace:
     """PyLiveLinkFace class
 
@@ -89,10 +96,7 @@ class PyLiveLinkFace:
         self._filter_size = filter_size
 
         self._version = 6
-        now = datetime.datetime.now()
-        timcode = Timecode(
-            self._fps, f'{now.hour}:{now.minute}:{now.second}:{now.microsecond * 0.001}')
-        self._frames = timcode.frames
+        self._frames = CompactTimecode.from_seconds(self._fps, seconds_since_midnight()).frames
         self._sub_frame = 1056060032                # I don't know how to calculate this
         self._denominator = int(self._fps / 60)     # 1 most of the time
         self._blend_shapes = [0.000] * 61
@@ -139,9 +143,7 @@ class PyLiveLinkFace:
         name_lenght_packed = struct.pack('!i', len(self._name))
         name_packed = bytes(self._name, 'utf-8')
 
-        now = datetime.datetime.now()
-        timcode = Timecode(
-            self._fps, f'{now.hour}:{now.minute}:{now.second}:{now.microsecond * 0.001}')
+        timcode = CompactTimecode.from_seconds(self._fps, seconds_since_midnight())
         frames_packed = struct.pack("!II", timcode.frames, self._sub_frame)  
         frame_rate_packed = struct.pack("!II", self._fps, self._denominator)
         data_packed = struct.pack('!B61f', 61, *self._blend_shapes)
@@ -0,0 +1,197 @@
+'''
+A stand-in for the inference server, for measuring the add-on end to end without a GPU.
+It only needs the Python standard library, so it can be run from any Python 3 install:
+
+    python standin_server.py --port 8080 --latency 0.2 --realtime-factor 0.05
+
+It accepts the same multipart upload as the real server (the audio in an 'audio' field) and answers with synthetic frame data
+of the right shape: NUM_CHANNELS weights per frame, FPS frames per second of uploaded audio.
+The response format is negotiated from the Accept header the same way as the real server (see client.py):
+a chunked frame stream, the raw frames format, or JSON for clients that don't ask for either.
+'''
+import argparse
+import io
+import json
+import math
+import random
+import struct
+import threading
+import time
+import wave
+from email import policy
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NUM_CHANNELS = 52
+FPS = 60
+
+# these mirror client.FRAMES_CONTENT_TYPE / FRAME_STREAM_CONTENT_TYPE (client.py needs bpy, so it can't be imported here)
+FRAMES_CONTENT_TYPE = 'application/x-ai-animator-frames'
+FRAMES_MAGIC = b'AIFR'
+_FRAMES_HEADER = struct.Struct('<4sII')
+FRAME_STREAM_CONTENT_TYPE = 'application/x-ai-animator-frame-stream'
+_FRAME_STREAM_HEADER = struct.Struct('<II')
+
+# uploads that aren't WAV files are assumed to be 16 kHz 16-bit mono PCM when working out their duration
+_FALLBACK_BYTES_PER_SECOND = 16000 * 2
+
+# synthetic frames repeat with this period, so responses are built by tiling one precomputed block instead of computing every value
+_PERIOD_FRAMES = 600
+
+# frames per chunk of a streamed response
+_STREAM_CHUNK_FRAMES = 600
+
+def _period_block():
+    values = []
+    for frame in range(_PERIOD_FRAMES):
+        for channel in range(NUM_CHANNELS):
+            # every channel gets its own whole number of cycles per period, so the block tiles without seams
+            cycles = 1 + channel % 7
+            values.append(0.5 + 0.5 * math.sin(2 * math.pi * (cycles * frame / _PERIOD_FRAMES + channel / NUM_CHANNELS)))
+    return struct.pack(f'<{len(values)}f', *values)
+
+_PERIOD_BLOCK = _period_block()
+_FRAME_BYTES = NUM_CHANNELS * 4
+
+'''
+Returns [num_frames] frames of synthetic weights, starting at frame [start], as little-endian float32 bytes (row-major).
+'''
+def synthetic_frames(num_frames, start=0):
+    offset = (start % _PERIOD_FRAMES) * _FRAME_BYTES
+    size = num_frames * _FRAME_BYTES
+    repeats = (offset + size) // len(_PERIOD_BLOCK) + 1
+    return (_PERIOD_BLOCK * repeats)[offset:offset + size]
+
+'''
+Returns the duration in seconds of the uploaded audio [data].
+'''
+def audio_duration(data):
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (wave.Error, EOFError):
+        return len(data) / _FALLBACK_BYTES_PER_SECOND
+
+'''
+Returns the named fields of a multipart/form-data [body] as a dict of field name -> bytes.
+'''
+def parse_multipart(content_type, body):
+    message = BytesParser(policy=policy.HTTP).parsebytes(b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+    named_parts = ((part.get_param('name', header='content-disposition'), part) for part in message.iter_parts())
+    return {name: part.get_payload(decode=True) for name, part in named_parts if name is not None}
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        fields = parse_multipart(self.headers.get('Content-Type', ''), body)
+        if 'audio' not in fields:
+            self._reply(400, 'text/plain', b'Missing audio field')
+            return
+        duration = audio_duration(fields['audio'])
+        num_frames = int(round(duration * FPS))
+        self.server.simulate_inference(duration)
+        if random.random() < self.server.error_rate:
+            self._reply(503, 'text/plain', b'Simulated failure')
+            return
+        accept = self.headers.get('Accept', '')
+        if FRAME_STREAM_CONTENT_TYPE in accept:
+            self._stream(num_frames)
+        elif FRAMES_CONTENT_TYPE in accept:
+            self._reply(200, FRAMES_CONTENT_TYPE, _FRAMES_HEADER.pack(FRAMES_MAGIC, num_frames, NUM_CHANNELS) + synthetic_frames(num_frames))
+        else:
+            frames = struct.unpack(f'<{num_frames * NUM_CHANNELS}f', synthetic_frames(num_frames))
+            rows = [frames[i:i + NUM_CHANNELS] for i in range(0, len(frames), NUM_CHANNELS)]
+            self._reply(200, 'application/json', json.dumps(rows).encode('utf-8'))
+
+    def _reply(self, status, content_type, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    # sends the frames as a chunked FRAME_STREAM_CONTENT_TYPE response, pacing the chunks over the stream delay
+    def _stream(self, num_frames):
+        self.send_response(200)
+        self.send_header('Content-Type', FRAME_STREAM_CONTENT_TYPE)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        starts = range(0, num_frames, _STREAM_CHUNK_FRAMES)
+        for start in starts:
+            count = min(_STREAM_CHUNK_FRAMES, num_frames - start)
+            self._write_chunk(_FRAME_STREAM_HEADER.pack(count, NUM_CHANNELS) + synthetic_frames(count, start))
+            if self.server.stream_delay:
+                time.sleep(self.server.stream_delay / len(starts))
+        self._write_chunk(_FRAME_STREAM_HEADER.pack(0, NUM_CHANNELS))
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, data):
+        self.wfile.write(b'%x\r\n' % len(data) + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+'''
+Serves StandInHandler. Each request sleeps for [latency] seconds, plus [realtime_factor] seconds per second of uploaded audio,
+plus (if [jitter] is set) an exponentially distributed delay with that mean, which gives the long tail real servers have.
+A fraction [error_rate] of requests fail with 503. Streamed responses are spread over a further [stream_delay] seconds.
+'''
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, realtime_factor=0.0, jitter=0.0, error_rate=0.0, stream_delay=0.0, verbose=False):
+        super().__init__(address, StandInHandler)
+        self.latency = latency
+        self.realtime_factor = realtime_factor
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stream_delay = stream_delay
+        self.verbose = verbose
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def simulate_inference(self, duration):
+        delay = self.latency + self.realtime_factor * duration
+        if self.jitter:
+            delay += random.expovariate(1 / self.jitter)
+        time.sleep(delay)
+
+'''
+Starts a StandInServer on a background thread and returns it (call shutdown() to stop it). Pass [port] 0 to pick a free port.
+The remaining keyword arguments are passed through to StandInServer.
+'''
+def start_standin_server(host='127.0.0.1', port=0, **kwargs):
+    server = StandInServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, name=f'standin_server_{server.server_address[1]}', daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Stand-in inference server returning synthetic frame data')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help='fixed delay per request (seconds)')
+    parser.add_argument('--realtime-factor', type=float, default=0.0, help='extra delay per second of uploaded audio (seconds)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='mean of an extra exponentially distributed delay (seconds)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests that fail with 503')
+    parser.add_argument('--stream-delay', type=float, default=0.0, help='time over which streamed responses are spread (seconds)')
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+    server = StandInServer((args.host, args.port), latency=args.latency, realtime_factor=args.realtime_factor, jitter=args.jitter,
+        error_rate=args.error_rate, stream_delay=args.stream_delay, verbose=args.verbose)
+    print(f'Stand-in inference server listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
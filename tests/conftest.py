@@ -0,0 +1,15 @@
+import os
+import sys
+import types
+
+# the add-on is imported as the ai_animator package, but its __init__ registers Blender classes,
+# so the package is set up without running it and the modules are imported directly
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if 'ai_animator' not in sys.modules:
+    package = types.ModuleType('ai_animator')
+    package.__path__ = [_ROOT]
+    sys.modules['ai_animator'] = package
+
+# pytest imports the checkout's __init__ by its directory name (which needn't be ai_animator) before running the tests
+sys.modules.setdefault(os.path.basename(_ROOT), sys.modules['ai_animator'])
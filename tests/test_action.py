@@ -0,0 +1,67 @@
+'''
+Baking tests. These need Blender's bpy, so they are skipped by a plain pytest run. Run them headless with the add-on installed:
+
+    blender --background --factory-startup --python-expr "import sys, pytest; sys.exit(pytest.main(['tests/test_action.py']))"
+'''
+import numpy as np
+import pytest
+
+bpy = pytest.importorskip("bpy")
+
+from ai_animator.action import _ARKIT_BLENDSHAPES, bake_to_nla
+
+
+@pytest.fixture
+def head():
+    mesh = bpy.data.meshes.new("AIAnimatorTestHead")
+    obj = bpy.data.objects.new("AIAnimatorTestHead", mesh)
+    obj.shape_key_add(name="Basis")
+    for name in _ARKIT_BLENDSHAPES[:4]:
+        obj.shape_key_add(name=name)
+    # an ARKit channel without a shape key, which is baked to the custom property instead
+    obj["tongueOut"] = 0.0
+    obj.animation_data_create()
+    user_action = bpy.data.actions.new("AIAnimatorTestUserAction")
+    user_action.fcurves.new("location", index=0).keyframe_points.insert(1, 2.0)
+    obj.animation_data.action = user_action
+    existing = set(bpy.data.actions)
+    yield obj
+    for action in set(bpy.data.actions) - existing | {user_action}:
+        bpy.data.actions.remove(action)
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+
+
+def _strip(animation_data, name):
+    strips = [strip for track in animation_data.nla_tracks for strip in track.strips if strip.name == name]
+    assert len(strips) == 1
+    return strips[0]
+
+
+def test_nla_strips_keep_their_own_custom_properties(head):
+    user_action = head.animation_data.action
+    for name, frame_start, value in [("first", 10, 0.25), ("second", 50, 0.75)]:
+        frames = np.full((20, len(_ARKIT_BLENDSHAPES)), value, dtype=np.float32)
+        bake_to_nla([head], frames, name, frame_start, f"AIAnimatorTest_{name}")
+
+    for name, frame_start, value in [("first", 10, 0.25), ("second", 50, 0.75)]:
+        strip = _strip(head.animation_data, name)
+        assert strip.frame_start == frame_start
+        fc = strip.action.fcurves.find('["tongueOut"]')
+        assert fc is not None and fc.evaluate(5) == pytest.approx(value)
+        sk_strip = _strip(head.data.shape_keys.animation_data, name)
+        assert sk_strip.frame_start == frame_start
+        assert sk_strip.action.fcurves.find(f'key_blocks["{_ARKIT_BLENDSHAPES[0]}"].value').evaluate(5) == pytest.approx(value)
+        assert strip.action is not user_action
+    # the object's own animation is untouched and active again, and nothing is left active on the shape keys
+    assert head.animation_data.action is user_action
+    assert [fc.data_path for fc in user_action.fcurves] == ["location"]
+    assert head.data.shape_keys.animation_data.action is None
+
+
+def test_nla_rebake_creates_new_actions(head):
+    frames = np.zeros((20, len(_ARKIT_BLENDSHAPES)), dtype=np.float32)
+    first = bake_to_nla([head], frames, "take", 1, "AIAnimatorTest_take")[0]
+    second = bake_to_nla([head], frames + 1, "retake", 1, "AIAnimatorTest_take")[0]
+    assert second.sk_action is not first.sk_action and second.prop_action is not first.prop_action
+    assert first.prop_action.fcurves.find('["tongueOut"]').evaluate(5) == pytest.approx(0.0)
@@ -0,0 +1,108 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from ai_animator.audio import (compact_wav, read_wav_mono, read_wav_window, resample, split_windows,
+                               stitch_windows, voiced_regions, wav_duration)
+
+
+def _write_wav(path, samples, rate, channels=1):
+    pcm = np.clip(np.round(samples * 32767), -32768, 32767).astype('<i2')
+    with wave.open(str(path), "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(pcm.tobytes())
+    return str(path)
+
+
+def _tone(seconds, rate, frequency=440.0, amplitude=0.5):
+    t = np.arange(int(seconds * rate)) / rate
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32)
+
+
+def test_wav_duration(tmp_path):
+    assert wav_duration(_write_wav(tmp_path / "tone.wav", _tone(1.5, 8000), 8000)) == pytest.approx(1.5)
+    not_wav = tmp_path / "audio.mp3"
+    not_wav.write_bytes(b'ID3' + b'\0' * 100)
+    assert wav_duration(str(not_wav)) is None
+
+
+def test_split_windows():
+    assert split_windows(10, 4, 1) == [(0.0, 4.0), (3.0, 7.0), (6.0, 10.0)]
+    assert split_windows(3, 4, 1) == [(0.0, 3)]
+    with pytest.raises(ValueError):
+        split_windows(10, 1, 1)
+
+
+def test_read_wav_window(tmp_path):
+    samples = _tone(2.0, 8000)
+    path = _write_wav(tmp_path / "tone.wav", samples, 8000)
+    with wave.open(io.BytesIO(read_wav_window(path, 0.5, 1.25)), "rb") as wav:
+        assert wav.getframerate() == 8000 and wav.getnframes() == 6000
+        window = np.frombuffer(wav.readframes(6000), dtype='<i2') / 32767
+    np.testing.assert_allclose(window, samples[4000:10000], atol=1 / 32767)
+
+
+def test_read_wav_mono_downmixes(tmp_path):
+    left, right = _tone(0.5, 8000), np.zeros(4000, dtype=np.float32)
+    path = _write_wav(tmp_path / "stereo.wav", np.stack([left, right], axis=1).ravel(), 8000, channels=2)
+    samples, rate = read_wav_mono(path)
+    assert rate == 8000
+    np.testing.assert_allclose(samples, left / 2, atol=1 / 32767)
+
+
+@pytest.mark.parametrize("rate_in,rate_out", [(48000, 16000), (44100, 16000), (8000, 16000)])
+def test_resample_keeps_duration_and_tone(rate_in, rate_out):
+    samples = _tone(0.5, rate_in, frequency=300.0)
+    out = resample(samples, rate_in, rate_out)
+    assert len(out) == round(len(samples) * rate_out / rate_in)
+    expected = _tone(0.5, rate_out, frequency=300.0)[:len(out)]
+    # away from the edges, where the filter runs off the signal
+    inner = slice(100, len(out) - 100)
+    assert np.abs(out[inner] - expected[inner]).max() < 0.01
+
+
+def test_resample_removes_frequencies_above_the_new_nyquist():
+    out = resample(_tone(0.5, 48000, frequency=12000.0), 48000, 16000)
+    assert np.abs(out[100:-100]).max() < 0.01
+
+
+def test_compact_wav(tmp_path):
+    path = _write_wav(tmp_path / "tone.wav", _tone(1.0, 48000), 48000)
+    data, duration = compact_wav(path, 16000)
+    samples, rate = read_wav_mono(io.BytesIO(data))
+    assert duration == pytest.approx(1.0)
+    assert rate == 16000 and len(samples) == 16000
+    np.testing.assert_allclose(samples[100:-100], _tone(1.0, 16000)[100:-100], atol=0.01)
+
+
+def test_voiced_regions():
+    rate = 16000
+    silence = np.zeros(rate, dtype=np.float32)
+    samples = np.concatenate([silence, _tone(1.0, rate), silence, silence, _tone(0.5, rate), silence])
+    regions = voiced_regions(samples, rate, padding_seconds=0.0)
+    assert len(regions) == 2
+    assert regions[0] == pytest.approx((1.0, 2.0), abs=0.03)
+    assert regions[1] == pytest.approx((4.0, 4.5), abs=0.03)
+    assert voiced_regions(np.zeros(rate, dtype=np.float32), rate) == []
+    assert voiced_regions(np.zeros(0, dtype=np.float32), rate) == []
+
+
+def test_stitch_windows_crossfades_overlap():
+    first = np.zeros((10, 2), dtype=np.float32)
+    second = np.ones((10, 2), dtype=np.float32)
+    stitched = stitch_windows([first, second], [0, 6])
+    assert stitched.shape == (16, 2)
+    np.testing.assert_allclose(stitched[:6], 0)
+    np.testing.assert_allclose(stitched[10:], 1)
+    # the overlap fades monotonically from the first window to the second
+    assert (np.diff(stitched[5:11, 0]) > 0).all()
+
+
+def test_stitch_windows_skips_empty_segments():
+    frames = np.ones((4, 3), dtype=np.float32)
+    np.testing.assert_allclose(stitch_windows([np.zeros((0, 0)), frames], [0, 2]), np.vstack([np.zeros((2, 3)), frames]))
+    assert stitch_windows([np.zeros((0, 0))], [0]).shape == (0, 0)
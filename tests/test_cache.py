@@ -0,0 +1,50 @@
+import io
+import os
+
+import numpy as np
+
+from ai_animator.cache import InferenceCache
+
+
+def _on_disk(cache):
+    sizes = [os.path.getsize(os.path.join(cache.directory, name)) for name in os.listdir(cache.directory) if name.endswith('.npy')]
+    return len(sizes), sum(sizes)
+
+
+def _totals(cache):
+    stats = cache.stats()
+    return stats['entries'], stats['bytes']
+
+
+def _entry_bytes(frames):
+    buffer = io.BytesIO()
+    np.save(buffer, np.asarray(frames, dtype=np.float32), allow_pickle=False)
+    return buffer.tell()
+
+
+def test_running_totals_follow_put_replace_and_clear(tmp_path):
+    cache = InferenceCache(str(tmp_path))
+    cache.put('a', np.zeros((10, 52)))
+    cache.put('b', np.zeros((20, 52)))
+    # replacing an entry only changes the total size
+    cache.put('a', np.zeros((30, 52)))
+    assert _totals(cache) == _on_disk(cache) == (2, _entry_bytes(np.zeros((20, 52))) + _entry_bytes(np.zeros((30, 52))))
+    cache.clear()
+    assert _totals(cache) == (0, 0)
+
+
+def test_running_totals_follow_eviction(tmp_path):
+    frames = np.zeros((10, 52))
+    cache = InferenceCache(str(tmp_path), max_bytes=3 * _entry_bytes(frames))
+    for i in range(5):
+        cache.put(str(i), frames)
+        # distinct mtimes, oldest first, so eviction order doesn't depend on the clock's resolution
+        os.utime(cache._path(str(i)), (i, i))
+    assert _totals(cache) == _on_disk(cache) == (3, 3 * _entry_bytes(frames))
+    assert cache.stats()['evictions'] == 2
+    assert cache.get('0') is None and cache.get('4') is not None
+
+
+def test_existing_entries_are_counted(tmp_path):
+    InferenceCache(str(tmp_path)).put('a', np.zeros((10, 52)))
+    assert _totals(InferenceCache(str(tmp_path))) == (1, _entry_bytes(np.zeros((10, 52))))
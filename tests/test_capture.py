@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pytest
+
+from ai_animator.capture import (LIVE_LINK_FACE_CHANNELS, LIVE_LINK_FACE_HEADER, load_capture, parse_takes, place_frames,
+                                 read_livelink_csv, read_sidecar, sidecar_paths)
+
+
+def _write_csv(path, frames, timecodes, header=LIVE_LINK_FACE_HEADER):
+    channels = {name: frames[:, i] for i, name in enumerate(LIVE_LINK_FACE_CHANNELS)}
+    with open(path, "w", newline="") as csv_file:
+        csv_file.write(",".join(header) + "\r\n")
+        for row, timecode in enumerate(timecodes):
+            cells = [timecode if name == "Timecode" else str(len(LIVE_LINK_FACE_CHANNELS)) if name == "BlendShapeCount"
+                     else repr(float(channels[name][row])) for name in header]
+            csv_file.write(",".join(cells) + "\r\n")
+    return str(path)
+
+
+def _take(num_frames=20, seed=0):
+    frames = np.random.default_rng(seed).random((num_frames, len(LIVE_LINK_FACE_CHANNELS))).astype(np.float32)
+    timecodes = [f"12:01:44:{i:02d}.{i * 37 % 1000:03d}" for i in range(num_frames)]
+    return frames, timecodes
+
+
+def test_read_livelink_csv(tmp_path):
+    frames, timecodes = _take()
+    capture = read_livelink_csv(_write_csv(tmp_path / "take.csv", frames, timecodes))
+    assert len(capture) == len(frames)
+    np.testing.assert_array_equal(capture.frames, frames)
+    assert capture.timecodes.tolist() == [timecode.encode() for timecode in timecodes]
+    np.testing.assert_array_equal(capture.relative_to_first_frame()[0], 0)
+
+
+def test_read_livelink_csv_matches_columns_by_name(tmp_path):
+    frames, timecodes = _take()
+    header = ["BlendShapeCount"] + LIVE_LINK_FACE_CHANNELS[::-1] + ["Timecode"]
+    capture = read_livelink_csv(_write_csv(tmp_path / "take.csv", frames, timecodes, header))
+    np.testing.assert_array_equal(capture.frames, frames)
+    assert capture.timecodes[0] == timecodes[0].encode()
+
+
+def test_read_livelink_csv_missing_columns(tmp_path):
+    path = tmp_path / "other.csv"
+    path.write_text("Timecode,Foo\r\n00:00:00:00,1\r\n")
+    with pytest.raises(ValueError):
+        read_livelink_csv(str(path))
+
+
+def test_sidecar_round_trip(tmp_path):
+    frames, timecodes = _take()
+    path = _write_csv(tmp_path / "take.csv", frames, timecodes)
+    assert read_sidecar(path) is None
+    parsed = load_capture(path)
+    assert all(os.path.exists(sidecar) for sidecar in sidecar_paths(path))
+    cached = read_sidecar(path)
+    assert isinstance(cached.frames, np.memmap) or isinstance(cached.frames.base, np.memmap)
+    np.testing.assert_array_equal(cached.frames, parsed.frames)
+    assert cached.timecodes.tolist() == parsed.timecodes.tolist()
+
+
+def test_sidecar_goes_stale_when_the_csv_changes(tmp_path):
+    frames, timecodes = _take()
+    path = _write_csv(tmp_path / "take.csv", frames, timecodes)
+    load_capture(path)
+    _write_csv(path, frames[:10], timecodes[:10])
+    assert read_sidecar(path) is None
+    assert len(load_capture(path)) == 10
+
+
+def test_parse_takes_writes_sidecars(tmp_path):
+    takes = {}
+    for i in range(3):
+        frames, timecodes = _take(10 + i, seed=i)
+        takes[_write_csv(tmp_path / f"take{i}.csv", frames, timecodes)] = frames
+    broken = tmp_path / "broken.csv"
+    broken.write_text("Timecode,Foo\r\n00:00:00:00,1\r\n")
+    finished = []
+    results = parse_takes(list(takes) + [str(broken)], max_workers=2, progress=lambda path, result: finished.append(path))
+    assert sorted(finished) == sorted(results)
+    assert "error" in results[str(broken)]
+    for path, frames in takes.items():
+        assert results[path]["num_frames"] == len(frames)
+        assert results[path]["sidecar"] and not results[path]["cached"]
+        np.testing.assert_array_equal(read_sidecar(path).frames, frames)
+    # a second parse finds every sidecar up to date
+    assert all(result["cached"] for result in parse_takes(takes, max_workers=2).values())
+
+
+def test_place_frames_in_order_is_untouched():
+    frames = np.arange(12, dtype=np.float32).reshape(4, 3)
+    placed, first, dropped = place_frames(frames, [7, 8, 9, 10])
+    assert placed is frames and first == 7 and dropped == 0
+
+
+def test_place_frames_fills_dropped_frames():
+    frames = np.array([[0.0], [1.0], [4.0]], dtype=np.float32)
+    placed, first, dropped = place_frames(frames, [3, 4, 7])
+    assert first == 3 and dropped == 2
+    np.testing.assert_allclose(placed[:, 0], [0, 1, 2, 3, 4])
+
+
+def test_place_frames_last_duplicate_wins():
+    frames = np.array([[0.0], [1.0], [2.0], [3.0]], dtype=np.float32)
+    placed, first, dropped = place_frames(frames, [1, 2, 2, 3])
+    assert first == 1 and dropped == 0
+    np.testing.assert_allclose(placed[:, 0], [0, 2, 3])
+
+
+def test_place_frames_checks_lengths():
+    with pytest.raises(ValueError):
+        place_frames(np.zeros((3, 2)), [1, 2])
+    placed, first, dropped = place_frames(np.zeros((0, 2)), [])
+    assert len(placed) == 0 and first == 0 and dropped == 0
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+from ai_animator.cache import InferenceCache
+from ai_animator.client import Client, ConnectionPool, DeadlineExceeded, InferenceError
+
+
+class _StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-length']))
+        time.sleep(self.server.delay)
+        self.server.hits += 1
+        # every frame holds the server's port, so tests can tell which server answered
+        body = json.dumps(np.full((3, 52), self.server.server_port).tolist()).encode()
+        self.send_response(self.server.status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def standin():
+    servers = []
+
+    def start(delay=0.0, status=200):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StandinHandler)
+        server.daemon_threads = True
+        server.delay = delay
+        server.status = status
+        server.hits = 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def audio(tmp_path):
+    path = tmp_path / "audio.bin"
+    path.write_bytes(b'x' * 1000)
+    return str(path)
+
+
+def _url(server):
+    return f'http://127.0.0.1:{server.server_port}/'
+
+
+def _wait_for_idle(pool, urls, timeout=5.0):
+    stop = time.monotonic() + timeout
+    while any(pool.in_flight(url) for url in urls) and time.monotonic() < stop:
+        time.sleep(0.05)
+    return [pool.in_flight(url) for url in urls]
+
+
+def test_hedge_wins_against_slow_endpoint(standin, audio):
+    fast, slow = standin(0.05), standin(2.0)
+    pool = ConnectionPool()
+    # enough fast responses that the client knows what a slow one looks like
+    warm = Client([_url(fast)], pool=pool)
+    for _ in range(6):
+        warm.request(audio)
+    client = Client([_url(slow), _url(fast)], pool=pool, strategy='ROUND_ROBIN', hedge_percentile=95, hedge_min_delay=0.2)
+    for _ in range(2):
+        started = time.monotonic()
+        frames = client.request(audio)
+        assert frames[0, 0] == fast.server_port
+        assert time.monotonic() - started < 1.5
+    pool.close()
+
+
+def test_hedge_does_not_advance_round_robin():
+    pool = ConnectionPool()
+    endpoints = ['http://a/', 'http://b/']
+    primaries = []
+    for _ in range(4):
+        primary = pool.choose(endpoints, 'ROUND_ROBIN')
+        assert pool.choose(endpoints, 'ROUND_ROBIN', exclude=[primary], hedge=True) != primary
+        primaries.append(primary)
+    assert primaries[0] != primaries[1] and primaries[:2] == primaries[2:]
+
+
+def test_deadline_expires(standin, audio):
+    slow = standin(2.0)
+    client = Client([_url(slow)], pool=ConnectionPool(), deadline=0.5, max_retries=0)
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        client.request(audio)
+    assert time.monotonic() - started < 1.5
+
+
+def test_retries_after_503(standin, audio):
+    unavailable, healthy = standin(status=503), standin()
+    client = Client([_url(unavailable), _url(healthy)], pool=ConnectionPool(), strategy='ROUND_ROBIN', backoff_seconds=0.01)
+    for _ in range(3):
+        assert client.request(audio)[0, 0] == healthy.server_port
+
+    client = Client([_url(unavailable)], pool=ConnectionPool(), max_retries=2, backoff_seconds=0.01)
+    hits = unavailable.hits
+    with pytest.raises(InferenceError) as error:
+        client.request(audio)
+    assert error.value.status == 503
+    assert unavailable.hits - hits == 3
+
+
+def test_no_retry_after_404(standin, audio):
+    missing = standin(status=404)
+    client = Client([_url(missing)], pool=ConnectionPool(), max_retries=2, backoff_seconds=0.01)
+    with pytest.raises(InferenceError) as error:
+        client.request(audio)
+    assert error.value.status == 404
+    assert missing.hits == 1
+
+
+def test_in_flight_returns_to_zero(standin, audio):
+    fast, slow, failing = standin(0.05), standin(1.0), standin(status=503)
+    urls = [_url(fast), _url(slow), _url(failing)]
+    pool = ConnectionPool()
+    Client(urls[:1], pool=pool).request(audio)
+    with pytest.raises(DeadlineExceeded):
+        Client(urls[1:2], pool=pool, deadline=0.3, max_retries=0).request(audio)
+    with pytest.raises(InferenceError):
+        Client(urls[2:], pool=pool, max_retries=1, backoff_seconds=0.01).request(audio)
+    assert _wait_for_idle(pool, urls) == [0, 0, 0]
+    pool.close()
+
+
+def test_no_cache_without_model_version(tmp_path):
+    cache = InferenceCache(str(tmp_path))
+    assert Client(cache=cache).cache is None
+    client = Client(cache=cache, model_version='2.1')
+    assert client.cache is cache and client.cache_namespace == '2.1'
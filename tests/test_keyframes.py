@@ -0,0 +1,180 @@
+import numpy as np
+import pytest
+
+from ai_animator.keyframes import (conform_frames, resize_keyframe_points, simplify_channels, simplify_keyframes, write_keyframe_range,
+                                   write_keyframes)
+
+
+class _KeyframePoints:
+    '''Stands in for an FCurve's keyframe_points collection, storing the points' co and interpolation as flat lists.'''
+    def __init__(self):
+        self.co = []
+        self.interpolation = []
+
+    def __len__(self):
+        return len(self.interpolation)
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return _KeyframePoint(self, i)
+
+    def add(self, count):
+        self.co += [0.0, 0.0] * count
+        self.interpolation += [2] * count
+
+    def remove(self, point, fast=False):
+        i = point.i
+        del self.co[2 * i:2 * i + 2]
+        del self.interpolation[i]
+
+    def foreach_set(self, attr, values):
+        assert len(values) == len(getattr(self, attr))
+        setattr(self, attr, list(values))
+
+
+class _KeyframePoint:
+    def __init__(self, points, i):
+        self.points = points
+        self.i = i
+
+    @property
+    def co(self):
+        return tuple(self.points.co[2 * self.i:2 * self.i + 2])
+
+    @co.setter
+    def co(self, value):
+        self.points.co[2 * self.i:2 * self.i + 2] = list(value)
+
+
+class _FCurve:
+    def __init__(self, count=0):
+        self.keyframe_points = _KeyframePoints()
+        self.keyframe_points.add(count)
+
+    def update(self):
+        pass
+
+    def evaluate(self, frame):
+        co = np.asarray(self.keyframe_points.co).reshape(-1, 2)
+        return np.interp(frame, co[:, 0], co[:, 1])
+
+
+def _channels(num_frames=1000, num_channels=8, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_frames)[:, None]
+    values = 0.5 + 0.4 * np.sin(t * rng.uniform(0.01, 0.2, num_channels) + rng.uniform(0, np.pi, num_channels))
+    return (values + rng.normal(0, 0.002, values.shape)).astype(np.float32)
+
+
+@pytest.mark.parametrize("tolerance", [0.001, 0.01, 0.05])
+def test_simplify_channels_error_within_tolerance(tolerance):
+    values = _channels()
+    keep, max_error = simplify_channels(values, tolerance)
+    assert max_error <= tolerance
+    assert keep[0].all() and keep[-1].all()
+    frames = np.arange(len(values))
+    for channel in range(values.shape[1]):
+        kept = np.flatnonzero(keep[:, channel])
+        linear = np.interp(frames, kept, values[kept, channel])
+        assert np.abs(linear - values[:, channel]).max() <= tolerance + 1e-6
+
+
+def test_simplify_channels_straight_lines_keep_only_their_ends():
+    values = np.repeat(np.linspace(0, 1, 50, dtype=np.float32)[:, None], 2, axis=1)
+    values[:, 1] = 0.25
+    keep, max_error = simplify_channels(values, 1e-6)
+    assert keep.sum(axis=0).tolist() == [2, 2]
+    assert max_error <= 1e-6
+
+
+def test_simplify_channels_empty():
+    keep, max_error = simplify_channels(np.zeros((0, 4)), 0.01)
+    assert keep.shape == (0, 4) and max_error == 0.0
+
+
+def test_simplify_keyframes_off_without_tolerance():
+    assert simplify_keyframes(_channels(), None) == (None, None)
+    keep, stats = simplify_keyframes(_channels(), 0.01)
+    assert stats["keyframes_before"] == keep.size
+    assert stats["keyframes_after"] == int(keep.sum())
+    assert stats["max_error"] <= 0.01
+
+
+def test_conform_frames_passes_matching_rate_through():
+    frames = _channels(10, 3)
+    conformed, first = conform_frames(frames, 60, 60, start_frame=5)
+    assert conformed is frames and first == 5
+
+
+def test_conform_frames_resamples_to_whole_scene_frames():
+    frames = np.arange(60, dtype=np.float32)[:, None]
+    conformed, first = conform_frames(frames, 60, 24, start_frame=10.5)
+    assert first == 11
+    # scene frame 11 is half a scene frame (1.25 source frames) into the clip
+    np.testing.assert_allclose(conformed[:, 0], 1.25 + 2.5 * np.arange(len(conformed)), atol=1e-5)
+    assert conformed[-1, 0] <= 59
+
+
+@pytest.mark.parametrize("target_fps", [24, 30, 60, 59.94])
+def test_conform_frames_from_first_row(target_fps):
+    frames = _channels(500, 3)
+    conformed, first = conform_frames(frames, 60, target_fps, start_frame=2.3)
+    for first_row in [0, 1, 17, len(conformed) - 1, len(conformed)]:
+        tail, tail_first = conform_frames(frames, 60, target_fps, start_frame=2.3, first_row=first_row)
+        assert tail_first == first
+        np.testing.assert_array_equal(tail, conformed[first_row:])
+
+
+def test_conform_frames_clip_shorter_than_a_frame():
+    conformed, first = conform_frames(np.zeros((1, 3)), 60, 24, start_frame=0.5)
+    assert conformed.shape == (0, 3) and first == 1
+
+
+@pytest.mark.parametrize("before,after", [(0, 10), (10, 10), (10, 4), (4, 10)])
+def test_resize_keyframe_points(before, after):
+    fc = _FCurve(before)
+    points = fc.keyframe_points
+    resize_keyframe_points(fc, after)
+    assert fc.keyframe_points is points
+    assert len(points) == after and len(points.co) == 2 * after
+
+
+def test_write_keyframes_reuses_fcurve():
+    fc = _FCurve(5)
+    values = _channels(100, 1)[:, 0]
+    frame_nums = np.arange(1, 101, dtype=np.float32)
+    write_keyframes(fc, frame_nums, values)
+    assert len(fc.keyframe_points) == 100
+    np.testing.assert_allclose(fc.evaluate(frame_nums), values, atol=1e-6)
+
+    keep, _ = simplify_channels(values[:, None], 0.01)
+    write_keyframes(fc, frame_nums, values, keep[:, 0])
+    assert len(fc.keyframe_points) == keep.sum()
+    assert set(fc.keyframe_points.interpolation) == {1}
+    assert np.abs(fc.evaluate(frame_nums) - values).max() <= 0.01 + 1e-6
+
+
+def test_write_keyframe_range_appends_to_existing_keyframes():
+    fc = _FCurve()
+    values = _channels(100, 1)[:, 0]
+    frame_nums = np.arange(1, 101, dtype=np.float32)
+    write_keyframes(fc, frame_nums[:60], np.zeros(60, dtype=np.float32))
+    # overwrite the tail of the existing points and run past their end
+    write_keyframe_range(fc, 40, frame_nums[40:], values[40:])
+    assert len(fc.keyframe_points) == 100
+    np.testing.assert_allclose(fc.evaluate(frame_nums[:40]), 0)
+    np.testing.assert_allclose(fc.evaluate(frame_nums[40:]), values[40:], atol=1e-6)
+
+
+def test_write_keyframes_resets_interpolation_after_simplifying():
+    fc = _FCurve()
+    values = _channels(100, 1)[:, 0]
+    frame_nums = np.arange(1, 101, dtype=np.float32)
+    keep, _ = simplify_channels(values[:, None], 0.05)
+    write_keyframes(fc, frame_nums, values, keep[:, 0])
+    assert set(fc.keyframe_points.interpolation) == {1}
+    # a later bake without simplification mustn't keep the simplified curve's LINEAR keys
+    write_keyframes(fc, frame_nums, values)
+    assert len(fc.keyframe_points) == 100
+    assert set(fc.keyframe_points.interpolation) == {2}
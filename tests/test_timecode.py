@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from ai_animator.timecode import CompactTimecode, Timecode, TimecodeError, framerate_info
+
+
+@pytest.mark.parametrize("framerate", ['24', '25', '30', '29.97', '59.94', '60'])
+def test_frames_array_to_tc_matches_frames_to_tc(framerate):
+    tc = Timecode(framerate)
+    frames = np.random.default_rng(0).integers(1, 24 * 60 * 60 * 60, 500)
+    expected = [tc.tc_to_string(*tc.frames_to_tc(int(frame))) for frame in frames]
+    assert tc.frames_array_to_tc(frames).tolist() == expected
+
+
+@pytest.mark.parametrize("framerate", ['24', '25', '30', '29.97', '59.94', '60'])
+def test_tc_array_to_frames_matches_tc_to_frames(framerate):
+    tc = Timecode(framerate)
+    frames = np.random.default_rng(1).integers(1, 24 * 60 * 60 * int(float(framerate)), 500)
+    timecodes = tc.frames_array_to_tc(frames)
+    np.testing.assert_array_equal(tc.tc_array_to_frames(timecodes), [tc.tc_to_frames(str(t)) for t in timecodes])
+    np.testing.assert_array_equal(tc.tc_array_to_frames(timecodes), frames)
+
+
+def test_tc_array_to_frames_accepts_bytes_and_mixed_layouts():
+    tc = Timecode('30')
+    timecodes = np.array([b'00:00:01:00', b'0:0:1:1', b'00:00:01.500'])
+    np.testing.assert_array_equal(tc.tc_array_to_frames(timecodes), [31, 32, 46])
+
+
+def test_tc_array_to_frames_ignores_subframes():
+    # LiveLinkFace timecodes carry a subframe after the frame field
+    tc = Timecode('60')
+    np.testing.assert_array_equal(tc.tc_array_to_frames(['12:01:44:21.483', '12:01:44:21.999']),
+                                  [tc.tc_to_frames('12:01:44:21')] * 2)
+
+
+def test_tc_array_to_frames_empty():
+    tc = Timecode('24')
+    for empty in ([], np.array([], dtype=bytes), np.zeros(0, dtype='S15')):
+        frames = tc.tc_array_to_frames(empty)
+        assert frames.dtype == np.int64 and frames.shape == (0,)
+
+
+def test_tc_array_to_frames_rejects_garbage():
+    with pytest.raises(TimecodeError):
+        Timecode('24').tc_array_to_frames(['00:00:01:00', 'not a timecode'])
+
+
+@pytest.mark.parametrize("fps", [24, 25, 30, 60])
+def test_compact_from_seconds_matches_timecode_at_integer_rates(fps):
+    rng = np.random.default_rng(2)
+    for whole, frame in zip(rng.integers(0, 24 * 60 * 60, 500), rng.integers(0, fps, 500)):
+        # the middle of a frame, so float rounding can't move it to a neighbour
+        seconds = int(whole) + (int(frame) + 0.5) / fps
+        hours, rest = divmod(int(whole), 3600)
+        minutes, secs = divmod(rest, 60)
+        expected = Timecode(str(fps), f"{hours:02d}:{minutes:02d}:{secs:02d}:{int(frame):02d}")
+        compact = CompactTimecode.from_seconds(str(fps), seconds)
+        assert compact.frames == expected.frames
+        assert repr(compact) == repr(expected)
+
+
+@pytest.mark.parametrize("framerate, exact", [('29.97', 30000 / 1001), ('59.94', 60000 / 1001)])
+def test_compact_from_seconds_drop_frame(framerate, exact):
+    rng = np.random.default_rng(3)
+    for frame_number in rng.integers(0, int(24 * 60 * 60 * exact) - 3, 500):
+        compact = CompactTimecode.from_seconds(framerate, (int(frame_number) + 0.5) / exact)
+        assert compact.drop_frame
+        assert compact.frame_number == frame_number
+        # formats like a Timecode of the same frame and parses back to it
+        assert repr(compact) == repr(Timecode(framerate, frames=compact.frames))
+        assert Timecode(framerate, repr(compact)).frames == compact.frames
+
+
+@pytest.mark.parametrize("framerate, seconds, expected", [
+    ('29.97', 600.0, '00:10:00;00'),
+    ('29.97', 60.07, '00:01:00;02'),
+    ('59.94', 600.0, '00:10:00;00'),
+    ('59.94', 60.07, '00:01:00;04'),
+])
+def test_compact_from_seconds_drop_frame_tracks_wall_clock(framerate, seconds, expected):
+    # drop frame skips frame numbers so its timecode keeps up with the clock
+    assert repr(CompactTimecode.from_seconds(framerate, seconds)) == expected
+
+
+@pytest.mark.parametrize("fps", [24, 25, 30, 60])
+def test_compact_from_seconds_midnight_rollover(fps):
+    before = CompactTimecode.from_seconds(str(fps), 24 * 60 * 60 - 0.5 / fps)
+    assert repr(before) == f"23:59:59:{fps - 1:02d}"
+    assert before.frames == Timecode(str(fps), f"23:59:59:{fps - 1:02d}").frames
+    # seconds_since_midnight starts over at 0
+    after = CompactTimecode.from_seconds(str(fps), 0.0)
+    assert after.frames == 1 and repr(after) == "00:00:00:00"
+
+
+@pytest.mark.parametrize("framerate", ['29.97', '59.94'])
+def test_compact_from_seconds_drop_frame_wraps_at_24_hours(framerate):
+    # counting at the exact rate runs a few frames past drop frame's 24 hours
+    # just before midnight, which wraps the way a Timecode of that frame does
+    compact = CompactTimecode.from_seconds(framerate, 24 * 60 * 60 - 0.001)
+    assert repr(compact) == repr(Timecode(framerate, frames=compact.frames))
+    assert repr(compact).startswith('00:00:00;')
+    assert repr(CompactTimecode.from_seconds(framerate, 0.0)) == '00:00:00;00'
+
+
+def test_compact_timecode_shares_framerate_info():
+    assert CompactTimecode.from_seconds('60', 1.0).rate is CompactTimecode('60').rate
+    assert framerate_info('29.97') is not framerate_info('29.97', True)
+    assert not CompactTimecode('29.97', force_non_drop_frame=True).drop_frame
@@ -23,6 +23,11 @@
 
 __version__ = '1.3.1'
 
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
 
 class Timecode(object):
     """The main timecode class.
@@ -140,13 +145,9 @@ class Timecode(object):
         if isinstance(framerate, tuple):
             numerator, denominator = framerate
 
-        try:
-            from fractions import Fraction
-            if isinstance(framerate, Fraction):
-                numerator = framerate.numerator
-                denominator = framerate.denominator
-        except ImportError:
-            pass
+        if isinstance(framerate, Fraction):
+            numerator = framerate.numerator
+            denominator = framerate.denominator
 
         if numerator and denominator:
             framerate = round(float(numerator) / float(denominator), 2)
@@ -183,6 +184,20 @@ class Timecode(object):
 
         self._framerate = framerate
 
+    @property
+    def rational_framerate(self):
+        """returns the exact frame rate as a Fraction, i.e. 30000/1001 rather
+        than 29.97 for the NTSC rates
+        """
+        if self.ms_frame:
+            return Fraction(1000)
+        if self.framerate == 'frames':
+            return Fraction(1)
+        if self.framerate in ['29.97', '59.94'] or \
+                any(map(lambda x: self.framerate.startswith(x), ['23.976', '23.98'])):
+            return Fraction(self._int_framerate * 1000, 1001)
+        return Fraction(self.framerate).limit_denominator(1001)
+
     def set_fractional(self, state):
         """Set or unset timecode to be represented with fractional seconds
         :param bool state:
@@ -318,6 +333,230 @@ class Timecode(object):
             hrs, mins, secs, self.frame_delimiter, frs
         )
 
+    def tc_array_to_frames(self, timecodes):
+        """Converts a whole array of timecodes to frame numbers in one
+        vectorized pass, giving the same result as calling tc_to_frames on
+        each of them (without switching this instance to fractional), except
+        for the subframe suffix below.
+
+        Accepts NDF '00:00:00:00', DF '00:00:00;00' and fraction of second
+        '00:00:00.000' timecodes (mixed freely, and the fields need not be
+        zero padded). A fraction after a frame field, as in LiveLinkFace's
+        '00:00:00:00.000', is a subframe and is ignored, so the result is
+        the frame field. tc_to_frames differs there: it replaces the frame
+        field with the subframe digits read as a fraction of a second.
+
+        :param timecodes: array-like of str or bytes
+        :returns: int64 array of (1 based) frame numbers
+        """
+        if len(np.asarray(timecodes).ravel()) == 0:
+            return np.empty(0, dtype=np.int64)
+        chars = self._timecode_chars(timecodes)
+        num_rows, width = chars.shape
+        # classify every character (digit, ':' or ';', '.', padding, other)
+        # and group the rows by the resulting layout, so how the characters
+        # make up the fields is only worked out once per distinct layout
+        kinds = np.full(chars.shape, 4, dtype=np.int8)
+        kinds[(chars >= ord('0')) & (chars <= ord('9'))] = 0
+        kinds[(chars == ord(':')) | (chars == ord(';'))] = 1
+        kinds[chars == ord('.')] = 2
+        kinds[chars == 0] = 3
+        # number the layouts by packing the kinds (3 bits each) into int64
+        # codes, 21 characters at a time
+        layout_ids = np.zeros(num_rows, dtype=np.int64)
+        for start in range(0, width, 21):
+            chunk = kinds[:, start:start + 21].astype(np.int64)
+            codes = chunk @ (8 ** np.arange(chunk.shape[1], dtype=np.int64))
+            if start:
+                codes = np.unique(codes, return_inverse=True)[1].ravel()
+                codes += layout_ids * (codes.max() + 1)
+            layout_ids = codes
+        _, first_rows, inverse = np.unique(
+            layout_ids, return_index=True, return_inverse=True
+        )
+        inverse = inverse.ravel()
+        layouts = kinds[first_rows]
+        digits = np.where(kinds == 0, chars - ord('0'), 0).astype(np.float64)
+
+        # fields are hours, minutes, seconds, frames and the digits after a
+        # '.' (a fraction of a second, or a subframe after a frame field)
+        fields = np.zeros((num_rows, 5), dtype=np.int64)
+        fraction_scale = np.ones(num_rows, dtype=np.float64)
+        fraction_of_second = np.zeros(num_rows, dtype=bool)
+        for i, layout in enumerate(layouts):
+            layout_fields = self._layout_fields(layout)
+            if layout_fields is None:
+                raise TimecodeError(
+                    'Not a valid timecode : %s'
+                    % np.asarray(timecodes).ravel()[first_rows[i]]
+                )
+            rows = np.flatnonzero(inverse == i) if len(layouts) > 1 else slice(None)
+            weights, fraction_digits, is_fraction_of_second = layout_fields
+            fields[rows] = np.rint(digits[rows] @ weights).astype(np.int64)
+            fraction_scale[rows] = 10.0 ** -fraction_digits
+            fraction_of_second[rows] = is_fraction_of_second
+
+        hours, minutes, seconds, frames, fraction = fields.T
+
+        if self.framerate != 'frames':
+            ffps = float(self.framerate)
+        else:
+            ffps = float(self._int_framerate)
+
+        if self.ms_frame:
+            frames = np.where(fraction_of_second, fraction, frames)
+        else:
+            frames = np.where(
+                fraction_of_second,
+                np.round(fraction * fraction_scale * ffps).astype(np.int64),
+                frames
+            )
+
+        if self.drop_frame:
+            drop_frames = int(round(ffps * .066666))
+        else:
+            drop_frames = 0
+
+        ifps = self._int_framerate
+        total_minutes = (60 * hours) + minutes
+        frame_number = \
+            ((ifps * 60 * 60 * hours) + (ifps * 60 * minutes) +
+             (ifps * seconds) + frames) - \
+            (drop_frames * (total_minutes - (total_minutes // 10)))
+
+        return frame_number + 1
+
+    def frames_array_to_tc(self, frames):
+        """Converts a whole array of (1 based) frame numbers to timecode
+        strings in one vectorized pass, giving the same strings as
+        tc_to_string(*frames_to_tc(frame)) for each of them.
+
+        :param frames: array-like of int
+        :returns: array of str
+        """
+        frames = np.asarray(frames, dtype=np.int64)
+        if self.drop_frame:
+            ffps = float(self.framerate)
+            drop_frames = int(round(ffps * .066666))
+        else:
+            ffps = float(self._int_framerate)
+            drop_frames = 0
+
+        frames_per_10_minutes = int(round(ffps * 60 * 10))
+        frames_per_24_hours = int(round(ffps * 60 * 60 * 24))
+        frames_per_minute = int(round(ffps) * 60) - drop_frames
+
+        frame_number = (frames - 1) % frames_per_24_hours
+
+        if self.drop_frame:
+            d = frame_number // frames_per_10_minutes
+            m = frame_number % frames_per_10_minutes
+            frame_number = frame_number + drop_frames * 9 * d + np.where(
+                m > drop_frames,
+                drop_frames * ((m - drop_frames) // frames_per_minute),
+                0
+            )
+
+        ifps = self._int_framerate
+        frs = frame_number % ifps
+        secs = (frame_number // ifps) % 60
+        mins = ((frame_number // ifps) // 60) % 60
+        hrs = ((frame_number // ifps) // 60) // 60
+
+        if self.fraction_frame:
+            millis = np.round(
+                (secs + np.round(frs / float(ifps), 3)) * 1000
+            ).astype(np.int64)
+            columns = [hrs // 10, hrs % 10, ':', mins // 10, mins % 10, ':',
+                       millis // 10000, millis // 1000 % 10, '.',
+                       millis // 100 % 10, millis // 10 % 10, millis % 10]
+        elif self.ms_frame:
+            columns = [hrs // 10, hrs % 10, ':', mins // 10, mins % 10, ':',
+                       secs // 10, secs % 10, self.frame_delimiter,
+                       frs // 100, frs // 10 % 10, frs % 10]
+        else:
+            # '%02d' frame numbers, which grow a digit from 100 (> 99 fps)
+            frame_digits = max(len(str(ifps - 1)), 2)
+            columns = [hrs // 10, hrs % 10, ':', mins // 10, mins % 10, ':',
+                       secs // 10, secs % 10, self.frame_delimiter]
+            columns += [frs // 10 ** i % 10 for i in reversed(range(frame_digits))]
+            if frame_digits > 2:
+                return np.array([self.tc_to_string(*tc) for tc in zip(
+                    hrs.ravel().tolist(), mins.ravel().tolist(),
+                    secs.ravel().tolist(), frs.ravel().tolist()
+                )]).reshape(frames.shape)
+
+        chars = np.empty(frames.shape + (len(columns),), dtype=np.uint8)
+        for i, column in enumerate(columns):
+            if isinstance(column, str):
+                chars[..., i] = ord(column)
+            else:
+                chars[..., i] = column + ord('0')
+        return chars.view('S%d' % len(columns))[..., 0].astype(str)
+
+    @staticmethod
+    def _layout_fields(layout):
+        """works out how the characters of one timecode layout (a row of
+        character kinds, see tc_array_to_frames) make up its fields
+
+        :returns: the (width x 5) matrix of digit place values per field, the
+          number of digits after the '.' and whether they are a fraction of
+          a second, or None if the layout isn't a valid timecode
+        """
+        # runs of consecutive digits, each with the kind of character that
+        # ended the previous run
+        runs = []
+        separator = 1
+        last_kind = None
+        for column, kind in enumerate(layout.tolist()):
+            if kind != 3:
+                last_kind = kind
+            if kind == 0:
+                if not runs or runs[-1][2] != column:
+                    runs.append([separator, column, column])
+                runs[-1][2] = column + 1
+            elif kind in (1, 2):
+                if not runs or runs[-1][2] != column:
+                    return None
+                separator = kind
+            elif kind == 3 and any(k != 3 for k in layout[column:].tolist()):
+                return None
+            elif kind == 4:
+                return None
+        separators = [run[0] for run in runs[1:]]
+        if separators in ([1, 1, 1], [1, 1, 1, 2]):
+            field_indices = [0, 1, 2, 3, 4]
+            fraction_of_second = False
+        elif separators == [1, 1, 2]:
+            field_indices = [0, 1, 2, 4]
+            fraction_of_second = True
+        else:
+            return None
+        if last_kind != 0:
+            return None
+        weights = np.zeros((len(layout), 5))
+        for (_, start, end), field in zip(runs, field_indices):
+            weights[start:end, field] = 10.0 ** np.arange(end - start - 1, -1, -1)
+        fraction_digits = runs[-1][2] - runs[-1][1] if separators[-1:] == [2] else 0
+        return weights, fraction_digits, fraction_of_second
+
+    @staticmethod
+    def _timecode_chars(timecodes):
+        """returns [timecodes] as a (num_timecodes x width) uint8 matrix of
+        their ASCII characters, zero padded
+        """
+        timecodes = np.asarray(timecodes).ravel()
+        if timecodes.dtype.kind == 'U':
+            # one code point per uint32; anything outside ASCII becomes 255,
+            # which is not a valid timecode character either
+            codes = np.ascontiguousarray(timecodes).view(np.uint32)
+            codes = codes.reshape(len(timecodes), timecodes.dtype.itemsize // 4)
+            return np.minimum(codes, 255).astype(np.uint8)
+        timecodes = np.ascontiguousarray(
+            timecodes, dtype='S%d' % max(timecodes.dtype.itemsize, 1)
+        )
+        return timecodes.view(np.uint8).reshape(len(timecodes), -1)
+
     @classmethod
     def parse_timecode(cls, timecode):
         """parses timecode string NDF '00:00:00:00' or DF '00:00:00;00' or
@@ -532,6 +771,93 @@ class Timecode(object):
         return float(self.frames) / float(self._int_framerate)
 
 
+class FramerateInfo(object):
+    """What a Timecode works out from its framerate when it is set: the
+    normalized framerate, the nominal integer rate, whether it is drop frame
+    or milliseconds, and the exact rate as a float.
+
+    Use :func:`framerate_info` rather than creating these directly, it
+    parses each rate only once.
+    """
+
+    __slots__ = ('framerate', 'int_framerate', 'drop_frame', 'ms_frame',
+                 'force_non_drop_frame', 'exact_framerate')
+
+    def __init__(self, framerate, force_non_drop_frame=False):
+        # parse the rate exactly the way Timecode does
+        timecode = Timecode(framerate, frames=1,
+                            force_non_drop_frame=force_non_drop_frame)
+        self.framerate = timecode.framerate
+        self.int_framerate = timecode._int_framerate
+        self.drop_frame = timecode.drop_frame
+        self.ms_frame = timecode.ms_frame
+        self.force_non_drop_frame = force_non_drop_frame
+        self.exact_framerate = float(timecode.rational_framerate)
+
+
+@lru_cache(maxsize=None)
+def framerate_info(framerate, force_non_drop_frame=False):
+    """returns the (shared) FramerateInfo of the given framerate, which can
+    be anything Timecode accepts as a framerate
+    """
+    return FramerateInfo(framerate, force_non_drop_frame)
+
+
+class CompactTimecode(object):
+    """A lightweight Timecode for hot paths (e.g. stamping every outgoing
+    LiveLinkFace packet): it only holds a frame count and the shared
+    :class:`FramerateInfo` of its rate, so creating one doesn't parse the
+    framerate or a timecode string.
+
+    Convert it with :meth:`to_timecode` for the timecode maths and formatting
+    of a full :class:`Timecode`.
+
+    :param framerate: anything Timecode accepts as a framerate
+    :param int frames: the (1 based) frame count
+    :param force_non_drop_frame: see Timecode
+    """
+
+    __slots__ = ('rate', 'frames')
+
+    def __init__(self, framerate, frames=1, force_non_drop_frame=False):
+        self.rate = framerate_info(framerate, force_non_drop_frame)
+        self.frames = frames
+
+    @classmethod
+    def from_seconds(cls, framerate, seconds, force_non_drop_frame=False):
+        """creates the timecode of the frame running at the given wall-clock
+        seconds (e.g. since midnight), counting frames at the exact rate, so
+        29.97 counts 30000 frames every 1001 seconds
+        """
+        timecode = cls.__new__(cls)
+        timecode.rate = framerate_info(framerate, force_non_drop_frame)
+        timecode.frames = int(seconds * timecode.rate.exact_framerate) + 1
+        return timecode
+
+    @property
+    def framerate(self):
+        return self.rate.framerate
+
+    @property
+    def drop_frame(self):
+        return self.rate.drop_frame
+
+    @property
+    def frame_number(self):
+        """returns the 0 based frame number of the current timecode instance
+        """
+        return self.frames - 1
+
+    def to_timecode(self):
+        """returns a full Timecode of the same frame
+        """
+        return Timecode(self.rate.framerate, frames=self.frames,
+                        force_non_drop_frame=self.rate.force_non_drop_frame)
+
+    def __repr__(self):
+        return repr(self.to_timecode())
+
+
 class TimecodeError(Exception):
     """Raised when an error occurred in timecode calculation
     """
@@ -0,0 +1,112 @@
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+# the most recently finished StageTimer, shown in the sidebar panel
+_LAST_RUN = None
+
+# JSON-lines records are appended under this lock so concurrent runs don't interleave lines
+_LOG_LOCK = threading.Lock()
+
+'''
+Opt-in timing of each stage of one generation (hashing, preprocessing, upload, server inference, download, decoding, baking...).
+Stages are named, and a stage that is recorded more than once (e.g. once per window of a windowed request) accumulates its time,
+byte and frame counts, so with concurrent requests the stage times can add up to more than the wall-clock total.
+Stages may be recorded from any thread. Call finish() once the run is over to make it the last_run() and,
+if [log_path] is set, append it to that file as one JSON line.
+'''
+class StageTimer:
+    def __init__(self, label, log_path=None):
+        self.label = label
+        self.log_path = log_path
+        self.started = time.time()
+        self.total_seconds = None
+        self.stages = {}
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, num_bytes=0, num_frames=0):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds":0.0, "bytes":0, "frames":0, "count":0})
+            stage["seconds"] += seconds
+            stage["bytes"] += num_bytes
+            stage["frames"] += num_frames
+            stage["count"] += 1
+
+    '''
+    Times the body of a with block as stage [name]. The block gets a dict it can update with "bytes" and "frames" once it knows them.
+    '''
+    @contextmanager
+    def stage(self, name, num_bytes=0, num_frames=0):
+        counts = {"bytes":num_bytes, "frames":num_frames}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            self.add(name, time.perf_counter() - start, counts["bytes"], counts["frames"])
+
+    def record(self):
+        with self._lock:
+            stages = [dict(name=name, **stage) for name, stage in self.stages.items()]
+        return {
+            "label":self.label,
+            "host":socket.gethostname(),
+            "started":self.started,
+            "total_seconds":self.total_seconds,
+            "stages":stages,
+        }
+
+    def finish(self):
+        global _LAST_RUN
+        self.total_seconds = time.perf_counter() - self._start
+        _LAST_RUN = self
+        if self.log_path:
+            line = json.dumps(self.record())
+            try:
+                with _LOG_LOCK, open(self.log_path, "a") as outfile:
+                    outfile.write(line + "\n")
+            except OSError as e:
+                print(f"Failed to write timings to {self.log_path} : {e}")
+        return self
+
+'''
+Stands in for a StageTimer when instrumentation is off, so instrumented code never has to check whether it's enabled.
+'''
+class _NullTimer:
+    def add(self, name, seconds, num_bytes=0, num_frames=0):
+        pass
+
+    def stage(self, name, num_bytes=0, num_frames=0):
+        return nullcontext({"bytes":num_bytes, "frames":num_frames})
+
+    def finish(self):
+        return self
+
+NULL_TIMER = _NullTimer()
+
+'''
+Returns a StageTimer labelled [label] if [enabled], otherwise NULL_TIMER. [log_path] is expanded with os.path.expanduser.
+'''
+def create_timer(label, enabled, log_path=None):
+    if not enabled:
+        return NULL_TIMER
+    return StageTimer(label, os.path.expanduser(log_path) if log_path else None)
+
+def last_run():
+    return _LAST_RUN
+
+'''
+Formats one entry of StageTimer.stages as a single line, e.g. for the sidebar panel.
+'''
+def format_stage(name, stage):
+    text = f"{name}: {stage['seconds'] * 1000:.0f} ms"
+    if stage["count"] > 1:
+        text += f" over {stage['count']}"
+    if stage["bytes"]:
+        text += f", {stage['bytes'] / (1024 * 1024):.2f} MB"
+    if stage["frames"]:
+        text += f", {stage['frames']} frames"
+    return text